@@ -10,10 +10,102 @@ class Settings(BaseSettings):
     # Groq Configuration
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL: str = "mixtral-8x7b-32768"
+    GROQ_FALLBACK_MODEL: str = "llama-3.1-8b-instant"  # empty disables fallback
+    GROQ_BASE_URL: str = os.getenv("GROQ_BASE_URL", "")
+    
+    # LLM Client Configuration
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0  # per call, across every attempt
+    LLM_ATTEMPT_TIMEOUT_SECONDS: float = 20.0  # per Groq request; a timeout counts against the model's circuit
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 20.0
+    LLM_HEDGE_DELAY_SECONDS: float = 10.0  # 0 disables hedged requests
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    LLM_JSON_MODE: bool = True  # Groq JSON mode for structured outputs, where the model supports it
+    
+    # Groq Rate Limits (the account quota, shared by every worker; 0 disables)
+    GROQ_REQUESTS_PER_MINUTE: int = 0
+    GROQ_TOKENS_PER_MINUTE: int = 0
+    GROQ_RATE_LIMITS: dict = {}  # per-model overrides: model -> [requests_per_minute, tokens_per_minute]
+    GROQ_RATE_LIMIT_BURST_SECONDS: float = 10.0  # bucket size, in seconds of quota
+    
+    # Shared State Configuration (LLM response cache, rate limits and idempotency keys across workers)
+    SHARED_STORE_BACKEND: str = "mongo"  # mongo | sqlite (workers on one host)
+    SHARED_STORE_SQLITE_PATH: str = "/tmp/salesgpt-shared.db"
+    
+    # Idempotency-Key Configuration
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # how long a key's response is replayed
+    IDEMPOTENCY_LEASE_SECONDS: float = 120.0  # after this an unfinished claim can be taken over
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0  # how long a retry waits for the original before a 409
+    
+    # Prompt Configuration
+    PROMPT_CONTENT_TOKEN_BUDGET: int = 1200
+    
+    # LLM Response Cache Configuration
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    
+    # Web Scraper Configuration
+    SCRAPER_MAX_CONNECTIONS: int = 100
+    SCRAPER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SCRAPER_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    SCRAPER_HTTP2: bool = True
+    SCRAPER_TIMEOUT_SECONDS: float = 30.0
+    SCRAPER_CACHE_FRESHNESS_SECONDS: float = 300.0
+    SCRAPER_CACHE_MAX_ENTRIES: int = 512
+    SCRAPER_EXTRACTION_BACKEND: str = "auto"  # auto | streaming | soup
+    SCRAPER_MAX_BYTES: int = 2_000_000  # per page, after decompression
+    SCRAPER_MAX_CONTENT_CHARS: int = 50_000  # stop downloading once this much main content is extracted; 0 = no limit
+    SCRAPER_CONTENT_TYPES: list = ["text/html", "application/xhtml+xml"]
+    SCRAPER_PARSE_POOL: str = "off"  # off | process | thread: where pages are parsed (off = on the event loop)
+    SCRAPER_PARSE_WORKERS: int = 0  # 0 = one per CPU
+    SCRAPER_PARSE_MAX_PENDING: int = 0  # pages in the pool at once; 0 = two per worker
+    
+    # Crawl Mode Configuration
+    CRAWL_MAX_PAGES: int = 5
+    CRAWL_MAX_DEPTH: int = 1
+    CRAWL_MAX_BYTES: int = 2_000_000
+    CRAWL_CONCURRENCY: int = 4
+    CRAWL_TIME_BUDGET_SECONDS: float = 8.0
+    
+    # Similarity Search Configuration
+    SIMILARITY_INDEX_ENABLED: bool = True
+    SIMILARITY_DIMENSIONS: int = 256  # 4 bytes per dimension per analysis held in memory
+    SIMILARITY_REFRESH_SECONDS: float = 30.0  # pick up analyses saved by other workers; 0 disables
+    
+    # Few-shot Analysis Configuration (needs the similarity index)
+    ANALYSIS_FEW_SHOT_ENABLED: bool = False
+    ANALYSIS_FEW_SHOT_MODEL: str = "llama-3.1-8b-instant"
+    ANALYSIS_FEW_SHOT_EXAMPLES: int = 3
+    ANALYSIS_FEW_SHOT_MIN_SIMILARITY: float = 0.3
+    
+    # Batch Analysis Configuration
+    BATCH_MAX_URLS: int = 5000
+    BATCH_WORKERS: int = 8
+    BATCH_PER_DOMAIN_CONCURRENCY: int = 1
+    BATCH_DOMAIN_DELAY_SECONDS: float = 1.0
+    BATCH_MAX_RETRIES: int = 3
+    BATCH_RETRY_BASE_DELAY_SECONDS: float = 2.0
+    BATCH_HEARTBEAT_SECONDS: float = 15.0  # how often a worker marks its unfinished jobs alive
+    BATCH_STALE_SECONDS: float = 60.0  # jobs without a heartbeat for this long are resumed by another worker
     
     # MongoDB Configuration
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://mongodb:27017")
     DATABASE_NAME: str = "salesgpt"
+    DB_WRITE_BEHIND_COLLECTIONS: list = []  # e.g. ["analyses", "emails", "opportunities"]
+    DB_WRITE_BEHIND_MAX_BATCH: int = 100
+    DB_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 0.2
+    DB_WRITE_CONCERNS: dict = {}  # collection -> unacknowledged | acknowledged | journaled | majority
+    
+    # Response Configuration
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # smaller responses are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0-11; higher is smaller but much slower
+    RESPONSE_BROTLI_ENABLED: bool = True  # needs the brotli package; otherwise gzip only
     
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list = ["*"]
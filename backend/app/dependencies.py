@@ -0,0 +1,361 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import cached_property, partial
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from .config import Settings
+from .services.analyzer import CompanyAnalyzer
+from .services.crawler import SiteCrawler
+from .services.database import DatabaseHandler
+from .services.email_generator import EmailGenerator
+from .services.few_shot import FewShotSelector
+from .services.idempotency import IdempotencyKeys
+from .services.job_queue import AnalysisJobQueue
+from .services.llm_cache import LLMResponseCache
+from .services.llm_client import LLMClient
+from .services.metrics import STARTUP_SECONDS
+from .services.parse_pool import ParsePool
+from .services.prompt_builder import PromptBuilder
+from .services.rate_limiter import SharedRateLimiter
+from .services.scraper import WebScraper
+from .services.shared_store import SharedStore, create_shared_store
+from .services.similarity import AnalysisIndex
+from .services.single_flight import SingleFlight
+from .services.write_buffer import CollectionDurability
+
+logger = logging.getLogger(__name__)
+
+# Seconds a readiness check may wait on MongoDB or Groq
+READY_CHECK_TIMEOUT = 3.0
+
+# How far back each similarity-index refresh looks, to tolerate clock skew between hosts
+INDEX_REFRESH_OVERLAP = timedelta(seconds=60)
+EPOCH = datetime(1970, 1, 1)
+
+
+class Services:
+    """The per-worker service singletons, each created on first use.
+
+    Building one doesn't open connections or touch the event loop, so the
+    app module imports quickly and is safe to load before workers fork. The
+    app's lifespan calls ``start`` in each worker (indexes, HTTP pool, job
+    workers, similarity index) and ``close`` on shutdown, closing only what was
+    actually created. There is one Motor client (``db``), one Groq gateway
+    (``llm_client``) and one scraping connection pool (``scraper``) per
+    worker, shared by every request; heavy HTML parsing can go to a
+    ``parse_pool`` of processes. State that must be consistent across
+    workers (LLM responses, Groq quota, idempotency keys) lives in
+    ``shared_store``.
+
+    ``process_job`` runs one batch-job URL and is called as
+    ``process_job(services, url, custom_notes, scrape_slot)`` and holds the
+    ``scrape_slot`` context manager while it fetches the site;
+    ``mongo_client`` replaces the Motor client (tests and benchmarks pass a
+    mock).
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        process_job: Callable[["Services", str, Optional[str], AsyncContextManager], Awaitable[str]],
+        mongo_client=None
+    ):
+        self.settings = settings
+        self.process_job = process_job
+        self.mongo_client = mongo_client
+        self.startup_timings: Dict[str, float] = {}
+        self._index_loader: Optional[asyncio.Task] = None
+
+    @cached_property
+    def db(self) -> DatabaseHandler:
+        settings = self.settings
+        db = DatabaseHandler(settings.MONGODB_URL, durability={
+            name: CollectionDurability(
+                write_behind=name in settings.DB_WRITE_BEHIND_COLLECTIONS,
+                write_concern=settings.DB_WRITE_CONCERNS.get(name, "acknowledged"),
+                max_batch=settings.DB_WRITE_BEHIND_MAX_BATCH,
+                flush_interval=settings.DB_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS
+            )
+            for name in set(settings.DB_WRITE_BEHIND_COLLECTIONS) | set(settings.DB_WRITE_CONCERNS)
+        }, client=self.mongo_client)
+        db.analysis_index = self.analysis_index
+        return db
+
+    @cached_property
+    def shared_store(self) -> SharedStore:
+        return create_shared_store(
+            self.settings.SHARED_STORE_BACKEND,
+            mongo_collection=self.db.db.shared_store,
+            sqlite_path=self.settings.SHARED_STORE_SQLITE_PATH
+        )
+
+    @cached_property
+    def rate_limiter(self) -> Optional[SharedRateLimiter]:
+        settings = self.settings
+        if not (settings.GROQ_REQUESTS_PER_MINUTE or settings.GROQ_TOKENS_PER_MINUTE or settings.GROQ_RATE_LIMITS):
+            return None
+        return SharedRateLimiter(
+            self.shared_store,
+            requests_per_minute=settings.GROQ_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.GROQ_TOKENS_PER_MINUTE,
+            limits=settings.GROQ_RATE_LIMITS,
+            burst_seconds=settings.GROQ_RATE_LIMIT_BURST_SECONDS
+        )
+
+    @cached_property
+    def idempotency_keys(self) -> IdempotencyKeys:
+        return IdempotencyKeys(
+            self.shared_store,
+            ttl_seconds=self.settings.IDEMPOTENCY_TTL_SECONDS,
+            lease_seconds=self.settings.IDEMPOTENCY_LEASE_SECONDS,
+            wait_seconds=self.settings.IDEMPOTENCY_WAIT_SECONDS
+        )
+
+    @cached_property
+    def analysis_flight(self) -> SingleFlight:
+        return SingleFlight("analyze_website")
+
+    @cached_property
+    def email_flight(self) -> SingleFlight:
+        return SingleFlight("generate_email")
+
+    @cached_property
+    def llm_cache(self) -> Optional[LLMResponseCache]:
+        if not self.settings.LLM_CACHE_ENABLED:
+            return None
+        return LLMResponseCache(
+            store=self.shared_store,
+            max_entries=self.settings.LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=self.settings.LLM_CACHE_TTL_SECONDS
+        )
+
+    @cached_property
+    def llm_client(self) -> LLMClient:
+        settings = self.settings
+        return LLMClient(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+            cache=self.llm_cache,
+            model=settings.GROQ_MODEL,
+            fallback_model=settings.GROQ_FALLBACK_MODEL or None,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+            retry_max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+            hedge_delay=settings.LLM_HEDGE_DELAY_SECONDS,
+            circuit_failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            circuit_reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS,
+            json_mode=settings.LLM_JSON_MODE,
+            rate_limiter=self.rate_limiter
+        )
+
+    @cached_property
+    def parse_pool(self) -> Optional[ParsePool]:
+        settings = self.settings
+        if settings.SCRAPER_PARSE_POOL == "off":
+            return None
+        return ParsePool(
+            kind=settings.SCRAPER_PARSE_POOL,
+            workers=settings.SCRAPER_PARSE_WORKERS,
+            max_pending=settings.SCRAPER_PARSE_MAX_PENDING
+        )
+
+    @cached_property
+    def scraper(self) -> WebScraper:
+        settings = self.settings
+        scraper = WebScraper(
+            max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCRAPER_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.SCRAPER_KEEPALIVE_EXPIRY_SECONDS,
+            http2=settings.SCRAPER_HTTP2,
+            timeout=settings.SCRAPER_TIMEOUT_SECONDS,
+            cache_freshness_seconds=settings.SCRAPER_CACHE_FRESHNESS_SECONDS,
+            cache_max_entries=settings.SCRAPER_CACHE_MAX_ENTRIES,
+            extraction_backend=settings.SCRAPER_EXTRACTION_BACKEND,
+            max_bytes=settings.SCRAPER_MAX_BYTES,
+            max_content_chars=settings.SCRAPER_MAX_CONTENT_CHARS,
+            content_types=settings.SCRAPER_CONTENT_TYPES,
+            parse_pool=self.parse_pool
+        )
+        scraper.crawler = SiteCrawler(
+            scraper,
+            max_pages=settings.CRAWL_MAX_PAGES,
+            max_depth=settings.CRAWL_MAX_DEPTH,
+            max_bytes=settings.CRAWL_MAX_BYTES,
+            concurrency=settings.CRAWL_CONCURRENCY,
+            time_budget=settings.CRAWL_TIME_BUDGET_SECONDS
+        )
+        return scraper
+
+    @cached_property
+    def analysis_index(self) -> Optional[AnalysisIndex]:
+        if not self.settings.SIMILARITY_INDEX_ENABLED:
+            return None
+        return AnalysisIndex(dimensions=self.settings.SIMILARITY_DIMENSIONS)
+
+    @cached_property
+    def prompt_builder(self) -> PromptBuilder:
+        return PromptBuilder(
+            model=self.settings.GROQ_MODEL,
+            content_token_budget=self.settings.PROMPT_CONTENT_TOKEN_BUDGET
+        )
+
+    @cached_property
+    def analyzer(self) -> CompanyAnalyzer:
+        settings = self.settings
+        few_shot = FewShotSelector(
+            self.analysis_index,
+            self.db,
+            examples=settings.ANALYSIS_FEW_SHOT_EXAMPLES,
+            min_similarity=settings.ANALYSIS_FEW_SHOT_MIN_SIMILARITY
+        ) if settings.ANALYSIS_FEW_SHOT_ENABLED and self.analysis_index is not None else None
+        return CompanyAnalyzer(
+            self.llm_client,
+            self.prompt_builder,
+            few_shot=few_shot,
+            few_shot_model=settings.ANALYSIS_FEW_SHOT_MODEL
+        )
+
+    @cached_property
+    def email_generator(self) -> EmailGenerator:
+        return EmailGenerator(self.llm_client, self.prompt_builder)
+
+    @cached_property
+    def job_queue(self) -> AnalysisJobQueue:
+        settings = self.settings
+        return AnalysisJobQueue(
+            self.db,
+            partial(self.process_job, self),
+            workers=settings.BATCH_WORKERS,
+            per_domain_concurrency=settings.BATCH_PER_DOMAIN_CONCURRENCY,
+            domain_delay=settings.BATCH_DOMAIN_DELAY_SECONDS,
+            max_retries=settings.BATCH_MAX_RETRIES,
+            retry_base_delay=settings.BATCH_RETRY_BASE_DELAY_SECONDS,
+            heartbeat_interval=settings.BATCH_HEARTBEAT_SECONDS,
+            stale_after=settings.BATCH_STALE_SECONDS
+        )
+
+    def created(self, name: str) -> bool:
+        """Whether the ``name`` service has been built yet."""
+        return name in self.__dict__
+
+    @asynccontextmanager
+    async def _startup_step(self, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            logger.error(f"Startup step {step} failed: {str(e)}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.startup_timings[step] = round(elapsed * 1000, 1)
+            STARTUP_SECONDS.observe(elapsed, step=step)
+
+    async def start(self) -> None:
+        """Per-worker startup; each step is timed into ``startup_timings`` (ms)."""
+        start = time.perf_counter()
+        async with self._startup_step("mongo_indexes"):
+            await self.db.ensure_indexes()
+        # Always needed: idempotency keys live there too
+        async with self._startup_step("shared_store_indexes"):
+            await self.shared_store.ensure_indexes()
+        async with self._startup_step("http_pool"):
+            await self.scraper.start()
+        if self.parse_pool is not None:
+            async with self._startup_step("parse_pool"):
+                await self.parse_pool.start(self.scraper.extractor.name)
+        async with self._startup_step("job_queue"):
+            await self.job_queue.start()
+        if self.analysis_index is not None:
+            # In the background: startup shouldn't wait on a full collection scan
+            self._index_loader = asyncio.create_task(self._load_analysis_index())
+        elapsed = time.perf_counter() - start
+        self.startup_timings["total"] = round(elapsed * 1000, 1)
+        STARTUP_SECONDS.observe(elapsed, step="total")
+        logger.info(f"Startup finished in {elapsed * 1000:.0f}ms: {self.startup_timings}")
+
+    async def _load_analysis_index(self) -> None:
+        newest = None
+        async with self._startup_step("similarity_index"):
+            newest = await self.analysis_index.load(self.db.db.analyses)
+        interval = self.settings.SIMILARITY_REFRESH_SECONDS
+        # Other workers' saves only reach this worker's index through MongoDB
+        while interval > 0:
+            await asyncio.sleep(interval)
+            try:
+                if not self.analysis_index.ready:
+                    since = None  # the initial load failed; retry it
+                elif newest is None:
+                    since = EPOCH
+                else:
+                    since = newest - INDEX_REFRESH_OVERLAP
+                newest = await self.analysis_index.load(self.db.db.analyses, since=since) or newest
+            except Exception as e:
+                logger.warning(f"Similarity index refresh failed: {str(e)}")
+
+    async def close(self) -> None:
+        if self._index_loader is not None:
+            self._index_loader.cancel()
+        if self.created("job_queue"):
+            await self.job_queue.stop()
+        # After the job queue so writes from cancelled jobs are flushed too
+        if self.created("db"):
+            await self.db.close()
+        if self.created("scraper"):
+            await self.scraper.close()
+        if self.created("parse_pool") and self.parse_pool is not None:
+            await self.parse_pool.close()
+        if self.created("llm_client"):
+            await self.llm_client.close()
+        if self.created("shared_store"):
+            await self.shared_store.close()
+
+    async def check_ready(self) -> Dict[str, Dict]:
+        """Check MongoDB and the Groq gateway concurrently; each result has an ``ok`` flag."""
+        async def check_mongo() -> Dict:
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.db.ping(), timeout=READY_CHECK_TIMEOUT)
+            except asyncio.TimeoutError:
+                return {"ok": False, "error": f"ping timed out after {READY_CHECK_TIMEOUT}s"}
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+        mongo, llm = await asyncio.gather(check_mongo(), self.llm_client.check_ready(READY_CHECK_TIMEOUT))
+        return {"mongo": mongo, "llm": llm}
+
+
+# FastAPI dependencies
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+
+def get_db(services: Services = Depends(get_services)) -> DatabaseHandler:
+    return services.db
+
+
+def get_scraper(services: Services = Depends(get_services)) -> WebScraper:
+    return services.scraper
+
+
+def get_email_generator(services: Services = Depends(get_services)) -> EmailGenerator:
+    return services.email_generator
+
+
+def get_job_queue(services: Services = Depends(get_services)) -> AnalysisJobQueue:
+    return services.job_queue
+
+
+def get_analysis_index(services: Services = Depends(get_services)) -> AnalysisIndex:
+    if services.analysis_index is None:
+        raise HTTPException(status_code=503, detail="Similarity search is disabled")
+    return services.analysis_index
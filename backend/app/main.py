@@ -1,24 +1,72 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict
-from datetime import datetime
+from typing import AsyncContextManager, Optional, Dict, List, Tuple, Awaitable, TypeVar
+from itertools import product
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
+import json
 import logging
+import os
+import time
 
 from .config import get_settings
+from .dependencies import (
+    Services,
+    get_analysis_index,
+    get_db,
+    get_email_generator,
+    get_job_queue,
+    get_scraper,
+    get_services
+)
 from .services.scraper import WebScraper
-from .services.analyzer import CompanyAnalyzer
 from .services.email_generator import EmailGenerator
 from .services.database import DatabaseHandler
+from .services.similarity import AnalysisIndex
+from .services.job_queue import AnalysisJobQueue
+from .services.dedup import canonicalize_url, content_fingerprint, notes_fingerprint
+from .services.export import MEDIA_TYPES, export_stream, parse_fields
+from .services.compression import CompressionMiddleware
+from .services.idempotency import request_hash
+from .services.responses import FastJSONResponse, parse_response_fields, select_fields
+from .services.metrics import (
+    CACHE_REQUESTS,
+    ERRORS,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    REGISTRY,
+    server_timing_header,
+    stage_timer,
+    start_request_timings
+)
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and start this worker's services; close them on shutdown.
+
+    Tests and benchmarks may install their own ``app.state.services`` first.
+    """
+    services = getattr(app.state, "services", None) or Services(settings, process_job_url)
+    app.state.services = services
+    await services.start()
+    try:
+        yield
+    finally:
+        await services.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -28,18 +76,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# Initialize components
-scraper = WebScraper()
-analyzer = CompanyAnalyzer()
-email_generator = EmailGenerator()
-db = DatabaseHandler(settings.MONGODB_URL)
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+        brotli_enabled=settings.RESPONSE_BROTLI_ENABLED
+    )
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count and time every request and report its pipeline stages as Server-Timing."""
+    timings = start_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # For SSE endpoints this covers only the stages run before streaming starts
+        response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - start)
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=path)
+        if status >= 500:
+            ERRORS.inc(component="http")
 
 # Request Models
 class WebsiteAnalysisRequest(BaseModel):
     url: str
     custom_notes: Optional[str] = None
+    force_refresh: bool = False
+    crawl: bool = False
 
 class BusinessInfo(BaseModel):
     company_name: str
@@ -51,137 +125,710 @@ class EmailGenerationRequest(BaseModel):
     target_persona: Optional[str] = "decision maker"
     tone: Optional[str] = "professional"
 
+class EmailVariantsRequest(BaseModel):
+    business_info: BusinessInfo
+    target_personas: List[str] = ["decision maker"]
+    tones: List[str] = ["professional"]
+
+class AnalysisJobRequest(BaseModel):
+    urls: List[str]
+    custom_notes: Optional[str] = None
+
+# Upper bound on tone x persona combinations per variants request
+MAX_EMAIL_VARIANTS = 12
+
 # Custom Exception
 class WebsiteAnalysisError(Exception):
     """Base exception for website analysis errors"""
     pass
 
+T = TypeVar("T")
+
+# How often to check whether the client is still connected while LLM work runs
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# How often the job progress stream re-reads the job document
+JOB_EVENTS_POLL_INTERVAL = 1.0
+
+async def run_until_disconnected(http_request: Request, work: Awaitable[T]) -> T:
+    """Await ``work``, cancelling it if the HTTP client disconnects first."""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {http_request.url.path}")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, as stored in ``created_at``, for a query parameter that may carry an offset."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def load_analysis_and_opportunity(db: DatabaseHandler, analysis_id: str, user_business: Dict):
+    """Fetch the analysis and any stored opportunity analysis for it concurrently.
+
+    The opportunity lookup only needs the ids, so it overlaps the analysis read
+    instead of waiting for it. An opportunity built from an earlier version of
+    the analysis (before a re-analysis of the URL) is not returned.
+    """
+    with stage_timer("generate_email", "load"):
+        analysis, stored = await asyncio.gather(
+            db.get_analysis(analysis_id),
+            db.get_opportunity(analysis_id, user_business)
+        )
+    opportunity = None
+    if analysis and stored and stored.get("analysis_version") == db.analysis_version(analysis):
+        opportunity = stored["opportunity"]
+    CACHE_REQUESTS.inc(cache="opportunity", result="hit" if opportunity else "miss")
+    return analysis, opportunity
+
+async def create_opportunity(
+    services: Services,
+    analysis_id: str,
+    analysis: Dict,
+    user_business: Dict
+) -> Dict:
+    """Run the opportunity analysis and store it for reuse by later tone/persona variants."""
+    with stage_timer("generate_email", "opportunity"):
+        opportunity = await services.email_generator.analyze_opportunity(analysis["analysis"], user_business)
+    with stage_timer("generate_email", "save_opportunity"):
+        await services.db.save_opportunity(
+            analysis_id, user_business, opportunity, services.db.analysis_version(analysis)
+        )
+    return opportunity
+
 # API Endpoints
 @app.get("/health")
-async def health_check():
+async def health_check(services: Services = Depends(get_services)):
+    """Liveness: reports in-process state only and never calls MongoDB or Groq."""
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "groq_api_key_set": bool(settings.GROQ_API_KEY)
+        "worker_pid": os.getpid(),
+        "groq_api_key_set": bool(services.settings.GROQ_API_KEY),
+        "startup": services.startup_timings,
+        "llm_cache": services.llm_cache.stats() if services.llm_cache is not None else None,
+        "llm_circuits": services.llm_client.circuit_states(),
+        "pending_writes": services.db.writes.stats(),
+        "similarity_index": services.analysis_index.stats() if services.analysis_index is not None else None,
+        "prompt_tokens": services.prompt_builder.stats(),
+        "parse_pool": services.parse_pool.stats() if services.parse_pool is not None else None,
+        "in_flight": {
+            "analyze_website": services.analysis_flight.stats(),
+            "generate_email": services.email_flight.stats()
+        }
     }
 
-@app.post("/api/v1/analyze-website")
-async def analyze_website(request: WebsiteAnalysisRequest):
+@app.get("/ready")
+async def readiness_check(services: Services = Depends(get_services)):
+    """Readiness: 200 once MongoDB answers a ping and a Groq model is reachable, 503 otherwise."""
+    checks = await services.check_ready()
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "timestamp": datetime.utcnow().isoformat(),
+            "checks": checks
+        }
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def run_analysis_pipeline(
+    services: Services,
+    url: str,
+    custom_notes: Optional[str] = None,
+    force_refresh: bool = False,
+    crawl: bool = False,
+    scrape_slot: Optional[AsyncContextManager] = None
+) -> Tuple[str, Dict, Dict, bool]:
+    """Scrape, analyze and store one website.
+
+    Returns (analysis_id, website_data, analysis, reused). When the site's
+    canonical URL already has an analysis built from the same content and
+    notes, that analysis is returned (``reused``) without calling Groq, unless
+    ``force_refresh`` is set. ``crawl`` also merges in the site's key pages
+    (about, pricing, products, customers) before analysis.
+
+    Concurrent calls for the same canonical URL with the same notes and flags
+    (double clicks, overlapping batch jobs) share a single run. ``scrape_slot``
+    (a batch job's per-domain throttle) is held while the site is fetched
+    only, not during analysis.
+    """
     try:
-        # Scrape website
-        try:
-            website_data = await scraper.scrape_website(request.url)
-        except Exception as e:
-            logger.error(f"Scraping failed for URL {request.url}: {str(e)}")
-            raise WebsiteAnalysisError(f"Failed to scrape website: {str(e)}")
-        
-        # Analyze company
-        try:
-            analysis = analyzer.analyze_company(website_data, request.custom_notes)
-        except Exception as e:
-            logger.error(f"Analysis failed for URL {request.url}: {str(e)}")
-            raise WebsiteAnalysisError(f"Failed to analyze company data: {str(e)}")
-        
-        # Save to database
+        canonical_url = canonicalize_url(url)
+    except ValueError:  # e.g. a non-numeric port
+        raise WebsiteAnalysisError(f"Failed to scrape website: Invalid URL format: {url}")
+    key = f"{canonical_url}|{request_hash(custom_notes, force_refresh, crawl)}"
+    return await services.analysis_flight.do(
+        key,
+        lambda: analyze_and_store(services, url, custom_notes, force_refresh, crawl, scrape_slot)
+    )
+
+async def analyze_and_store(
+    services: Services,
+    url: str,
+    custom_notes: Optional[str],
+    force_refresh: bool,
+    crawl: bool,
+    scrape_slot: Optional[AsyncContextManager] = None
+) -> Tuple[str, Dict, Dict, bool]:
+    # Scrape website
+    try:
+        async with scrape_slot or nullcontext():
+            with stage_timer("analyze_website", "scrape"):
+                website_data = await services.scraper.scrape_website(url, crawl=crawl, force_refresh=force_refresh)
+    except Exception as e:
+        logger.error(f"Scraping failed for URL {url}: {str(e)}")
+        raise WebsiteAnalysisError(f"Failed to scrape website: {str(e)}")
+
+    canonical_url = canonicalize_url(website_data.get('final_url') or url)
+    fingerprint = content_fingerprint(website_data.get('main_content', ''), custom_notes)
+    notes_key = notes_fingerprint(custom_notes)
+
+    # Reuse the stored analysis if the content hasn't changed
+    if not force_refresh:
         try:
-            analysis_id = await db.save_analysis(request.url, website_data, analysis)
+            with stage_timer("analyze_website", "dedup_lookup"):
+                existing = await services.db.find_analysis_by_canonical_url(canonical_url, notes_key)
         except Exception as e:
-            logger.error(f"Database save failed for URL {request.url}: {str(e)}")
-            raise WebsiteAnalysisError(f"Failed to save analysis: {str(e)}")
-        
+            logger.warning(f"Existing analysis lookup failed for URL {url}: {str(e)}")
+            existing = None
+        reusable = bool(existing and existing.get("content_fingerprint") == fingerprint)
+        CACHE_REQUESTS.inc(cache="analysis", result="hit" if reusable else "miss")
+        if reusable:
+            return existing["_id"], existing["website_data"], existing["analysis"], True
+    
+    # Analyze company
+    try:
+        with stage_timer("analyze_website", "analyze"):
+            analysis = await services.analyzer.analyze_company(website_data, custom_notes, use_cache=not force_refresh)
+    except HTTPException as e:
+        logger.error(f"Analysis failed for URL {url}: {e.detail}")
+        raise WebsiteAnalysisError(f"Failed to analyze company data: {e.detail}")
+    except Exception as e:
+        logger.error(f"Analysis failed for URL {url}: {str(e)}")
+        raise WebsiteAnalysisError(f"Failed to analyze company data: {str(e)}")
+    
+    # Save to database
+    try:
+        with stage_timer("analyze_website", "save"):
+            analysis_id = await services.db.save_analysis(
+                url,
+                website_data,
+                analysis,
+                canonical_url=canonical_url,
+                content_fingerprint=fingerprint,
+                notes_fingerprint=notes_key
+            )
+    except Exception as e:
+        logger.error(f"Database save failed for URL {url}: {str(e)}")
+        raise WebsiteAnalysisError(f"Failed to save analysis: {str(e)}")
+
+    return analysis_id, website_data, analysis, False
+
+async def process_job_url(
+    services: Services,
+    url: str,
+    custom_notes: Optional[str],
+    scrape_slot: Optional[AsyncContextManager] = None
+) -> str:
+    analysis_id, _, _, _ = await run_analysis_pipeline(services, url, custom_notes, scrape_slot=scrape_slot)
+    return analysis_id
+
+@app.post("/api/v1/analyze-website")
+async def analyze_website(
+    request: WebsiteAnalysisRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None),
+    services: Services = Depends(get_services)
+):
+    """Scrape and analyze ``request.url``.
+
+    ``fields`` (comma-separated dotted paths such as
+    ``analysis,website_data.title``) limits the returned ``website_data`` and
+    ``analysis`` to those fields; by default both are returned whole.
+    """
+    try:
+        selected = parse_response_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def analyze() -> Dict:
+        analysis_id, website_data, analysis, reused = await run_until_disconnected(
+            http_request,
+            run_analysis_pipeline(services, request.url, request.custom_notes, request.force_refresh, request.crawl)
+        )
         return {
             "status": "success",
             "analysis_id": analysis_id,
             "website_data": website_data,
-            "analysis": analysis
+            "analysis": analysis,
+            "reused": reused
         }
+
+    try:
+        body, replayed = await services.idempotency_keys.run(
+            "analyze_website", idempotency_key, request_hash(request.dict()), analyze
+        )
+        if selected:
+            body = {
+                "status": body["status"],
+                "analysis_id": body["analysis_id"],
+                **select_fields({"website_data": body["website_data"], "analysis": body["analysis"]}, selected),
+                "reused": body["reused"]
+            }
+        return FastJSONResponse(body, headers={"Idempotent-Replayed": "true"} if replayed else None)
     except WebsiteAnalysisError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Unexpected error during website analysis: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error occurred")
 
+@app.post("/api/v1/analysis-jobs")
+async def submit_analysis_job(
+    request: AnalysisJobRequest,
+    services: Services = Depends(get_services),
+    scraper: WebScraper = Depends(get_scraper),
+    job_queue: AnalysisJobQueue = Depends(get_job_queue)
+):
+    max_urls = services.settings.BATCH_MAX_URLS
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="At least one URL is required")
+    if len(request.urls) > max_urls:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many URLs ({len(request.urls)}), maximum is {max_urls}"
+        )
+    invalid = [url for url in request.urls if not scraper.is_valid_url(url)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid URL format: {', '.join(invalid[:10])}")
 
-@app.get("/api/v1/analyses")
-async def list_analyses():
     try:
-        analyses = await db.list_analyses()
+        job_id = await job_queue.submit(request.urls, request.custom_notes)
         return {
             "status": "success",
-            "analyses": analyses
+            "job_id": job_id,
+            "total": len(request.urls)
         }
     except Exception as e:
+        logger.error(f"Failed to submit analysis job: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/analyses/{analysis_id}")
-async def get_analysis_by_id(analysis_id: str):
+@app.get("/api/v1/analysis-jobs/{job_id}")
+async def get_analysis_job(job_id: str, include_items: bool = True, db: DatabaseHandler = Depends(get_db)):
+    job = await db.get_analysis_job(job_id, include_items=include_items)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "job": job
+    }
+
+@app.get("/api/v1/analysis-jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str, http_request: Request, db: DatabaseHandler = Depends(get_db)):
+    job = await db.get_analysis_job(job_id, include_items=False)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_progress = None
+        while not await http_request.is_disconnected():
+            job = await db.get_analysis_job(job_id, include_items=False)
+            if job is None:
+                return
+            progress = {
+                "status": job["status"],
+                "total": job["total"],
+                "completed": job["completed"],
+                "failed": job["failed"]
+            }
+            if progress != last_progress:
+                event = "complete" if job["status"] == "completed" else "progress"
+                yield sse_event(event, progress)
+                last_progress = progress
+            if job["status"] == "completed":
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/api/v1/analyses")
+async def list_analyses(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: DatabaseHandler = Depends(get_db)
+):
+    """One page of analyses, newest first: summaries, or the comma-separated dotted ``fields``."""
     try:
+        analyses, next_cursor = await db.list_analyses(
+            limit=limit, cursor=cursor, fields=parse_response_fields(fields)
+        )
+        return FastJSONResponse({
+            "status": "success",
+            "analyses": analyses,
+            "next_cursor": next_cursor
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def similarity_results(db: DatabaseHandler, hits: List[Tuple[str, float]]) -> List[Dict]:
+    with stage_timer("similarity", "load"):
+        summaries = await db.get_analysis_summaries([analysis_id for analysis_id, _ in hits])
+    scores = dict(hits)
+    for summary in summaries:
+        summary["score"] = round(scores[summary["_id"]], 4)
+    return summaries
+
+@app.get("/api/v1/analyses/search")
+async def search_analyses(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(10, ge=1, le=100),
+    index: AnalysisIndex = Depends(get_analysis_index),
+    db: DatabaseHandler = Depends(get_db)
+):
+    """Analyses whose industry, offering, audience and pain points best match ``q``."""
+    with stage_timer("similarity", "search"):
+        hits = index.search(q, limit)
+    return {
+        "status": "success",
+        "results": await similarity_results(db, hits),
+        "index_ready": index.ready
+    }
+
+@app.get("/api/v1/analyses/{analysis_id}/similar")
+async def similar_analyses(
+    analysis_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    index: AnalysisIndex = Depends(get_analysis_index),
+    db: DatabaseHandler = Depends(get_db)
+):
+    """Analyses of the companies most like ``analysis_id``'s."""
+    analysis = None
+    if index.vector(analysis_id) is None:
         analysis = await db.get_analysis(analysis_id)
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
+    with stage_timer("similarity", "search"):
+        hits = index.similar(analysis_id, analysis.get("analysis") if analysis else None, limit)
+    return {
+        "status": "success",
+        "results": await similarity_results(db, hits),
+        "index_ready": index.ready
+    }
+
+@app.get("/api/v1/analyses/{analysis_id}")
+async def get_analysis_by_id(
+    analysis_id: str,
+    fields: Optional[str] = None,
+    db: DatabaseHandler = Depends(get_db)
+):
+    """The stored analysis; only the comma-separated dotted ``fields`` (and ``_id``) if given."""
+    try:
+        selected = parse_response_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        analysis = await db.get_analysis(analysis_id, selected)
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        if selected:
+            analysis = {"_id": analysis["_id"], **select_fields(analysis, selected)}
         
-        return {
+        return FastJSONResponse({
             "status": "success",
             "analysis": analysis
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
+@app.get("/api/v1/export/{collection}")
+async def export_collection(
+    collection: str = Path(..., pattern="^(analyses|emails)$"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    after: Optional[str] = None,
+    analysis_id: Optional[str] = None,
+    db: DatabaseHandler = Depends(get_db)
+):
+    """Stream every analysis or email as NDJSON or CSV, oldest first.
+
+    ``fields`` is a comma-separated list of (dotted) fields, ``created_after``
+    / ``created_before`` bound ``created_at``, and ``after`` is the
+    ``resume_token`` of the last row received, to continue an interrupted or
+    incremental export. ``analysis_id`` limits an emails export to one analysis.
+    """
+    try:
+        selected = parse_fields(collection, fields)
+        docs = db.iter_export(
+            collection,
+            selected,
+            created_after=as_utc(created_after),
+            created_before=as_utc(created_before),
+            after=after,
+            analysis_id=analysis_id if collection == "emails" else None
+        )
+        # Surface a bad resume token as a 400 before the response starts
+        db.export_query(after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def stream():
+        try:
+            async for chunk in export_stream(docs, collection, selected, format):
+                yield chunk
+        except Exception as e:
+            # Too late for an error status: re-raising aborts the connection, so the
+            # client sees a truncated transfer and resumes from its last resume_token
+            ERRORS.inc(component="export")
+            logger.error(f"Export of {collection} failed: {str(e)}")
+            raise
+
+    filename = f"{collection}-{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.get("/api/v1/emails/{analysis_id}")
-async def list_emails(analysis_id: str):
+async def list_emails(
+    analysis_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    db: DatabaseHandler = Depends(get_db)
+):
     try:
-        emails = await db.get_emails(analysis_id)
-        if not emails:
-            return {
-                "status": "success",
-                "emails": []
-            }
+        emails, next_cursor = await db.get_emails(
+            analysis_id,
+            limit=limit,
+            cursor=cursor,
+            descending=order == "desc"
+        )
         return {
             "status": "success",
-            "emails": emails
+            "emails": emails,
+            "next_cursor": next_cursor
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching emails: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/generate-email/{analysis_id}")
-async def generate_email(analysis_id: str, request: EmailGenerationRequest):
-    try:
-        # Get analysis from database
-        analysis = await db.get_analysis(analysis_id)
+async def generate_email(
+    analysis_id: str,
+    request: EmailGenerationRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    services: Services = Depends(get_services),
+    email_generator: EmailGenerator = Depends(get_email_generator)
+):
+    db = services.db
+    user_business = request.business_info.dict()
+
+    async def generate() -> Dict:
+        # Get analysis and any stored opportunity analysis from database
+        analysis, opportunity = await load_analysis_and_opportunity(services.db, analysis_id, user_business)
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
-        
+
         # Generate emails
-        emails = email_generator.generate_email(
-            company_analysis=analysis["analysis"],
-            user_business={
-                "company_name": request.business_info.company_name,
-                "business_type": request.business_info.business_type,
-                "product_description": request.business_info.product_description
-            },
-            target_persona=request.target_persona,
-            tone=request.tone
-        )
-        
+        stored = opportunity or await create_opportunity(services, analysis_id, analysis, user_business)
+        with stage_timer("generate_email", "emails"):
+            emails = await email_generator.generate_email(
+                company_analysis=analysis["analysis"],
+                user_business=user_business,
+                target_persona=request.target_persona,
+                tone=request.tone,
+                opportunity_analysis=stored
+            )
+
         # Save emails to database with business info
         email_data = {
             "emails": emails,
-            "business_info": request.business_info.dict(),
+            "business_info": user_business,
             "target_persona": request.target_persona,
             "tone": request.tone
         }
-        email_id = await db.save_email(analysis_id, email_data)
-        
+        with stage_timer("generate_email", "save"):
+            email_id = await db.save_email(analysis_id, email_data)
+
         return {
             "status": "success",
             "email_id": email_id,
             "emails": emails
         }
+
+    try:
+        # Identical concurrent requests share one generation (and one stored document)
+        fingerprint = request_hash(analysis_id, request.dict())
+        body, replayed = await services.idempotency_keys.run(
+            "generate_email",
+            idempotency_key,
+            fingerprint,
+            lambda: run_until_disconnected(http_request, services.email_flight.do(fingerprint, generate))
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"Error generating email: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/generate-email/{analysis_id}/stream")
+async def generate_email_stream(
+    analysis_id: str,
+    request: EmailGenerationRequest,
+    services: Services = Depends(get_services),
+    email_generator: EmailGenerator = Depends(get_email_generator)
+):
+    """Server-Sent Events variant of generate-email.
+
+    Emits ``opportunity`` once the opportunity analysis is ready, ``token``
+    events while the emails are generated (``variant`` is the index of the
+    email being written), ``emails`` with the parsed result and finally
+    ``done`` with the persisted ``email_id``. Failures end the stream with an
+    ``error`` event.
+    """
+    user_business = request.business_info.dict()
+    analysis, opportunity = await load_analysis_and_opportunity(services.db, analysis_id, user_business)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    async def event_stream():
+        try:
+            stored = opportunity or await create_opportunity(services, analysis_id, analysis, user_business)
+            yield sse_event("opportunity", stored)
+
+            content = ""
+            async for delta in email_generator.stream_emails(
+                company_analysis=analysis["analysis"],
+                user_business=user_business,
+                opportunity=stored,
+                tone=request.tone,
+                target_persona=request.target_persona
+            ):
+                content += delta
+                variant = max(content.count('"subject"') - 1, 0)
+                yield sse_event("token", {"variant": variant, "text": delta})
+
+            emails = email_generator.parse_emails(content)
+            yield sse_event("emails", emails)
+
+            email_id = await services.db.save_email(analysis_id, {
+                "emails": emails,
+                "business_info": user_business,
+                "target_persona": request.target_persona,
+                "tone": request.tone
+            })
+            yield sse_event("done", {"email_id": email_id})
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Error streaming email generation: {detail}")
+            yield sse_event("error", {"detail": detail})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/api/v1/generate-email/{analysis_id}/variants")
+async def generate_email_variants(
+    analysis_id: str,
+    request: EmailVariantsRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    services: Services = Depends(get_services),
+    email_generator: EmailGenerator = Depends(get_email_generator)
+):
+    db = services.db
+    variants = list(product(request.tones, request.target_personas))
+    if not variants:
+        raise HTTPException(status_code=400, detail="At least one tone and one target persona are required")
+    if len(variants) > MAX_EMAIL_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many variants requested ({len(variants)}), maximum is {MAX_EMAIL_VARIANTS}"
+        )
+    user_business = request.business_info.dict()
+
+    async def generate() -> Dict:
+        analysis, opportunity = await load_analysis_and_opportunity(services.db, analysis_id, user_business)
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+
+        stored = opportunity or await create_opportunity(services, analysis_id, analysis, user_business)
+        results = await email_generator.generate_email_variants(
+            company_analysis=analysis["analysis"],
+            user_business=user_business,
+            variants=variants,
+            opportunity_analysis=stored
+        )
+
+        async def save_variant(tone: str, target_persona: str, emails) -> Dict:
+            if isinstance(emails, Exception):
+                detail = emails.detail if isinstance(emails, HTTPException) else str(emails)
+                logger.error(f"Variant generation failed ({tone}, {target_persona}): {detail}")
+                return {"tone": tone, "target_persona": target_persona, "error": detail}
+            email_id = await db.save_email(analysis_id, {
+                "emails": emails,
+                "business_info": user_business,
+                "target_persona": target_persona,
+                "tone": tone
+            })
+            return {"tone": tone, "target_persona": target_persona, "email_id": email_id, "emails": emails}
+
+        saved = await asyncio.gather(
+            *(save_variant(tone, persona, emails) for (tone, persona), emails in zip(variants, results))
+        )
+
+        return {
+            "status": "success",
+            "opportunity_analysis": stored,
+            "variants": saved
+        }
+
+    try:
+        fingerprint = request_hash(analysis_id, "variants", request.dict())
+        body, replayed = await services.idempotency_keys.run(
+            "generate_email_variants",
+            idempotency_key,
+            fingerprint,
+            lambda: run_until_disconnected(http_request, services.email_flight.do(fingerprint, generate))
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error generating email variants: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,67 +1,170 @@
 # File: backend/app/services/analyzer.py
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from fastapi import HTTPException
 import json
-from groq import Groq
-import os
+import logging
+
+from .few_shot import FewShotSelector
+from .llm_client import LLMClient
+from .metrics import ANALYSIS_PROMPTS, ERRORS
+from .prompt_builder import PromptBuilder
+from .structured_output import CompanyAnalysis
+
+ANALYSIS_TEMPLATE = {
+    "industry": "Industry name and description",
+    "market_position": "Analysis of market position",
+    "products_services": ["Product/Service 1", "Product/Service 2"],
+    "target_audience": "Description of target audience",
+    "unique_selling_points": ["USP 1", "USP 2"],
+    "brand_voice": "Analysis of brand voice and tone",
+    "customer_pain_points": ["Pain point 1", "Pain point 2"],
+    "competitors": ["Competitor 1", "Competitor 2"],
+    "sales_approach": "Recommended sales approach"
+}
+
+SYSTEM_PROMPT = "You are an expert business analyst. Analyze the provided website data and extract key business insights."
 
 class CompanyAnalyzer:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    """Turns scraped website data into a ``CompanyAnalysis``.
+
+    With a ``few_shot`` selector, companies similar to ones we've already
+    analyzed are sent to ``few_shot_model`` (normally a smaller, cheaper
+    model) with the closest stored analyses as examples; everything else
+    uses the default model with the plain prompt.
+    """
 
-    def analyze_company(self, website_data: Dict, custom_notes: Optional[str] = None) -> Dict:
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        prompt_builder: Optional[PromptBuilder] = None,
+        few_shot: Optional[FewShotSelector] = None,
+        few_shot_model: Optional[str] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.llm = llm_client
+        self.prompts = prompt_builder or PromptBuilder()
+        self.few_shot = few_shot
+        self.few_shot_model = few_shot_model
+
+    async def analyze_company(
+        self,
+        website_data: Dict,
+        custom_notes: Optional[str] = None,
+        use_cache: bool = True,
+        few_shot: bool = True
+    ) -> Dict:
+        """Analyze one website; ``few_shot=False`` forces the single-shot prompt."""
         try:
+            title = website_data.get('title', '')
+            description = website_data.get('meta_description', '')
             content_for_analysis = {
-                'title': website_data.get('title', ''),
-                'description': website_data.get('meta_description', ''),
-                'content': website_data.get('main_content', '')[:5000],
+                'title': title,
+                'description': description,
+                'content': self.prompts.fit_content(
+                    website_data.get('main_content', ''),
+                    hints=[title, description]
+                ),
                 'social_links': website_data.get('social_links', []),
                 'contact_info': website_data.get('contact_info', {})
             }
             
+            examples = None
+            if few_shot and self.few_shot is not None:
+                # Best effort: without examples the single-shot prompt is used
+                try:
+                    examples = await self.few_shot.select(website_data)
+                except Exception as e:
+                    ERRORS.inc(component="analyzer.few_shot")
+                    self.logger.warning(f"Few-shot example lookup failed, using the single-shot prompt: {str(e)}")
+            if examples:
+                ANALYSIS_PROMPTS.inc(mode="few_shot")
+                messages = self._few_shot_messages(content_for_analysis, custom_notes, examples)
+                self.prompts.record(
+                    "analysis_few_shot",
+                    self.prompts.count_tokens(self._baseline_prompt(website_data, custom_notes)),
+                    self.prompts.count_message_tokens(messages)
+                )
+                return await self.llm.complete_json(
+                    messages=messages,
+                    schema=CompanyAnalysis,
+                    model=self.few_shot_model,
+                    temperature=0.7,
+                    max_tokens=2000,
+                    use_cache=use_cache,
+                    call_site="analysis_few_shot"
+                )
+
+            ANALYSIS_PROMPTS.inc(mode="single_shot")
             prompt = self._create_analysis_prompt(content_for_analysis, custom_notes)
+            self.prompts.record(
+                "analysis",
+                self.prompts.count_tokens(self._baseline_prompt(website_data, custom_notes)),
+                self.prompts.count_tokens(prompt)
+            )
             
-            response = self.client.chat.completions.create(
-                model="mixtral-8x7b-32768",
+            return await self.llm.complete_json(
                 messages=[{
                     "role": "system",
-                    "content": "You are an expert business analyst. Analyze the provided website data and extract key business insights."
+                    "content": SYSTEM_PROMPT
                 }, {
                     "role": "user",
                     "content": prompt
                 }],
+                schema=CompanyAnalysis,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                use_cache=use_cache,
+                call_site="analysis"
             )
             
-            result = response.choices[0].message.content
-            return json.loads(result)
-            
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
     def _create_analysis_prompt(self, website_data: Dict, custom_notes: Optional[str]) -> str:
-        analysis_template = {
-            "industry": "Industry name and description",
-            "market_position": "Analysis of market position",
-            "products_services": ["Product/Service 1", "Product/Service 2"],
-            "target_audience": "Description of target audience",
-            "unique_selling_points": ["USP 1", "USP 2"],
-            "brand_voice": "Analysis of brand voice and tone",
-            "customer_pain_points": ["Pain point 1", "Pain point 2"],
-            "competitors": ["Competitor 1", "Competitor 2"],
-            "sales_approach": "Recommended sales approach"
+        return (
+            "Analyze this company website data and provide insights in a structured JSON format.\n\n"
+            f"Website Data:\n{self.prompts.dumps(website_data)}\n\n"
+            f"Additional Notes:\n{custom_notes if custom_notes else 'No additional notes provided'}\n\n"
+            f"Return your analysis in this exact JSON format:\n{self.prompts.dumps(ANALYSIS_TEMPLATE)}"
+        )
+
+    def _few_shot_messages(self, website_data: Dict, custom_notes: Optional[str], examples: List[Dict]) -> List[Dict]:
+        """Template in the system message, then one user/assistant pair per example."""
+        messages = [{
+            "role": "system",
+            "content": f"{SYSTEM_PROMPT} Reply with only JSON in this exact format:\n{self.prompts.dumps(ANALYSIS_TEMPLATE)}"
+        }]
+        for example in examples:
+            messages.append({"role": "user", "content": f"Website Data:\n{self.prompts.dumps(example['input'])}"})
+            messages.append({"role": "assistant", "content": self.prompts.dumps(example["analysis"])})
+        messages.append({
+            "role": "user",
+            "content": (
+                f"Website Data:\n{self.prompts.dumps(website_data)}\n\n"
+                f"Additional Notes:\n{custom_notes if custom_notes else 'No additional notes provided'}"
+            )
+        })
+        return messages
+
+    def _baseline_prompt(self, website_data: Dict, custom_notes: Optional[str]) -> str:
+        """The pre-compaction prompt (5000-char cut, indented JSON), used to report savings."""
+        content_for_analysis = {
+            'title': website_data.get('title', ''),
+            'description': website_data.get('meta_description', ''),
+            'content': website_data.get('main_content', '')[:5000],
+            'social_links': website_data.get('social_links', []),
+            'contact_info': website_data.get('contact_info', {})
         }
-        
         return f"""
         Analyze this company website data and provide insights in a structured JSON format.
         
         Website Data:
-        {json.dumps(website_data, indent=2)}
+        {json.dumps(content_for_analysis, indent=2)}
         
         Additional Notes:
         {custom_notes if custom_notes else 'No additional notes provided'}
         
         Return your analysis in this exact JSON format:
-        {json.dumps(analysis_template, indent=2)}
+        {json.dumps(ANALYSIS_TEMPLATE, indent=2)}
         """
+
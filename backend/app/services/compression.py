@@ -0,0 +1,141 @@
+# File: backend/app/services/compression.py
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import RESPONSE_COMPRESSION
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; clients then get gzip
+    brotli = None
+
+# Never compressed: event streams must reach the client as each event is sent
+EXCLUDED_MEDIA_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str, brotli_enabled: bool = True) -> Optional[str]:
+    """``br`` or ``gzip``, whichever the client accepts (brotli first), or None.
+
+    ``*`` stands for any coding the header doesn't name, so ``br;q=0, *``
+    still rules out brotli.
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        params = params.strip()
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        weights[name.strip()] = q
+
+    def accepts(coding: str) -> bool:
+        return weights.get(coding, weights.get("*", 0.0)) > 0
+
+    if brotli is not None and brotli_enabled and accepts("br"):
+        return "br"
+    if accepts("gzip"):
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        """Compress the next chunk; every chunk is flushed so streamed rows reach the client."""
+        if self.encoding == "br":
+            return self._brotli.process(body) + (self._brotli.flush() if more_body else self._brotli.finish())
+        return self._zlib.compress(body) + self._zlib.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Compresses responses of at least ``minimum_size`` bytes with brotli or gzip.
+
+    Brotli (when the ``brotli`` package is installed) is preferred over
+    gzip if the client accepts both. Smaller single-message responses are
+    sent as they are: below about a kilobyte compression saves less than
+    it costs. Streamed responses (exports) are compressed chunk by chunk;
+    server-sent events and responses that already have a
+    ``Content-Encoding`` are left alone.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        brotli_enabled: bool = True
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.brotli_enabled)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = "content-encoding" in headers or media_type in EXCLUDED_MEDIA_TYPES \
+                    or message["status"] in (204, 206, 304)
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until the first body shows whether to compress
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                compressed = compressor.compress(body, more_body)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(compressed))
+                    RESPONSE_COMPRESSION.inc(encoding=encoding)
+                await send(start)
+                start = None
+                await send({**message, "body": compressed})
+                return
+            await send({**message, "body": compressor.compress(body, more_body)})
+            if not more_body:
+                RESPONSE_COMPRESSION.inc(encoding=encoding)
+
+        await self.app(scope, receive, send_compressed)
+
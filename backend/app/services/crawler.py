@@ -0,0 +1,217 @@
+# File: backend/app/services/crawler.py
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+
+# Paths that say the most about what a company sells and to whom
+PRIMARY_PATH_WORDS = ['about', 'pricing', 'products', 'product', 'customers']
+SECONDARY_PATH_WORDS = [
+    'solutions', 'services', 'platform', 'features', 'company', 'team',
+    'case-studies', 'industries', 'why', 'integrations'
+]
+# Paths that rarely help the analysis
+SKIPPED_PATH_WORDS = [
+    'login', 'signin', 'signup', 'register', 'cart', 'checkout', 'account',
+    'privacy', 'terms', 'legal', 'cookie', 'careers', 'jobs', 'tag', 'author'
+]
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.mp4',
+    '.mp3', '.mov', '.css', '.js', '.xml', '.json', '.ico', '.woff', '.woff2'
+)
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def site_host(url: str) -> str:
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+class SiteCrawler:
+    """Follows same-site links from a landing page to enrich the analysis.
+
+    Candidate links are scored so /about, /pricing, /products and /customers
+    are fetched first, robots.txt is honoured, and the crawl is bounded by
+    depth, page count, downloaded bytes and a wall-clock budget; whatever has
+    been fetched when the budget runs out is used. Pages are fetched
+    concurrently through the scraper's pooled client and its page cache.
+    """
+
+    def __init__(
+        self,
+        scraper,
+        max_pages: int = 5,
+        max_depth: int = 1,
+        max_bytes: int = 2_000_000,
+        concurrency: int = 4,
+        time_budget: float = 8.0,
+        robots_ttl: float = 3600.0
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.time_budget = time_budget
+        self.robots_ttl = robots_ttl
+        self._robots: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+
+    async def crawl(self, root: Dict, force_refresh: bool = False) -> Dict:
+        """Merge the landing page ``root`` (from ``fetch_page``) with its best linked pages.
+
+        ``force_refresh`` is passed on to ``fetch_page`` for the linked pages.
+        """
+        deadline = time.monotonic() + self.time_budget
+        root_url = root['final_url']
+        host = site_host(root_url)
+        pages = [root]
+        visited: Set[str] = {urldefrag(root_url)[0].rstrip('/')}
+        downloaded = root.get('bytes', 0)
+        frontier = root.get('links', [])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        for depth in range(1, self.max_depth + 1):
+            remaining = self.max_pages - len(pages)
+            if remaining <= 0 or downloaded >= self.max_bytes or time.monotonic() >= deadline:
+                break
+            candidates = await self._rank(frontier, host, visited, depth, deadline)
+            batch = candidates[:remaining]
+            if not batch:
+                break
+            visited.update(url.rstrip('/') for url in batch)
+
+            fetched = await self._fetch_all(batch, semaphore, deadline, downloaded, force_refresh)
+            frontier = []
+            for page in fetched:
+                if downloaded >= self.max_bytes:
+                    break
+                downloaded += page.get('bytes', 0)
+                pages.append(page)
+                frontier.extend(page.get('links', []))
+
+        return self._merge(pages)
+
+    async def _fetch_all(
+        self,
+        urls: List[str],
+        semaphore: asyncio.Semaphore,
+        deadline: float,
+        downloaded: int = 0,
+        force_refresh: bool = False
+    ) -> List[Dict]:
+        """Fetch ``urls`` until ``deadline``, starting no new fetch once ``max_bytes`` are spent."""
+        async def fetch(url: str) -> Optional[Dict]:
+            nonlocal downloaded
+            async with semaphore:
+                if downloaded >= self.max_bytes:
+                    return None
+                try:
+                    page = await self.scraper.fetch_page(url, force_refresh=force_refresh)
+                except Exception as e:
+                    self.logger.info(f"Skipping crawled page {url}: {str(e)}")
+                    return None
+                downloaded += page.get('bytes', 0)
+                return page
+
+        tasks = [asyncio.ensure_future(fetch(url)) for url in urls]
+        done, pending = await asyncio.wait(tasks, timeout=max(deadline - time.monotonic(), 0))
+        for task in pending:
+            task.cancel()
+        # Keep priority order among the pages that finished in time
+        return [task.result() for task in tasks if task in done and task.result()]
+
+    async def _rank(self, links: List[str], host: str, visited: Set[str], depth: int, deadline: float) -> List[str]:
+        scored: Dict[str, Tuple[float, str]] = {}
+        for link in links:
+            url = urldefrag(link)[0]
+            key = url.rstrip('/')
+            parsed = urlparse(url)
+            if parsed.scheme not in ('http', 'https') or site_host(url) != host or key in visited:
+                continue
+            path = parsed.path.lower()
+            if path.endswith(SKIPPED_EXTENSIONS) or any(word in path for word in SKIPPED_PATH_WORDS):
+                continue
+            score = self._score(path) - depth
+            if key not in scored or score > scored[key][0]:
+                scored[key] = (score, url)
+
+        ranked = sorted(scored.values(), key=lambda item: item[0], reverse=True)
+        allowed = []
+        for _, url in ranked:
+            if await self._allowed(url, deadline):
+                allowed.append(url)
+            if len(allowed) >= self.max_pages:
+                break
+        return allowed
+
+    @staticmethod
+    def _score(path: str) -> float:
+        segments = [segment for segment in path.split('/') if segment]
+        score = 1.0
+        if any(word in segment for segment in segments for word in PRIMARY_PATH_WORDS):
+            score += 10.0
+        elif any(word in segment for segment in segments for word in SECONDARY_PATH_WORDS):
+            score += 5.0
+        # Prefer section landing pages over deep article URLs
+        return score - 0.5 * max(len(segments) - 1, 0)
+
+    async def _allowed(self, url: str, deadline: float) -> bool:
+        """Whether robots.txt lets us fetch ``url``; True if it can't be loaded before ``deadline``."""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        cached = self._robots.get(origin)
+        if cached is None or time.monotonic() - cached[0] > self.robots_ttl:
+            parser = None
+            try:
+                text = await asyncio.wait_for(
+                    self.scraper.fetch_text(f"{origin}/robots.txt"), max(deadline - time.monotonic(), 0)
+                )
+                if text is not None:
+                    parser = RobotFileParser()
+                    parser.parse(text.splitlines())
+            except asyncio.TimeoutError:
+                # Unknown rather than missing: try again on the next crawl
+                self.logger.info(f"Timed out loading robots.txt for {origin}")
+                return True
+            except Exception as e:
+                self.logger.info(f"Could not load robots.txt for {origin}: {str(e)}")
+            cached = (time.monotonic(), parser)
+            self._robots[origin] = cached
+        parser = cached[1]
+        return parser is None or parser.can_fetch('*', url)
+
+    @staticmethod
+    def _merge(pages: List[Dict]) -> Dict:
+        root = pages[0]
+        seen = set()
+        content = []
+        for page in pages:
+            for sentence in SENTENCE_SPLIT.split(page.get('main_content', '')):
+                key = ' '.join(sentence.lower().split())
+                if key and key not in seen:
+                    seen.add(key)
+                    content.append(sentence)
+
+        social_links = []
+        for page in pages:
+            for link in page.get('social_links', []):
+                if link not in social_links:
+                    social_links.append(link)
+
+        contact_info = dict(root.get('contact_info') or {})
+        for page in pages[1:]:
+            for key, value in (page.get('contact_info') or {}).items():
+                if value and not contact_info.get(key):
+                    contact_info[key] = value
+
+        return {
+            **root,
+            'main_content': ' '.join(content),
+            'social_links': social_links,
+            'contact_info': contact_info,
+            'pages': [{'url': page['final_url'], 'title': page.get('title', '')} for page in pages],
+            'bytes': sum(page.get('bytes', 0) for page in pages)
+        }
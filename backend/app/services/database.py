@@ -1,15 +1,196 @@
 # File: backend/app/services/database.py
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from bson import ObjectId
+import base64
+import hashlib
+import json
+
+from .metrics import MongoCommandMetrics
+from .write_buffer import WRITE_CONCERNS, CollectionDurability, WriteBehindBuffer
+
+# Fields returned by the analyses list endpoint; the full scraped content and
+# analysis are only loaded by get_analysis.
+ANALYSIS_SUMMARY_PROJECTION = {
+    "url": 1,
+    "website_data.title": 1,
+    "website_data.meta_description": 1,
+    "website_data.final_url": 1,
+    "analysis.industry": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+def encode_cursor(doc: Dict) -> str:
+    """Opaque keyset cursor for the (created_at, _id) position of ``doc``."""
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def keyset_filter(cursor: Optional[str], descending: bool) -> Dict:
+    """Filter selecting documents strictly after ``cursor`` in (created_at, _id) order."""
+    if not cursor:
+        return {}
+    created_at, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {"created_at": {op: created_at}},
+        {"created_at": created_at, "_id": {op: doc_id}}
+    ]}
 
 class DatabaseHandler:
-    def __init__(self, mongodb_url: str):
-        self.client = AsyncIOMotorClient(mongodb_url)
+    def __init__(
+        self,
+        mongodb_url: str,
+        durability: Optional[Dict[str, CollectionDurability]] = None,
+        client=None
+    ):
+        # ``client`` lets tests and benchmarks pass an existing (or mock) Motor client
+        self.client = client or AsyncIOMotorClient(mongodb_url, event_listeners=[MongoCommandMetrics()])
         self.db = self.client.salesgpt
+        # Per-collection write concern and write-behind settings; collections
+        # not listed use the client defaults and write through.
+        self.durability = durability or {}
+        self.writes = WriteBehindBuffer(self._collection, self.durability)
+        # Optional AnalysisIndex kept current by save_analysis
+        self.analysis_index = None
+
+    def _collection(self, name: str):
+        """``name`` with its configured write concern, for writes."""
+        settings = self.durability.get(name)
+        if settings is None:
+            return self.db[name]
+        return self.db.get_collection(name, write_concern=WRITE_CONCERNS[settings.write_concern])
+
+    async def close(self) -> None:
+        """Flush buffered writes and close the client; call before the event loop shuts down."""
+        await self.writes.close()
+        self.client.close()
+
+    async def ping(self) -> None:
+        """Round-trip to the server; raises if MongoDB is unreachable."""
+        await self.client.admin.command("ping")
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes backing the list and pagination queries."""
+        await self.db.analyses.create_index(
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_at_id"
+        )
+        # One analysis per canonical URL and notes (superseded the URL-only index)
+        try:
+            await self.db.analyses.drop_index("canonical_url_unique")
+        except OperationFailure:
+            pass
+        await self.db.analyses.create_index(
+            [("canonical_url", ASCENDING), ("notes_fingerprint", ASCENDING)],
+            name="canonical_url_notes_unique",
+            unique=True,
+            partialFilterExpression={"canonical_url": {"$exists": True}}
+        )
+        # Incremental similarity-index refreshes in multi-worker deployments
+        await self.db.analyses.create_index("updated_at", name="updated_at")
+        await self.db.emails.create_index(
+            [("analysis_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="analysis_id_created_at_id"
+        )
+        # Exports of every analysis's emails
+        await self.db.emails.create_index(
+            [("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="created_at_id"
+        )
+        # Finding unfinished jobs whose worker stopped sending heartbeats
+        await self.db.analysis_jobs.create_index(
+            [("status", ASCENDING), ("heartbeat_at", ASCENDING)],
+            name="status_heartbeat_at"
+        )
+
+    def analyses_page_query(self, cursor: Optional[str] = None) -> Tuple[Dict, List]:
+        return keyset_filter(cursor, descending=True), [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+    def emails_page_query(self, analysis_id: str, cursor: Optional[str] = None, descending: bool = False) -> Tuple[Dict, List]:
+        direction = DESCENDING if descending else ASCENDING
+        query = {"analysis_id": analysis_id, **keyset_filter(cursor, descending)}
+        return query, [("created_at", direction), ("_id", direction)]
+
+    def export_query(
+        self,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        after: Optional[str] = None,
+        analysis_id: Optional[str] = None
+    ) -> Tuple[Dict, List]:
+        """Filter and oldest-first sort for exports; ``after`` is a resume token (a keyset cursor)."""
+        query = keyset_filter(after, descending=False)
+        created_at = {}
+        if created_after is not None:
+            created_at["$gte"] = created_after
+        if created_before is not None:
+            created_at["$lt"] = created_before
+        if created_at:
+            query = {"$and": [query, {"created_at": created_at}]} if query else {"created_at": created_at}
+        if analysis_id is not None:
+            query["analysis_id"] = analysis_id
+        return query, [("created_at", ASCENDING), ("_id", ASCENDING)]
 
-    async def save_analysis(self, url: str, website_data: Dict, analysis: Dict) -> str:
+    async def iter_export(
+        self,
+        collection: str,
+        fields: List[str],
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        after: Optional[str] = None,
+        analysis_id: Optional[str] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict]:
+        """Stream ``fields`` of every document in ``collection``, oldest first.
+
+        Documents are read from the cursor ``batch_size`` at a time rather
+        than loaded up front. Documents still in the write-behind buffer are
+        exported once flushed; re-analyses update documents in place and keep
+        their position, so an export resumed from a token sees only new ones.
+        """
+        query, sort = self.export_query(created_after, created_before, after, analysis_id)
+        projection = {field: 1 for field in fields}
+        projection["created_at"] = 1  # needed for the resume token
+        cursor = self.db[collection].find(query, projection).sort(sort).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
+    async def save_analysis(
+        self,
+        url: str,
+        website_data: Dict,
+        analysis: Dict,
+        canonical_url: Optional[str] = None,
+        content_fingerprint: Optional[str] = None,
+        notes_fingerprint: Optional[str] = None
+    ) -> str:
+        analysis_id = await self._write_analysis(
+            url, website_data, analysis, canonical_url, content_fingerprint, notes_fingerprint
+        )
+        if self.analysis_index is not None:
+            self.analysis_index.add(analysis_id, analysis)
+        return analysis_id
+
+    async def _write_analysis(
+        self,
+        url: str,
+        website_data: Dict,
+        analysis: Dict,
+        canonical_url: Optional[str],
+        content_fingerprint: Optional[str],
+        notes_fingerprint: Optional[str]
+    ) -> str:
         analysis_doc = {
             "url": url,
             "website_data": website_data,
@@ -18,8 +199,71 @@ class DatabaseHandler:
             "updated_at": datetime.utcnow()
         }
         
-        result = await self.db.analyses.insert_one(analysis_doc)
-        return str(result.inserted_id)
+        if canonical_url is None:
+            if self.writes.enabled("analyses"):
+                analysis_doc["_id"] = ObjectId()
+                await self.writes.insert("analyses", analysis_doc)
+                return str(analysis_doc["_id"])
+            result = await self._collection("analyses").insert_one(analysis_doc)
+            return str(result.inserted_id)
+
+        # One document per canonical URL and notes: re-analyses with the same
+        # notes update it in place so emails keep pointing at the same
+        # analysis_id, while other notes get (and keep) their own document.
+        created_at = analysis_doc.pop("created_at")
+        key = {"canonical_url": canonical_url, "notes_fingerprint": notes_fingerprint}
+        analysis_doc.update(key, content_fingerprint=content_fingerprint)
+        if self.writes.enabled("analyses"):
+            return await self._buffer_analysis_upsert(analysis_doc, key, created_at)
+        for attempt in range(2):
+            try:
+                result = await self._collection("analyses").find_one_and_update(
+                    key,
+                    {"$set": analysis_doc, "$setOnInsert": {"created_at": created_at}},
+                    upsert=True,
+                    projection={"_id": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                return str(result["_id"])
+            except DuplicateKeyError:
+                # A concurrent upsert inserted the document first; retry as an update
+                if attempt:
+                    raise
+
+    async def _buffer_analysis_upsert(self, analysis_doc: Dict, key: Dict, created_at: datetime) -> str:
+        # The id is needed up front, so reuse the stored (or still buffered)
+        # document's id for this canonical URL and notes, else allocate one.
+        same_key = lambda doc: all(doc.get(field) == value for field, value in key.items())
+        existing = self.writes.find_pending("analyses", same_key) \
+            or await self.db.analyses.find_one(key, {"_id": 1, "created_at": 1}) \
+            or self.writes.find_pending("analyses", same_key)  # queued by a concurrent save meanwhile
+        doc_id = existing["_id"] if existing else ObjectId()
+        created_at = existing.get("created_at", created_at) if existing else created_at
+        await self.writes.write(
+            "analyses",
+            UpdateOne(
+                key,
+                {"$set": analysis_doc, "$setOnInsert": {"_id": doc_id, "created_at": created_at}},
+                upsert=True
+            ),
+            doc_id,
+            {**analysis_doc, "_id": doc_id, "created_at": created_at}
+        )
+        return str(doc_id)
+
+    async def find_analysis_by_canonical_url(
+        self,
+        canonical_url: str,
+        notes_fingerprint: Optional[str] = None
+    ) -> Optional[Dict]:
+        """The analysis stored for ``canonical_url`` with the notes hashed to ``notes_fingerprint``."""
+        key = {"canonical_url": canonical_url, "notes_fingerprint": notes_fingerprint}
+        result = self.writes.find_pending(
+            "analyses", lambda doc: all(doc.get(field) == value for field, value in key.items())
+        ) or await self.db.analyses.find_one(key)
+        if result:
+            result["_id"] = str(result["_id"])
+        return result
 
     async def save_email(self, analysis_id: str, emails: Dict) -> str:
         email_doc = {
@@ -28,28 +272,241 @@ class DatabaseHandler:
             "created_at": datetime.utcnow()
         }
         
-        result = await self.db.emails.insert_one(email_doc)
+        if self.writes.enabled("emails"):
+            email_doc["_id"] = ObjectId()
+            await self.writes.insert("emails", email_doc)
+            return str(email_doc["_id"])
+        result = await self._collection("emails").insert_one(email_doc)
         return str(result.inserted_id)
 
-    async def get_analysis(self, analysis_id: str) -> Optional[Dict]:
+    @staticmethod
+    def business_key(business_info: Dict) -> str:
+        payload = json.dumps(business_info, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def analysis_version(analysis: Dict) -> str:
+        """Hash of an analysis's content.
+
+        Re-analyses update the document in place under the same id, so stored
+        opportunities record the version they were built from.
+        """
+        payload = json.dumps(analysis.get("analysis"), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def save_opportunity(
+        self,
+        analysis_id: str,
+        business_info: Dict,
+        opportunity: Dict,
+        analysis_version: Optional[str] = None
+    ) -> str:
+        opportunity_id = f"{analysis_id}:{self.business_key(business_info)}"
+        opportunity_doc = {
+            "_id": opportunity_id,
+            "analysis_id": analysis_id,
+            "analysis_version": analysis_version,
+            "business_info": business_info,
+            "opportunity": opportunity,
+            "created_at": datetime.utcnow()
+        }
+        if self.writes.enabled("opportunities"):
+            await self.writes.write(
+                "opportunities",
+                ReplaceOne({"_id": opportunity_id}, opportunity_doc, upsert=True),
+                opportunity_id,
+                opportunity_doc
+            )
+            return opportunity_id
+        await self._collection("opportunities").replace_one({"_id": opportunity_id}, opportunity_doc, upsert=True)
+        return opportunity_id
+
+    async def get_opportunity(self, analysis_id: str, business_info: Dict) -> Optional[Dict]:
+        """The stored opportunity document; check its ``analysis_version`` before reusing it."""
+        opportunity_id = f"{analysis_id}:{self.business_key(business_info)}"
+        return self.writes.pending("opportunities", opportunity_id) \
+            or await self.db.opportunities.find_one({"_id": opportunity_id})
+
+    async def get_analysis(self, analysis_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """The analysis with ``analysis_id``; only the dotted ``fields`` (and ``_id``) if given.
+
+        A re-analysis still in the write-behind buffer is merged in whole, so
+        callers selecting ``fields`` trim the result themselves.
+        """
         try:
-            result = await self.db.analyses.find_one({"_id": ObjectId(analysis_id)})
+            doc_id = ObjectId(analysis_id)
+            projection = dict.fromkeys(fields, 1) if fields else None
+            result = await self.db.analyses.find_one({"_id": doc_id}, projection)
+            pending = self.writes.pending("analyses", doc_id)
+            if pending:
+                # Buffered re-analyses only carry the updated fields
+                result = {**(result or {}), **pending}
             if result:
                 result["_id"] = str(result["_id"])
             return result
         except Exception:
             return None
 
-    async def get_emails(self, analysis_id: str) -> List[Dict]:
-        cursor = self.db.emails.find({"analysis_id": analysis_id})
-        emails = await cursor.to_list(length=None)
+    async def get_analysis_summaries(self, analysis_ids: List[str]) -> List[Dict]:
+        """Summaries (as in ``list_analyses``) of ``analysis_ids``, in the given order."""
+        return await self.find_analyses(analysis_ids, ANALYSIS_SUMMARY_PROJECTION)
+
+    async def find_analyses(self, analysis_ids: List[str], projection: Optional[Dict] = None) -> List[Dict]:
+        """Analyses with ``analysis_ids``, in the given order.
+
+        Ids that aren't stored (or are still in the write-behind buffer) are skipped.
+        """
+        object_ids = [ObjectId(analysis_id) for analysis_id in analysis_ids if ObjectId.is_valid(analysis_id)]
+        docs = await self.db.analyses.find({"_id": {"$in": object_ids}}, projection) \
+            .to_list(length=len(object_ids))
+        by_id = {str(doc["_id"]): doc for doc in docs}
+        analyses = []
+        for analysis_id in analysis_ids:
+            doc = by_id.get(analysis_id)
+            if doc:
+                doc["_id"] = analysis_id
+                analyses.append(doc)
+        return analyses
+
+    async def get_emails(
+        self,
+        analysis_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        descending: bool = False
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of emails for an analysis plus the cursor for the next page."""
+        query, sort = self.emails_page_query(analysis_id, cursor, descending)
+        emails = await self.db.emails.find(query).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = encode_cursor(emails[limit - 1]) if len(emails) > limit else None
+        emails = emails[:limit]
         for email in emails:
             email["_id"] = str(email["_id"])
-        return emails
+        return emails, next_cursor
+
+    async def list_analyses(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of analyses, newest first, plus the next-page cursor.
 
-    async def list_analyses(self) -> List[Dict]:
-        cursor = self.db.analyses.find().sort("created_at", -1)
-        analyses = await cursor.to_list(length=50)  # Limit to last 50 analyses
+        Each analysis has the summary fields, or the dotted ``fields`` if given.
+        """
+        query, sort = self.analyses_page_query(cursor)
+        projection = {**dict.fromkeys(fields, 1), "created_at": 1} if fields else ANALYSIS_SUMMARY_PROJECTION
+        analyses = await self.db.analyses.find(query, projection) \
+            .sort(sort).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = encode_cursor(analyses[limit - 1]) if len(analyses) > limit else None
+        analyses = analyses[:limit]
         for analysis in analyses:
             analysis["_id"] = str(analysis["_id"])
-        return analyses
\ No newline at end of file
+            if fields and "created_at" not in fields:
+                del analysis["created_at"]  # only fetched for the cursor
+        return analyses, next_cursor
+
+    async def create_analysis_job(
+        self,
+        urls: List[str],
+        custom_notes: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> str:
+        job_doc = {
+            "status": "queued",
+            "owner": owner,
+            "heartbeat_at": datetime.utcnow(),
+            "custom_notes": custom_notes,
+            "total": len(urls),
+            "completed": 0,
+            "failed": 0,
+            "items": [
+                {"url": url, "status": "pending", "attempts": 0, "analysis_id": None, "error": None}
+                for url in urls
+            ],
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+
+        result = await self.db.analysis_jobs.insert_one(job_doc)
+        return str(result.inserted_id)
+
+    async def update_analysis_job_item(self, job_id: str, index: int, **fields) -> None:
+        update = {f"items.{index}.{key}": value for key, value in fields.items()}
+        update["updated_at"] = datetime.utcnow()
+        await self.db.analysis_jobs.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {**update, "status": "running"}}
+        )
+
+    async def finish_analysis_job_item(
+        self,
+        job_id: str,
+        index: int,
+        analysis_id: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> Dict:
+        """Record the outcome of one job item and mark the job completed after the last one.
+
+        An item that already has an outcome (run twice after its job was
+        recovered) is not counted again.
+        """
+        counter = "failed" if error else "completed"
+        job = await self.db.analysis_jobs.find_one_and_update(
+            {"_id": ObjectId(job_id), f"items.{index}.status": {"$nin": ["done", "failed"]}},
+            {
+                "$set": {
+                    f"items.{index}.status": "failed" if error else "done",
+                    f"items.{index}.analysis_id": analysis_id,
+                    f"items.{index}.error": error,
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {counter: 1}
+            },
+            projection={"items": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if job and job["completed"] + job["failed"] >= job["total"]:
+            await self.db.analysis_jobs.update_one(
+                {"_id": ObjectId(job_id)},
+                {"$set": {"status": "completed", "finished_at": datetime.utcnow()}}
+            )
+            job["status"] = "completed"
+        return job
+
+    async def heartbeat_analysis_jobs(self, owner: str) -> None:
+        """Mark ``owner``'s unfinished jobs as still being worked on."""
+        await self.db.analysis_jobs.update_many(
+            {"owner": owner, "status": {"$ne": "completed"}},
+            {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+
+    async def claim_stale_analysis_job(self, owner: str, stale_before: datetime) -> Optional[Dict]:
+        """Take over one unfinished job whose owner stopped heartbeating before ``stale_before``.
+
+        The claim is atomic, so each stale job is recovered by one worker
+        only. ``owner``'s own jobs are never claimed: their items are still
+        queued in its process even if its heartbeats lapsed.
+        """
+        job = await self.db.analysis_jobs.find_one_and_update(
+            {
+                "status": {"$in": ["queued", "running"]},
+                "owner": {"$ne": owner},
+                "$or": [{"heartbeat_at": {"$lt": stale_before}}, {"heartbeat_at": {"$exists": False}}]
+            },
+            {"$set": {"owner": owner, "heartbeat_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            job["_id"] = str(job["_id"])
+        return job
+
+    async def get_analysis_job(self, job_id: str, include_items: bool = True) -> Optional[Dict]:
+        try:
+            projection = None if include_items else {"items": 0}
+            result = await self.db.analysis_jobs.find_one({"_id": ObjectId(job_id)}, projection)
+            if result:
+                result["_id"] = str(result["_id"])
+            return result
+        except Exception:
+            return None
@@ -0,0 +1,50 @@
+# File: backend/app/services/dedup.py
+import hashlib
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# Query parameters that only carry campaign/click tracking
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'ref', '_ga', '_gl'}
+
+def canonical_host(url: str) -> str:
+    """Lower-cased host without ``www.``, with the port unless it is the scheme's default."""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    port = parsed.port
+    if port and not (parsed.scheme == 'http' and port == 80) and not (parsed.scheme == 'https' and port == 443):
+        host = f"{host}:{port}"
+    return host
+
+def canonicalize_url(url: str) -> str:
+    """Reduce a URL to the key we deduplicate analyses on.
+
+    Scheme, ``www.``, default ports, fragments, trailing slashes and tracking
+    parameters are dropped and the remaining query parameters are sorted, so
+    ``https://acme.com``, ``http://www.acme.com/`` and
+    ``https://acme.com/?utm_source=x`` all map to ``acme.com``.
+    """
+    parsed = urlparse(url.strip())
+    host = canonical_host(url)
+
+    path = parsed.path.rstrip('/')
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    canonical = host + path
+    if query:
+        canonical += '?' + urlencode(query)
+    return canonical
+
+def content_fingerprint(main_content: str, custom_notes: Optional[str] = None) -> str:
+    """Hash of the whitespace-normalised scraped content (and notes) that fed an analysis."""
+    normalised = ' '.join((main_content or '').split())
+    payload = normalised + '\x00' + (custom_notes or '')
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def notes_fingerprint(custom_notes: Optional[str] = None) -> str:
+    """Hash of the notes an analysis was asked with; analyses are deduplicated per (URL, notes)."""
+    return hashlib.sha256((custom_notes or '').encode('utf-8')).hexdigest()
@@ -1,26 +1,36 @@
-from typing import Dict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from fastapi import HTTPException
+import asyncio
 import json
-from groq import Groq
-import os
+
+from .llm_client import LLMClient
+from .prompt_builder import PromptBuilder
+from .metrics import LLM_STRUCTURED_OUTPUTS
+from .structured_output import EmailList, OpportunityAnalysis, StructuredOutputError, parse_structured
+
+def indented_dumps(data) -> str:
+    return json.dumps(data, indent=2)
 
 class EmailGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    def __init__(self, llm_client: LLMClient, prompt_builder: Optional[PromptBuilder] = None):
+        self.llm = llm_client
+        self.prompts = prompt_builder or PromptBuilder()
 
-    def generate_email(
+    async def generate_email(
         self,
         company_analysis: Dict,
         user_business: Dict,
         tone: str = "professional",
-        target_persona: str = "decision maker"
+        target_persona: str = "decision maker",
+        opportunity_analysis: Optional[Dict] = None
     ) -> Dict:
         try:
-            # First, analyze the business opportunity
-            opportunity_analysis = self._analyze_opportunity(company_analysis, user_business)
+            # First, analyze the business opportunity (unless a stored one was passed in)
+            if opportunity_analysis is None:
+                opportunity_analysis = await self._analyze_opportunity(company_analysis, user_business)
             
             # Then generate the emails based on the analysis
-            email_response = self._generate_emails(
+            email_response = await self._generate_emails(
                 company_analysis,
                 user_business,
                 opportunity_analysis,
@@ -36,15 +46,74 @@ class EmailGenerator:
                 detail=f"Email generation failed: {str(e)}"
             )
 
-    def _analyze_opportunity(self, company_analysis: Dict, user_business: Dict) -> Dict:
+    async def generate_email_variants(
+        self,
+        company_analysis: Dict,
+        user_business: Dict,
+        variants: List[Tuple[str, str]],
+        opportunity_analysis: Dict
+    ) -> List:
+        """Generate emails for several (tone, target_persona) pairs concurrently.
+
+        All variants share one opportunity analysis. The result list is in the
+        same order as ``variants``; a variant that failed holds its exception.
+        """
+        return await asyncio.gather(
+            *(
+                self.generate_email(
+                    company_analysis,
+                    user_business,
+                    tone=tone,
+                    target_persona=target_persona,
+                    opportunity_analysis=opportunity_analysis
+                )
+                for tone, target_persona in variants
+            ),
+            return_exceptions=True
+        )
+
+    async def analyze_opportunity(self, company_analysis: Dict, user_business: Dict) -> Dict:
+        try:
+            return await self._analyze_opportunity(company_analysis, user_business)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Opportunity analysis failed: {str(e)}"
+            )
+
+    async def _analyze_opportunity(self, company_analysis: Dict, user_business: Dict) -> Dict:
         """Analyze the business opportunity and generate insights."""
-        analysis_prompt = f"""
+        analysis_prompt = self.prompts.compact_whitespace(
+            self._opportunity_prompt(company_analysis, user_business, self.prompts.dumps)
+        )
+        self.prompts.record(
+            "opportunity",
+            self.prompts.count_tokens(self._opportunity_prompt(company_analysis, user_business, indented_dumps)),
+            self.prompts.count_tokens(analysis_prompt)
+        )
+
+        return await self.llm.complete_json(
+            messages=[{
+                "role": "system",
+                "content": "You are an expert business analyst specializing in B2B opportunity analysis."
+            }, {
+                "role": "user",
+                "content": analysis_prompt
+            }],
+            schema=OpportunityAnalysis,
+            temperature=0.7,
+            max_tokens=1000,
+            call_site="opportunity"
+        )
+
+    def _opportunity_prompt(self, company_analysis: Dict, user_business: Dict, dumps: Callable) -> str:
+        return f"""
         You are a business analyst specializing in identifying B2B opportunities.
         
         Analyze how {user_business['company_name']} ({user_business['business_type']}) could provide value to the target company.
         
         Target Company Information:
-        {json.dumps(company_analysis, indent=2)}
+        {dumps(company_analysis)}
         
         Our Offering:
         {user_business['product_description']}
@@ -66,22 +135,43 @@ class EmailGenerator:
         }}
         """
 
-        response = self.client.chat.completions.create(
-            model="mixtral-8x7b-32768",
-            messages=[{
-                "role": "system",
-                "content": "You are an expert business analyst specializing in B2B opportunity analysis."
-            }, {
-                "role": "user",
-                "content": analysis_prompt
-            }],
+    async def stream_emails(
+        self,
+        company_analysis: Dict,
+        user_business: Dict,
+        opportunity: Dict,
+        tone: str = "professional",
+        target_persona: str = "decision maker"
+    ) -> AsyncIterator[str]:
+        """Stream the raw email completion; pass the joined text to ``parse_emails``."""
+        async for delta in self.llm.stream(
+            messages=self._build_email_messages(
+                company_analysis,
+                user_business,
+                opportunity,
+                tone,
+                target_persona
+            ),
             temperature=0.7,
-            max_tokens=1000
-        )
-        
-        return json.loads(response.choices[0].message.content)
+            max_tokens=1000,
+            call_site="emails"
+        ):
+            yield delta
 
-    def _generate_emails(
+    def parse_emails(self, content: str) -> Dict:
+        """Repair and validate a streamed email completion (streams get no follow-up request)."""
+        try:
+            result, repaired = parse_structured(content, EmailList)
+        except StructuredOutputError as e:
+            LLM_STRUCTURED_OUTPUTS.inc(call_site="emails", result="failed")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Invalid JSON in response: {str(e)}"
+            )
+        LLM_STRUCTURED_OUTPUTS.inc(call_site="emails", result="repaired" if repaired else "valid")
+        return result
+
+    async def _generate_emails(
         self,
         company_analysis: Dict,
         user_business: Dict,
@@ -89,11 +179,71 @@ class EmailGenerator:
         tone: str,
         target_persona: str
     ) -> Dict:
-        email_prompt = """
+        try:
+            return await self.llm.complete_json(
+                messages=self._build_email_messages(
+                    company_analysis,
+                    user_business,
+                    opportunity,
+                    tone,
+                    target_persona
+                ),
+                schema=EmailList,
+                temperature=0.7,
+                max_tokens=1000,
+                call_site="emails"
+            )
+                
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Email generation failed: {str(e)}"
+            )
+
+    def _build_email_messages(
+        self,
+        company_analysis: Dict,
+        user_business: Dict,
+        opportunity: Dict,
+        tone: str,
+        target_persona: str
+    ) -> List[Dict]:
+        email_prompt = self.prompts.compact_whitespace(self._email_prompt(
+            company_analysis, user_business, opportunity, tone, target_persona, self.prompts.dumps
+        ))
+        self.prompts.record(
+            "emails",
+            self.prompts.count_tokens(self._email_prompt(
+                company_analysis, user_business, opportunity, tone, target_persona, indented_dumps
+            )),
+            self.prompts.count_tokens(email_prompt)
+        )
+
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert B2B sales copywriter crafting personalized outreach in a " + tone + " tone. Return only valid JSON in the specified format."
+            },
+            {
+                "role": "user",
+                "content": email_prompt
+            }
+        ]
+
+    def _email_prompt(
+        self,
+        company_analysis: Dict,
+        user_business: Dict,
+        opportunity: Dict,
+        tone: str,
+        target_persona: str,
+        dumps: Callable
+    ) -> str:
+        return """
         As an expert B2B sales copywriter, craft three unique email variations based on this analysis:
         
         TARGET COMPANY:
-        """ + json.dumps(company_analysis, indent=2) + """
+        """ + dumps(company_analysis) + """
         
         OUR BUSINESS:
         Company: """ + user_business['company_name'] + """
@@ -101,11 +251,11 @@ class EmailGenerator:
         Offering: """ + user_business['product_description'] + """
         
         OPPORTUNITY ANALYSIS:
-        Pain Points: """ + json.dumps(opportunity['pain_points'], indent=2) + """
-        Benefits: """ + json.dumps(opportunity['benefits'], indent=2) + """
-        Value Metrics: """ + json.dumps(opportunity['value_metrics'], indent=2) + """
-        Competitive Edges: """ + json.dumps(opportunity['competitive_edges'], indent=2) + """
-        Use Cases: """ + json.dumps(opportunity['use_cases'], indent=2) + """
+        Pain Points: """ + dumps(opportunity['pain_points']) + """
+        Benefits: """ + dumps(opportunity['benefits']) + """
+        Value Metrics: """ + dumps(opportunity['value_metrics']) + """
+        Competitive Edges: """ + dumps(opportunity['competitive_edges']) + """
+        Use Cases: """ + dumps(opportunity['use_cases']) + """
         
         TARGET PERSONA: """ + target_persona + """
         TONE: """ + tone + """
@@ -151,44 +301,6 @@ class EmailGenerator:
         ]
         }
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="mixtral-8x7b-32768",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert B2B sales copywriter crafting personalized outreach in a " + tone + " tone. Return only valid JSON in the specified format."
-                    },
-                    {
-                        "role": "user",
-                        "content": email_prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            # Add error handling for JSON parsing
-            try:
-                content = response.choices[0].message.content.strip()
-                # Try to find JSON content if there's any extra text
-                if content.find('{') != -1:
-                    content = content[content.find('{'):content.rfind('}')+1]
-                result = json.loads(content)
-                return result
-            except json.JSONDecodeError as e:
-                print("Failed to parse JSON:", content)  # Debug print
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Invalid JSON in response: {str(e)}"
-                )
-                
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Email generation failed: {str(e)}"
-            )
 
 # # backend/app/services/email_generator.py
 
@@ -0,0 +1,137 @@
+# File: backend/app/services/export.py
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+
+from .database import encode_cursor
+from .metrics import EXPORT_ROWS
+
+# Fields exported when the request doesn't pick any
+DEFAULT_EXPORT_FIELDS = {
+    "analyses": [
+        "url",
+        "canonical_url",
+        "website_data.title",
+        "website_data.meta_description",
+        "website_data.final_url",
+        "analysis",
+        "created_at",
+        "updated_at"
+    ],
+    "emails": [
+        "analysis_id",
+        "emails.business_info",
+        "emails.target_persona",
+        "emails.tone",
+        "emails.emails",
+        "created_at"
+    ]
+}
+
+MAX_EXPORT_FIELDS = 50
+
+# Rows are written out in chunks of about this many characters
+EXPORT_CHUNK_CHARS = 65536
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+def split_fields(fields: str) -> List[str]:
+    """Validated dotted field paths from a comma-separated ``fields`` parameter.
+
+    Paths nested under another requested path are dropped (``analysis``
+    already contains ``analysis.industry``), and so is ``_id``, which is
+    always returned.
+    """
+    requested = [field.strip() for field in fields.split(",") if field.strip() and field.strip() != "_id"]
+    if len(requested) > MAX_EXPORT_FIELDS:
+        raise ValueError(f"At most {MAX_EXPORT_FIELDS} fields can be selected")
+    for field in requested:
+        if not FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field: {field}")
+    selected = []
+    for field in dict.fromkeys(requested):
+        if not any(field.startswith(other + ".") for other in requested):
+            selected.append(field)
+    return selected
+
+
+def parse_fields(collection: str, fields: Optional[str]) -> List[str]:
+    """Fields to export from ``collection``: the requested ones, or its defaults."""
+    if not fields:
+        return list(DEFAULT_EXPORT_FIELDS[collection])
+    return split_fields(fields)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _lookup(doc: Dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _csv_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    return str(value)
+
+
+async def export_stream(
+    docs: AsyncIterator[Dict],
+    collection: str,
+    fields: List[str],
+    format: str = "ndjson"
+) -> AsyncIterator[bytes]:
+    """Encode ``docs`` as NDJSON lines or CSV rows, yielding chunks as the cursor advances.
+
+    Every row carries a ``resume_token``: passing the last one received as
+    ``after`` continues the export from the next document. Only one chunk is
+    held at a time, so memory doesn't grow with the size of the export.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(["_id", *fields, "resume_token"])
+    rows = 0
+    async for doc in docs:
+        token = encode_cursor(doc)
+        if writer is not None:
+            writer.writerow([str(doc["_id"]), *(_csv_cell(_lookup(doc, field)) for field in fields), token])
+        else:
+            if "created_at" not in fields:
+                del doc["created_at"]  # only fetched for the token
+            doc["resume_token"] = token
+            buffer.write(json.dumps(doc, default=_json_default, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if buffer.tell() >= EXPORT_CHUNK_CHARS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            EXPORT_ROWS.inc(rows, collection=collection, format=format)
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+    EXPORT_ROWS.inc(rows, collection=collection, format=format)
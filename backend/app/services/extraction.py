@@ -0,0 +1,368 @@
+# File: backend/app/services/extraction.py
+from bs4 import BeautifulSoup, UnicodeDammit
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+import codecs
+import logging
+import re
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; fall back to BeautifulSoup
+    etree = None
+
+SOCIAL_PATTERNS = ['facebook.com', 'linkedin.com', 'twitter.com', 'instagram.com']
+SKIPPED_TAGS = {'script', 'style', 'nav', 'footer'}
+CONTENT_TAGS = {'main', 'article', 'section', 'div'}
+CONTENT_CLASS_WORDS = ['content', 'main', 'article']
+
+# How much of a streamed document is held back to find its encoding
+SNIFF_BYTES = 1024
+BOMS = [(codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')]
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+def sniff_encoding(head: bytes, declared: Optional[str] = None) -> str:
+    """Encoding of a document from its first bytes: BOM, then ``declared`` (the header charset), then <meta charset>, then UTF-8."""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = META_CHARSET.search(head[:SNIFF_BYTES])
+    for candidate in (declared, match and match.group(1).decode('ascii')):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                pass
+    return 'utf-8'
+
+def clean_text(text: Optional[str]) -> str:
+    return ' '.join(text.split()) if text else ''
+
+class BaseExtractor:
+    """Turns an HTML document into the fields ``WebScraper`` returns.
+
+    Every backend returns the same keys: title, meta_description,
+    main_content, social_links and contact_info, plus ``links`` (every
+    absolute link href on the page, including navigation) for the crawler.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def extract(self, html: str, base_url: str) -> Dict:
+        raise NotImplementedError
+
+    def parser(self, base_url: str, encoding: Optional[str] = None, max_content_chars: int = 0) -> "IncrementalParser":
+        """An incremental parser for a document arriving in byte chunks.
+
+        This default buffers the chunks and extracts on ``close``; backends
+        that can parse as data arrives override it.
+        """
+        return BufferedParser(self, base_url, encoding)
+
+class IncrementalParser:
+    """Accepts a document chunk by chunk; ``close`` returns the extracted fields.
+
+    ``done`` turns true once enough main content has been collected, so the
+    caller can stop downloading.
+    """
+    done = False
+
+    def feed(self, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> Dict:
+        raise NotImplementedError
+
+class BufferedParser(IncrementalParser):
+    def __init__(self, extractor: BaseExtractor, base_url: str, encoding: Optional[str] = None):
+        self.extractor = extractor
+        self.base_url = base_url
+        self.encoding = encoding
+        self._chunks: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+
+    def close(self) -> Dict:
+        # Header charset first, then <meta charset> / BOM / detection
+        html = UnicodeDammit(b''.join(self._chunks), [self.encoding] if self.encoding else []).unicode_markup
+        return self.extractor.extract(html or '', self.base_url)
+
+class SoupExtractor(BaseExtractor):
+    """Original BeautifulSoup/html.parser path; walks the tree once per field."""
+    name = "soup"
+
+    def extract(self, html: str, base_url: str) -> Dict:
+        soup = BeautifulSoup(html, 'html.parser')
+        # Collect crawlable links before _extract_main_content drops nav/footer
+        links = self._find_links(soup, base_url)
+        return {
+            'title': clean_text(soup.title.string) if soup.title else '',
+            'meta_description': self._get_meta_description(soup),
+            'main_content': self._extract_main_content(soup),
+            'social_links': self._find_social_links(soup, base_url),
+            'contact_info': self._extract_contact_info(soup),
+            'links': links
+        }
+
+    def _find_links(self, soup, base_url: str) -> List[str]:
+        try:
+            return [urljoin(base_url, link['href'].strip()) for link in soup.find_all('a', href=True)]
+        except Exception as e:
+            self.logger.warning(f"Error extracting links: {str(e)}")
+            return []
+
+    def _get_meta_description(self, soup) -> str:
+        try:
+            # Try standard meta description
+            meta = soup.find('meta', {'name': ['description', 'Description']})
+            if not meta:
+                # Try OpenGraph and Twitter meta descriptions
+                meta = soup.find('meta', {'property': ['og:description', 'twitter:description']})
+            return clean_text(meta['content']) if meta and 'content' in meta.attrs else ''
+        except Exception as e:
+            self.logger.warning(f"Error extracting meta description: {str(e)}")
+            return ''
+
+    def _extract_main_content(self, soup) -> str:
+        try:
+            # Remove unwanted elements
+            for element in soup(list(SKIPPED_TAGS)):
+                element.decompose()
+
+            content_elements = []
+            main_content = soup.find_all(list(CONTENT_TAGS),
+                                       class_=lambda x: x and any(word in str(x).lower()
+                                       for word in CONTENT_CLASS_WORDS))
+
+            for element in main_content:
+                content_elements.append(clean_text(element.get_text(separator=' ')))
+
+            return ' '.join(content_elements)
+        except Exception as e:
+            self.logger.warning(f"Error extracting main content: {str(e)}")
+            return ''
+
+    def _find_social_links(self, soup, base_url: str) -> List[str]:
+        try:
+            social_links = set()
+
+            for link in soup.find_all('a', href=True):
+                href = link['href']
+                if not href.startswith(('http://', 'https://')):
+                    href = urljoin(base_url, href)
+                if any(pattern in href.lower() for pattern in SOCIAL_PATTERNS):
+                    social_links.add(href)
+
+            return list(social_links)
+        except Exception as e:
+            self.logger.warning(f"Error extracting social links: {str(e)}")
+            return []
+
+    def _extract_contact_info(self, soup) -> Dict:
+        try:
+            contact_info = {
+                'email': None,
+                'phone': None,
+                'address': None
+            }
+
+            email_elements = soup.find_all(string=lambda text: '@' in str(text) if text else False)
+            if email_elements:
+                contact_info['email'] = clean_text(email_elements[0])
+
+            return contact_info
+        except Exception as e:
+            self.logger.warning(f"Error extracting contact info: {str(e)}")
+            return {'email': None, 'phone': None, 'address': None}
+
+class _StreamingTarget:
+    """lxml parser target that collects every field from one stream of events.
+
+    Mirrors ``SoupExtractor``: script/style/nav/footer subtrees are ignored
+    for main content, social links and contact info, and the main content is
+    the text of every content-classed main/article/section/div, in document
+    order (nested matches repeat their text, as ``find_all`` does).
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.meta_fallback: Optional[str] = None
+        self.social_links = set()
+        self.links: List[str] = []
+        self.email: Optional[str] = None
+        self.texts: List[str] = []
+        self.matches: List[List[int]] = []
+        self._stack: List[Optional[int]] = []
+        self._skip_depth = 0
+        self._open_matches = 0
+        self.content_chars = 0
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._pending: List[str] = []
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        if tag == 'a' and 'href' in attrib:
+            self.links.append(urljoin(self.base_url, attrib['href'].strip()))
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = 1
+            return
+
+        match_index = None
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'meta':
+            self._handle_meta(attrib)
+        elif tag == 'a' and 'href' in attrib:
+            self._handle_link(attrib['href'])
+        elif tag in CONTENT_TAGS:
+            classes = (attrib.get('class') or '').lower()
+            if classes and any(word in classes for word in CONTENT_CLASS_WORDS):
+                match_index = len(self.matches)
+                self.matches.append([len(self.texts), -1])
+                self._open_matches += 1
+        self._stack.append(match_index)
+
+    def end(self, tag) -> None:
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts)
+        if self._stack:
+            match_index = self._stack.pop()
+            if match_index is not None:
+                self.matches[match_index][1] = len(self.texts)
+                self._open_matches -= 1
+
+    def data(self, data: str) -> None:
+        if self._in_title:
+            self._title_parts.append(data)
+        if not self._skip_depth:
+            self._pending.append(data)
+
+    def comment(self, text) -> None:
+        self._flush()
+
+    def close(self) -> Dict:
+        self._flush()
+        main_content = []
+        for start, end in self.matches:
+            chunk = self.texts[start:end if end >= 0 else len(self.texts)]
+            main_content.append(clean_text(' '.join(chunk)))
+        return {
+            'title': clean_text(self.title),
+            'meta_description': clean_text(self.meta_description or self.meta_fallback),
+            'main_content': ' '.join(main_content),
+            'social_links': list(self.social_links),
+            'contact_info': {'email': self.email, 'phone': None, 'address': None},
+            'links': self.links
+        }
+
+    def _flush(self) -> None:
+        # lxml may split one text node over several data() calls
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        self._pending = []
+        self.texts.append(text)
+        if self._open_matches:
+            self.content_chars += len(text)
+        if self.email is None and '@' in text:
+            self.email = clean_text(text)
+
+    def _handle_meta(self, attrib) -> None:
+        content = attrib.get('content')
+        if content is None:
+            return
+        if self.meta_description is None and attrib.get('name') in ('description', 'Description'):
+            self.meta_description = content
+        elif self.meta_fallback is None and attrib.get('property') in ('og:description', 'twitter:description'):
+            self.meta_fallback = content
+
+    def _handle_link(self, href: str) -> None:
+        if not href.startswith(('http://', 'https://')):
+            href = urljoin(self.base_url, href)
+        if any(pattern in href.lower() for pattern in SOCIAL_PATTERNS):
+            self.social_links.add(href)
+
+class StreamingExtractor(BaseExtractor):
+    """Single-pass extractor driven by lxml's event-based HTML parser."""
+    name = "streaming"
+
+    def extract(self, html: str, base_url: str) -> Dict:
+        parser = etree.HTMLParser(target=_StreamingTarget(base_url))
+        parser.feed(html)
+        return parser.close()
+
+    def parser(self, base_url: str, encoding: Optional[str] = None, max_content_chars: int = 0) -> IncrementalParser:
+        return _StreamingParser(base_url, encoding, max_content_chars)
+
+class _StreamingParser(IncrementalParser):
+    """Feeds byte chunks straight into lxml; done after ``max_content_chars`` of main content (0: never)."""
+
+    def __init__(self, base_url: str, encoding: Optional[str], max_content_chars: int):
+        self.target = _StreamingTarget(base_url)
+        self.encoding = encoding
+        self.max_content_chars = max_content_chars
+        self.parser = None
+        self._head = b''
+
+    @property
+    def done(self) -> bool:
+        return bool(self.max_content_chars) and self.target.content_chars >= self.max_content_chars
+
+    def feed(self, chunk: bytes) -> None:
+        if self.parser is None:
+            # Hold back the first KB so the encoding can be sniffed from it
+            self._head += chunk
+            if len(self._head) < SNIFF_BYTES:
+                return
+            chunk = self._start()
+        self.parser.feed(chunk)
+
+    def close(self) -> Dict:
+        if self.parser is None:
+            head = self._start()
+            if head:
+                self.parser.feed(head)
+        return self.parser.close()
+
+    def _start(self) -> bytes:
+        encoding = sniff_encoding(self._head, self.encoding)
+        self.parser = etree.HTMLParser(target=self.target, encoding=encoding)
+        head, self._head = self._head, b''
+        return head
+
+def lxml_available() -> bool:
+    return etree is not None
+
+def create_extractor(backend: str = "auto") -> BaseExtractor:
+    """Return the extractor for ``backend`` ("auto", "streaming" or "soup").
+
+    "auto" picks the streaming backend when lxml is installed and falls back
+    to BeautifulSoup otherwise.
+    """
+    if backend == "soup":
+        return SoupExtractor()
+    if backend == "streaming":
+        if not lxml_available():
+            raise ImportError("The streaming extraction backend requires lxml")
+        return StreamingExtractor()
+    if backend == "auto":
+        return StreamingExtractor() if lxml_available() else SoupExtractor()
+    raise ValueError(f"Unknown extraction backend: {backend}")
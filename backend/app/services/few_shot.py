@@ -0,0 +1,90 @@
+# File: backend/app/services/few_shot.py
+import logging
+from typing import Dict, List, Optional
+
+from .database import DatabaseHandler
+from .dedup import canonicalize_url
+from .similarity import AnalysisIndex
+
+# Fields of the scraped page used to find similar stored analyses, with weights
+QUERY_FIELDS = (("title", 2.0), ("meta_description", 1.5), ("main_content", 1.0))
+
+# Scraped content considered when matching; the start of a page says what the company does
+QUERY_CONTENT_CHARS = 2000
+
+# Keeps each example short: list fields are cut to this many items, text to this many characters
+EXAMPLE_MAX_ITEMS = 3
+EXAMPLE_MAX_CHARS = 160
+
+EXAMPLE_PROJECTION = {
+    "canonical_url": 1,
+    "website_data.title": 1,
+    "website_data.meta_description": 1,
+    "analysis": 1
+}
+
+
+def _shorten(value):
+    if isinstance(value, list):
+        return [_shorten(item) for item in value[:EXAMPLE_MAX_ITEMS]]
+    if isinstance(value, str) and len(value) > EXAMPLE_MAX_CHARS:
+        return value[:EXAMPLE_MAX_CHARS].rsplit(" ", 1)[0]
+    return value
+
+
+class FewShotSelector:
+    """Picks stored analyses of similar companies to use as few-shot examples.
+
+    The scraped page is vectorized into the same space as ``AnalysisIndex``
+    and its nearest analyses are loaded from MongoDB. Examples are only
+    returned when ``examples`` neighbours all score at least
+    ``min_similarity``, i.e. when we've already analyzed several companies
+    like this one; otherwise the caller should fall back to a plain prompt.
+    """
+
+    def __init__(
+        self,
+        index: AnalysisIndex,
+        db: DatabaseHandler,
+        examples: int = 3,
+        min_similarity: float = 0.3
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.index = index
+        self.db = db
+        self.examples = examples
+        self.min_similarity = min_similarity
+
+    async def select(self, website_data: Dict) -> Optional[List[Dict]]:
+        """Up to ``examples`` ``{"input", "analysis", "score"}`` dicts, or None if too few are close."""
+        parts = [
+            (str(website_data.get(field) or "")[:QUERY_CONTENT_CHARS], weight)
+            for field, weight in QUERY_FIELDS
+        ]
+        vector = self.index.vectorizer.transform(parts)
+        # One spare in case the nearest is a previous analysis of this same site
+        hits = self.index.search_vector(vector, self.examples + 1, min_score=self.min_similarity)
+        if len(hits) < self.examples:
+            return None
+
+        own_url = canonicalize_url(website_data.get("final_url") or website_data.get("url") or "")
+        scores = dict(hits)
+        docs = await self.db.find_analyses([analysis_id for analysis_id, _ in hits], EXAMPLE_PROJECTION)
+        examples = [
+            {
+                "input": {
+                    "title": doc.get("website_data", {}).get("title", ""),
+                    "description": doc.get("website_data", {}).get("meta_description", "")
+                },
+                "analysis": {field: _shorten(value) for field, value in (doc.get("analysis") or {}).items()},
+                "score": scores[doc["_id"]]
+            }
+            for doc in docs
+            if doc.get("canonical_url") != own_url and doc.get("analysis")
+        ][:self.examples]
+        if len(examples) < self.examples:
+            return None
+        self.logger.info(
+            f"Using {len(examples)} few-shot examples (similarity {min(scores.values()):.2f}-{max(scores.values()):.2f})"
+        )
+        return examples
@@ -0,0 +1,126 @@
+# File: backend/app/services/idempotency.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from .metrics import IDEMPOTENCY_REQUESTS
+from .shared_store import SharedStore
+
+# Longest accepted Idempotency-Key header
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(*parts) -> str:
+    """Stable hash of a request's path parameters and JSON body."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyKeys:
+    """Replays stored responses for requests retried with the same ``Idempotency-Key``.
+
+    The first request with a key claims it in the ``SharedStore`` (compare-
+    and-set, so exactly one worker wins), runs, and stores its response for
+    ``ttl_seconds``; a retry with the same key and body gets that response
+    back instead of creating another document. A retry while the first is
+    still running waits up to ``wait_seconds`` for it and then answers 409;
+    reusing a key for a different request answers 422. A claim whose
+    request failed, or whose worker died (no result within
+    ``lease_seconds``), can be claimed again.
+    """
+
+    def __init__(
+        self,
+        store: SharedStore,
+        ttl_seconds: float = 86400,
+        lease_seconds: float = 120.0,
+        wait_seconds: float = 30.0,
+        poll_interval: float = 0.25
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        fingerprint: str,
+        work: Callable[[], Awaitable[Dict]]
+    ) -> Tuple[Dict, bool]:
+        """Run ``work`` once per (``scope``, ``key``); returns (response, replayed).
+
+        Without a key this just runs ``work``. The response is stored as
+        JSON, so replays get its JSON-encoded form.
+        """
+        if not key:
+            return await work(), False
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+        store_key = f"idempotency:{scope}:{key}"
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            record, version = await self.store.get_versioned(store_key)
+            if record is not None and record["state"] != "failed" and record["request_hash"] != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc(scope=scope, result="mismatch")
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if record is not None and record["state"] == "done":
+                IDEMPOTENCY_REQUESTS.inc(scope=scope, result="replayed")
+                return record["response"], True
+            claimable = record is None or record["state"] == "failed" \
+                or time.time() - record["started"] > self.lease_seconds
+            if claimable:
+                claim = {"state": "in_progress", "request_hash": fingerprint, "started": time.time()}
+                if await self.store.compare_and_set(store_key, claim, version, self.ttl_seconds):
+                    break
+                continue  # Another request claimed it first; re-read
+            if time.monotonic() >= deadline:
+                IDEMPOTENCY_REQUESTS.inc(scope=scope, result="in_progress")
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(self.poll_interval)
+
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result="executed")
+        try:
+            response = await work()
+        except BaseException:
+            await self._release(store_key, fingerprint)
+            raise
+        done = {
+            "state": "done",
+            "request_hash": fingerprint,
+            "started": claim["started"],
+            "response": jsonable_encoder(response)
+        }
+        try:
+            await self.store.set(store_key, done, self.ttl_seconds)
+        except Exception as e:
+            # The work is done; a retry after the lease would repeat it, which beats failing this response
+            self.logger.warning(f"Failed to store response for idempotency key {store_key}: {str(e)}")
+        return response, False
+
+    async def _release(self, store_key: str, fingerprint: str) -> None:
+        """Mark a claim failed so a retry can run the request again."""
+        try:
+            await asyncio.shield(self.store.set(
+                store_key,
+                {"state": "failed", "request_hash": fingerprint, "started": 0},
+                self.lease_seconds
+            ))
+        except Exception as e:
+            # The claim then expires after lease_seconds
+            self.logger.warning(f"Failed to release idempotency key {store_key}: {str(e)}")
@@ -0,0 +1,210 @@
+# File: backend/app/services/job_queue.py
+import asyncio
+import logging
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import ConnectionFailure
+
+from .database import DatabaseHandler
+from .dedup import canonical_host
+from .llm_client import LLMClientError, is_retryable
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed job item is worth retrying.
+
+    Timeouts, connection and database outages, Groq 429/5xx and scraper
+    errors marked ``transient`` are; a 404, an invalid URL or unsupported
+    content are not. The pipeline wraps the original error, so the whole
+    exception chain is checked.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        transient = getattr(error, "transient", None)
+        if transient is not None:
+            return transient
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError, ConnectionFailure, LLMClientError)) \
+                or is_retryable(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+class DomainThrottle:
+    """Per-domain politeness: bounded concurrency plus a minimum gap between requests.
+
+    A domain's state is dropped once nobody holds or waits for its slot and
+    its last request is more than ``delay`` ago, so the throttle only
+    tracks the domains currently being fetched.
+    """
+
+    def __init__(self, concurrency: int = 1, delay: float = 1.0):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+        self._last_started: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        domain = canonical_host(url)
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.concurrency))
+        self._users[domain] = self._users.get(domain, 0) + 1
+        try:
+            async with semaphore:
+                wait = self._last_started.get(domain, 0.0) + self.delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_started[domain] = time.monotonic()
+                yield
+        finally:
+            self._users[domain] -= 1
+            if not self._users[domain]:
+                del self._users[domain]
+                del self._semaphores[domain]
+            self._forget_idle()
+
+    def _forget_idle(self) -> None:
+        cutoff = time.monotonic() - self.delay
+        for domain in [domain for domain, started in self._last_started.items() if started <= cutoff]:
+            if domain not in self._users:
+                del self._last_started[domain]
+
+class AnalysisJobQueue:
+    """Background worker pool for bulk website analysis jobs.
+
+    Jobs and per-URL progress live in the ``analysis_jobs`` collection so any
+    worker process can answer polls. ``workers`` caps how many URLs are in
+    flight globally, ``DomainThrottle`` keeps us polite to each site (``process``
+    gets the site's throttle slot and holds it only while scraping), and
+    URLs that failed transiently are re-queued with exponential backoff and
+    jitter, so a backing-off URL never holds a worker; other failures fail
+    the item at once.
+
+    Queued items only live in this process, so every job records its owner
+    and the owner heartbeats its unfinished jobs every ``heartbeat_interval``
+    seconds. A job without a heartbeat for ``stale_after`` seconds (its
+    worker was restarted or died) is claimed by another queue, which
+    re-enqueues the items that hadn't finished.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseHandler,
+        process: Callable[[str, Optional[str], AsyncContextManager], Awaitable[str]],
+        workers: int = 8,
+        per_domain_concurrency: int = 1,
+        domain_delay: float = 1.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 2.0,
+        heartbeat_interval: float = 15.0,
+        stale_after: float = 60.0
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.db = db
+        self.process = process
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = uuid.uuid4().hex
+        self.throttle = DomainThrottle(per_domain_concurrency, domain_delay)
+        self._queue: "asyncio.Queue[Tuple[str, int, str, Optional[str], int]]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, urls: List[str], custom_notes: Optional[str] = None) -> str:
+        job_id = await self.db.create_analysis_job(urls, custom_notes, owner=self.owner)
+        for index, url in enumerate(urls):
+            self._queue.put_nowait((job_id, index, url, custom_notes, 1))
+        return job_id
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def recover(self) -> int:
+        """Claim unfinished jobs whose owner stopped heartbeating and re-enqueue their items.
+
+        Items that were running or retrying when their worker stopped resume
+        with their next attempt; those already out of attempts fail.
+        Returns the number of items re-enqueued.
+        """
+        resumed = 0
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        while True:
+            job = await self.db.claim_stale_analysis_job(self.owner, stale_before)
+            if job is None:
+                return resumed
+            self.logger.info(f"Resuming analysis job {job['_id']} from a stopped worker")
+            for index, item in enumerate(job["items"]):
+                if item["status"] in ("done", "failed"):
+                    continue
+                attempt = item.get("attempts", 0) + 1
+                if attempt > self.max_retries + 1:
+                    await self.db.finish_analysis_job_item(
+                        job["_id"], index, error=item.get("error") or "Interrupted by a worker restart"
+                    )
+                    continue
+                self._queue.put_nowait((job["_id"], index, item["url"], job.get("custom_notes"), attempt))
+                resumed += 1
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                await self.db.heartbeat_analysis_jobs(self.owner)
+                await self.recover()
+            except Exception as e:
+                self.logger.warning(f"Analysis job heartbeat failed: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._run_item(*item)
+            except Exception as e:
+                self.logger.error(f"Job {item[0]} item {item[1]} crashed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_item(
+        self,
+        job_id: str,
+        index: int,
+        url: str,
+        custom_notes: Optional[str],
+        attempt: int
+    ) -> None:
+        await self.db.update_analysis_job_item(job_id, index, status="running", attempts=attempt)
+        try:
+            analysis_id = await self.process(url, custom_notes, self.throttle.slot(url))
+        except Exception as e:
+            self.logger.warning(f"Job {job_id}: attempt {attempt} for {url} failed: {str(e)}")
+            if attempt > self.max_retries or not is_transient(e):
+                await self.db.finish_analysis_job_item(job_id, index, error=str(e))
+                return
+            backoff = self.retry_base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            await self.db.update_analysis_job_item(job_id, index, status="retrying", error=str(e))
+            asyncio.get_running_loop().call_later(
+                backoff,
+                self._queue.put_nowait,
+                (job_id, index, url, custom_notes, attempt + 1)
+            )
+            return
+        await self.db.finish_analysis_job_item(job_id, index, analysis_id=analysis_id)
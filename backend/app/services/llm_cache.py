@@ -0,0 +1,105 @@
+# File: backend/app/services/llm_cache.py
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import CACHE_REQUESTS
+from .shared_store import SharedStore
+
+
+class LLMResponseCache:
+    """Content-addressed cache for chat completion responses.
+
+    Keys are a SHA-256 of model + messages + temperature + max_tokens, so an
+    identical prompt is only paid for once per TTL. Lookups go through an
+    in-process LRU first and then, if a ``store`` is given, the
+    ``SharedStore`` (MongoDB or a local SQLite file) shared by all workers,
+    so a response paid for by one worker is reused by the others.
+    """
+
+    def __init__(self, store: Optional[SharedStore] = None, max_entries: int = 1024, ttl_seconds: int = 86400):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self) -> None:
+        if self.store is not None:
+            await self.store.ensure_indexes()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, content = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                CACHE_REQUESTS.inc(cache="llm", result="memory_hit")
+                return content
+            del self._entries[key]
+
+        if self.store is not None:
+            try:
+                entry = await self.store.get(f"llm:{key}")
+            except Exception as e:
+                self.logger.warning(f"LLM cache lookup failed: {str(e)}")
+                entry = None
+            if entry:
+                self._remember(key, entry["content"], entry["expires_at"] - time.time())
+                self.persistent_hits += 1
+                CACHE_REQUESTS.inc(cache="llm", result="persistent_hit")
+                return entry["content"]
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="llm", result="miss")
+        return None
+
+    async def set(self, key: str, content: str, model: Optional[str] = None) -> None:
+        self._remember(key, content, self.ttl_seconds)
+        if self.store is not None:
+            try:
+                await self.store.set(
+                    f"llm:{key}",
+                    {"content": content, "model": model, "expires_at": time.time() + self.ttl_seconds},
+                    ttl_seconds=self.ttl_seconds
+                )
+            except Exception as e:
+                self.logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+    def _remember(self, key: str, content: str, ttl_seconds: float) -> None:
+        self._entries[key] = (time.time() + ttl_seconds, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
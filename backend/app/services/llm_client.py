@@ -0,0 +1,623 @@
+# File: backend/app/services/llm_client.py
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+import groq
+from groq import AsyncGroq
+from pydantic import BaseModel
+
+from .llm_cache import LLMResponseCache
+from .rate_limiter import SharedRateLimiter, estimate_prompt_tokens
+from .metrics import (
+    ERRORS,
+    LLM_CIRCUIT_REJECTIONS,
+    LLM_FALLBACKS,
+    LLM_HEDGED_REQUESTS,
+    LLM_REQUEST_SECONDS,
+    LLM_RETRIES,
+    LLM_STRUCTURED_OUTPUTS,
+    LLM_TOKENS
+)
+from .structured_output import FIX_JSON_PROMPT, StructuredOutputError, parse_structured
+
+
+# How long a readiness check result is reused, so probes don't spend rate limit
+READY_CHECK_TTL_SECONDS = 30.0
+
+# An attempt gives up this long before the call's deadline, so its timeout is recorded
+ATTEMPT_DEADLINE_MARGIN_SECONDS = 0.05
+
+
+class LLMClientError(Exception):
+    """Custom exception for LLM completion errors"""
+    pass
+
+
+class LLMTimeoutError(LLMClientError):
+    """Raised when a completion does not finish within the per-call timeout"""
+    pass
+
+
+class LLMUnavailableError(LLMClientError):
+    """Raised without calling Groq when every usable model's circuit is open"""
+    pass
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, requests are rejected; once ``reset_timeout`` has passed one
+    trial request is let through per window, and a success closes the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            # Half-open: re-arm so only this caller probes until the next window
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The Retry-After header of a Groq error response, in seconds, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, groq.APIConnectionError):
+        return True
+    return isinstance(error, groq.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+class LLMClient:
+    """Shared async Groq gateway used by every LLM call site.
+
+    Every call site goes through ``complete`` so the event loop is never
+    blocked on a completion, at most ``max_concurrency`` requests are sent to
+    Groq at once, and each call is bounded by ``timeout`` seconds (including
+    the time spent waiting for a free slot and any retries). When a ``cache``
+    is given, identical requests are answered from it without calling Groq.
+
+    Calls without an explicit model use ``model``. Rate limits (429) and
+    server or connection errors are retried with jittered exponential backoff
+    that honours Retry-After; a rate-limited model is avoided for its
+    Retry-After period and requests go to ``fallback_model`` instead. Each
+    Groq request is bounded by ``attempt_timeout``; a request that times out
+    is retried on the fallback model. Each model has a circuit breaker, fed
+    by server errors, connection errors and timeouts, so an outage or a
+    hanging model fails fast. If a completion has
+    not returned after ``hedge_delay`` seconds (0 disables), a duplicate
+    request is sent and the first answer wins.
+
+    ``complete_json`` returns schema-validated JSON, using Groq's JSON mode
+    when ``json_mode`` is set and the model supports it.
+
+    With a ``rate_limiter``, every request to Groq (retries and hedges
+    included) first takes its share of the requests- and tokens-per-minute
+    quota shared by all workers, waiting within the call's timeout.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        attempt_timeout: float = 20.0,
+        cache: Optional[LLMResponseCache] = None,
+        model: str = "mixtral-8x7b-32768",
+        fallback_model: Optional[str] = None,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 20.0,
+        hedge_delay: float = 0.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+        json_mode: bool = True,
+        rate_limiter: Optional[SharedRateLimiter] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        # Retries are handled here, with fallback and circuit breaking
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url or None, max_retries=0)
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.cache = cache
+        self.model = model
+        self.fallback_model = fallback_model if fallback_model != model else None
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_delay = hedge_delay
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_seconds = circuit_reset_seconds
+        self.json_mode = json_mode
+        self.rate_limiter = rate_limiter
+        self._json_mode_unsupported = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._rate_limited_until: Dict[str, float] = {}
+        self._ready_check: Optional[Tuple[float, Dict]] = None
+
+    async def complete(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        call_site: str = "default",
+        json_mode: bool = False,
+        store: bool = True
+    ) -> str:
+        """Run one chat completion and return the message content.
+
+        Cancelling the awaiting task (e.g. because the HTTP client went away)
+        cancels the underlying request and releases the concurrency slot.
+        ``use_cache=False`` skips the cache lookup but still stores the fresh
+        response (unless ``store`` is False). ``call_site`` labels the latency
+        and token metrics; ``json_mode`` requests a JSON object response.
+        """
+        content, _ = await self._complete(
+            messages, model, temperature, max_tokens, timeout, use_cache, call_site, json_mode, store
+        )
+        return content
+
+    async def _complete(
+        self,
+        messages: List[Dict],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float],
+        use_cache: bool,
+        call_site: str,
+        json_mode: bool,
+        store: bool
+    ) -> Tuple[str, str]:
+        """``complete``, returning the content and the model that produced it (the fallback, if used)."""
+        model = model or self.model
+        if self.cache is not None and use_cache:
+            cached = await self.cache.get(self.cache.make_key(model, messages, temperature, max_tokens))
+            if cached is not None:
+                return cached, model
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        try:
+            content, used_model = await asyncio.wait_for(
+                self._complete_with_retries(
+                    messages, model, temperature, max_tokens, call_site, json_mode, deadline
+                ),
+                timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            ERRORS.inc(component="llm.timeout")
+            self.logger.error(f"Completion timed out after {timeout or self.timeout}s (model={model})")
+            raise LLMTimeoutError(f"LLM completion timed out after {timeout or self.timeout}s")
+
+        if self.cache is not None and store:
+            cache_key = self.cache.make_key(used_model, messages, temperature, max_tokens)
+            await self.cache.set(cache_key, content, model=used_model)
+        return content, used_model
+
+    async def complete_json(
+        self,
+        messages: List[Dict],
+        schema: Type[BaseModel],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        call_site: str = "default"
+    ) -> Dict:
+        """Run a completion and return its JSON content validated against ``schema``.
+
+        Malformed output is repaired locally when possible; otherwise one
+        follow-up asks the model to fix its JSON. Only validated results are
+        cached, under the model that produced them. Raises
+        ``StructuredOutputError`` if both attempts fail.
+        """
+        model = model or self.model
+        content, used_model = await self._complete(
+            messages, model, temperature, max_tokens, timeout, use_cache, call_site,
+            json_mode=self.json_mode, store=False
+        )
+        try:
+            result, repaired = parse_structured(content, schema)
+            LLM_STRUCTURED_OUTPUTS.inc(call_site=call_site, result="repaired" if repaired else "valid")
+        except StructuredOutputError as e:
+            self.logger.warning(f"Unusable JSON from {call_site}, asking for a fix: {str(e)}")
+            followup = messages + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": FIX_JSON_PROMPT.format(error=str(e))}
+            ]
+            fixed, used_model = await self._complete(
+                followup, model, 0.0, max_tokens, timeout, False, call_site,
+                json_mode=self.json_mode, store=False
+            )
+            try:
+                result, _ = parse_structured(fixed, schema)
+            except StructuredOutputError:
+                LLM_STRUCTURED_OUTPUTS.inc(call_site=call_site, result="failed")
+                raise
+            LLM_STRUCTURED_OUTPUTS.inc(call_site=call_site, result="followup")
+
+        if self.cache is not None:
+            cache_key = self.cache.make_key(used_model, messages, temperature, max_tokens)
+            await self.cache.set(cache_key, json.dumps(result), model=used_model)
+        return result
+
+    async def stream(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        call_site: str = "default"
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive.
+
+        Shares the concurrency limit, timeout and cache with ``complete``; a
+        cache hit is yielded as a single chunk, and a fully streamed response
+        is written back to the cache. Opening the stream is retried and falls
+        back like ``complete``; it is not hedged, and a stream that fails
+        after the first delta is not retried.
+        """
+        model = model or self.model
+        if self.cache is not None and use_cache:
+            cached = await self.cache.get(self.cache.make_key(model, messages, temperature, max_tokens))
+            if cached is not None:
+                yield cached
+                return
+
+        limit = timeout or self.timeout
+        started = time.monotonic()
+        deadline = started + limit
+        parts: List[str] = []
+        response = None
+        used_model = model
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=limit)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"LLM completion timed out after {limit}s")
+        try:
+            (response, reserved), used_model = await asyncio.wait_for(
+                self._open_stream(messages, model, temperature, max_tokens, deadline),
+                timeout=max(deadline - time.monotonic(), 0.001)
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        chunks.__anext__(),
+                        timeout=max(deadline - time.monotonic(), 0.001)
+                    )
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                # Groq reports usage on the final chunk
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    self._record_usage(x_groq.usage, used_model, call_site)
+                    await self._settle_quota(used_model, reserved, x_groq.usage)
+            LLM_REQUEST_SECONDS.observe(time.monotonic() - started, model=used_model, call_site=call_site)
+        except asyncio.TimeoutError:
+            ERRORS.inc(component="llm.timeout")
+            self.logger.error(f"Streaming completion timed out after {limit}s (model={model})")
+            raise LLMTimeoutError(f"LLM completion timed out after {limit}s")
+        finally:
+            if response is not None:
+                await response.close()
+            self._semaphore.release()
+
+        if self.cache is not None:
+            cache_key = self.cache.make_key(used_model, messages, temperature, max_tokens)
+            await self.cache.set(cache_key, "".join(parts), model=used_model)
+
+    def circuit_states(self) -> Dict[str, str]:
+        return {model: "open" if breaker.is_open else "closed" for model, breaker in self._breakers.items()}
+
+    async def _complete_with_retries(
+        self,
+        messages: List[Dict],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        call_site: str,
+        json_mode: bool = False,
+        deadline: Optional[float] = None
+    ) -> Tuple[str, str]:
+        return await self._with_retries(
+            model,
+            lambda target: self._hedged(messages, target, temperature, max_tokens, call_site, json_mode),
+            deadline
+        )
+
+    async def _open_stream(
+        self,
+        messages: List[Dict],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        deadline: Optional[float] = None
+    ):
+        async def create(target: str):
+            reserved = await self._reserve_quota(target, messages, max_tokens)
+            response = await self.client.chat.completions.create(
+                model=target,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            return response, reserved
+
+        return await self._with_retries(model, create, deadline)
+
+    async def _with_retries(self, model: str, attempt_call, deadline: Optional[float] = None) -> Tuple[object, str]:
+        """Run ``attempt_call(model)`` with retries, fallback and circuit breaking.
+
+        Each attempt is bounded by ``attempt_timeout`` and ends just before
+        ``deadline`` (the call's overall timeout), so a hanging model is
+        recorded as a failure. Returns the result and the model that produced it.
+        """
+        last_error: Optional[Exception] = None
+        timed_out = set()
+        for attempt in range(self.max_retries + 1):
+            target = self._select_model(model, timed_out)
+            breaker = self._breaker(target)
+            limit = self.attempt_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic() - ATTEMPT_DEADLINE_MARGIN_SECONDS
+                if remaining <= 0:
+                    break
+                limit = min(limit, remaining)
+            try:
+                result = await asyncio.wait_for(attempt_call(target), timeout=limit)
+            except Exception as e:
+                if not isinstance(e, asyncio.TimeoutError) and not is_retryable(e):
+                    raise
+                last_error = e
+                retry_after = retry_after_seconds(e)
+                detail = str(e)
+                if isinstance(e, asyncio.TimeoutError):
+                    # A hanging model is an outage too
+                    breaker.record_failure()
+                    timed_out.add(target)
+                    reason = "timeout"
+                    detail = f"no response within {limit:.1f}s"
+                elif isinstance(e, groq.RateLimitError):
+                    # Saturation, not an outage: route around it instead of tripping the breaker
+                    self._rate_limited_until[target] = time.monotonic() + (retry_after or self.retry_base_delay)
+                    reason = "rate_limited"
+                else:
+                    breaker.record_failure()
+                    reason = "server_error" if isinstance(e, groq.APIStatusError) else "connection_error"
+                self.logger.warning(f"Groq request failed (model={target}, attempt {attempt + 1}): {detail}")
+                if attempt == self.max_retries:
+                    break
+                LLM_RETRIES.inc(model=target, reason=reason)
+                fallback = self._fallback_for(model)
+                if reason in ("rate_limited", "timeout") and fallback and target != fallback \
+                        and fallback not in timed_out \
+                        and self._rate_limited_until.get(fallback, 0.0) <= time.monotonic():
+                    # The next attempt goes to the fallback model right away
+                    continue
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            breaker.record_success()
+            return result, target
+        raise last_error or asyncio.TimeoutError()
+
+    def _select_model(self, model: str, timed_out: Iterable[str] = ()) -> str:
+        """``model`` unless it is rate limited, timed out in this call or its circuit is open.
+
+        In those cases the fallback model is used if it is available.
+        """
+        fallback = self._fallback_for(model)
+        now = time.monotonic()
+        if fallback and model in timed_out and fallback not in timed_out \
+                and self._rate_limited_until.get(fallback, 0.0) <= now and self._breaker(fallback).allow():
+            LLM_FALLBACKS.inc(from_model=model, to_model=fallback, reason="timeout")
+            return fallback
+        primary_limited = self._rate_limited_until.get(model, 0.0) > now
+        if fallback and primary_limited and self._rate_limited_until.get(fallback, 0.0) <= now:
+            if self._breaker(fallback).allow():
+                LLM_FALLBACKS.inc(from_model=model, to_model=fallback, reason="rate_limited")
+                return fallback
+        if self._breaker(model).allow():
+            return model
+        if fallback and self._breaker(fallback).allow():
+            LLM_FALLBACKS.inc(from_model=model, to_model=fallback, reason="circuit_open")
+            return fallback
+        LLM_CIRCUIT_REJECTIONS.inc(model=model)
+        ERRORS.inc(component="llm.circuit_open")
+        raise LLMUnavailableError(f"LLM unavailable: circuit open for {model}")
+
+    def _fallback_for(self, model: str) -> Optional[str]:
+        return self.fallback_model if model == self.model else None
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(self.circuit_failure_threshold, self.circuit_reset_seconds)
+            self._breakers[model] = breaker
+        return breaker
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def _hedged(
+        self,
+        messages: List[Dict],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        call_site: str,
+        json_mode: bool = False
+    ) -> str:
+        """``_create``, plus a duplicate request if the first is slower than ``hedge_delay``."""
+        first = asyncio.ensure_future(
+            self._create(messages, model, temperature, max_tokens, call_site, json_mode)
+        )
+        tasks = {first}
+        try:
+            if self.hedge_delay > 0:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+                # Don't add load when every slot is already taken
+                if not done and not self._semaphore.locked():
+                    LLM_HEDGED_REQUESTS.inc(model=model)
+                    tasks.add(asyncio.ensure_future(
+                        self._create(messages, model, temperature, max_tokens, call_site, json_mode)
+                    ))
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _create(
+        self,
+        messages: List[Dict],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        call_site: str = "default",
+        json_mode: bool = False
+    ) -> str:
+        extra = {}
+        if json_mode and model not in self._json_mode_unsupported:
+            extra["response_format"] = {"type": "json_object"}
+        async with self._semaphore:
+            reserved = await self._reserve_quota(model, messages, max_tokens)
+            started = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **extra
+                )
+            except groq.BadRequestError as e:
+                if not extra:
+                    raise
+                error = e.body.get("error", e.body) if isinstance(e.body, dict) else {}
+                if error.get("code") == "json_validate_failed" and error.get("failed_generation"):
+                    # Groq rejected its own invalid JSON; hand it to the repair parser instead
+                    return error["failed_generation"]
+                if "response_format" not in str(e) and "json" not in str(e).lower():
+                    raise
+                self.logger.warning(f"JSON mode not supported by {model}, disabling it: {str(e)}")
+                self._json_mode_unsupported.add(model)
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            LLM_REQUEST_SECONDS.observe(time.monotonic() - started, model=model, call_site=call_site)
+        if response.usage is not None:
+            self._record_usage(response.usage, model, call_site)
+            await self._settle_quota(model, reserved, response.usage)
+        return response.choices[0].message.content
+
+    async def _reserve_quota(self, model: str, messages: List[Dict], max_tokens: int) -> int:
+        """Wait for shared Groq quota for one request; returns the tokens reserved."""
+        if self.rate_limiter is None:
+            return 0
+        try:
+            return await self.rate_limiter.acquire(model, estimate_prompt_tokens(messages) + max_tokens)
+        except Exception as e:
+            # Fail open: Groq's own 429s are still retried if the shared store is down
+            ERRORS.inc(component="llm.rate_limiter")
+            self.logger.warning(f"Shared rate limiter unavailable, sending without it: {str(e)}")
+            return 0
+
+    async def _settle_quota(self, model: str, reserved: int, usage) -> None:
+        if self.rate_limiter is None or not reserved:
+            return
+        used = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+        try:
+            await self.rate_limiter.settle(model, reserved, used)
+        except Exception as e:
+            self.logger.warning(f"Failed to return unused Groq quota: {str(e)}")
+
+    @staticmethod
+    def _record_usage(usage, model: str, call_site: str) -> None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, call_site=call_site, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, call_site=call_site, kind="completion")
+
+    async def check_ready(self, timeout: float = 3.0) -> Dict:
+        """Whether Groq can take requests: a usable circuit and a successful model listing.
+
+        Returns ``{"ok": bool, ...}``. A successful listing is reused for
+        ``READY_CHECK_TTL_SECONDS``; failures are re-checked on the next probe.
+        """
+        usable = [m for m in (self.model, self.fallback_model) if m and not self._breaker(m).is_open]
+        if not usable:
+            return {"ok": False, "error": "circuit open for every model"}
+        now = time.monotonic()
+        if self._ready_check is not None and now - self._ready_check[0] < READY_CHECK_TTL_SECONDS:
+            return self._ready_check[1]
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.client.models.list(), timeout=timeout)
+            result = {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"model listing timed out after {timeout}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        if result["ok"]:
+            self._ready_check = (now, result)
+        return result
+
+    async def close(self) -> None:
+        await self.client.close()
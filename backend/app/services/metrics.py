@@ -0,0 +1,285 @@
+# File: backend/app/services/metrics.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Seconds; spans a cached lookup up to a slow Groq completion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (stage, seconds) pairs for the request being served, reported as Server-Timing
+_stage_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "stage_timings", default=None
+)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """Monotonic counter, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        for key, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {_format_value(values[-1])}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(values[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(values[-1])}"
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text format.
+
+    Kept dependency-free so the service doesn't need prometheus_client; the
+    output can be scraped by Prometheus or any compatible agent.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "salesgpt_http_requests", "HTTP requests by route and status code", ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "salesgpt_http_request_duration_seconds", "HTTP request latency by route", ["method", "route"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "salesgpt_stage_duration_seconds", "Latency of each pipeline stage", ["pipeline", "stage"]
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "salesgpt_llm_request_duration_seconds", "Groq completion latency", ["model", "call_site"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "salesgpt_llm_tokens", "Groq tokens used, by kind (prompt or completion)", ["model", "call_site", "kind"]
+)
+LLM_RETRIES = REGISTRY.counter(
+    "salesgpt_llm_retries", "Groq requests retried, by reason", ["model", "reason"]
+)
+LLM_HEDGED_REQUESTS = REGISTRY.counter(
+    "salesgpt_llm_hedged_requests", "Duplicate Groq requests sent to cut tail latency", ["model"]
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "salesgpt_llm_fallbacks", "Requests routed to the fallback model", ["from_model", "to_model", "reason"]
+)
+LLM_CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "salesgpt_llm_circuit_rejections", "Requests failed fast by an open circuit breaker", ["model"]
+)
+LLM_STRUCTURED_OUTPUTS = REGISTRY.counter(
+    "salesgpt_llm_structured_outputs",
+    "Structured completions by outcome (valid, repaired, followup, failed)",
+    ["call_site", "result"]
+)
+RATE_LIMITER_WAIT_SECONDS = REGISTRY.histogram(
+    "salesgpt_llm_rate_limit_wait_seconds", "Time spent waiting for shared Groq quota", ["model"]
+)
+RATE_LIMITER_CONFLICTS = REGISTRY.counter(
+    "salesgpt_llm_rate_limit_conflicts", "Shared rate-limit updates retried after another worker's write", ["model"]
+)
+ANALYSIS_PROMPTS = REGISTRY.counter(
+    "salesgpt_analysis_prompts", "Company analyses by prompt mode (few_shot or single_shot)", ["mode"]
+)
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "salesgpt_single_flight_calls",
+    "Coalesced calls by role: leader (did the work) or follower (joined an identical in-flight call)",
+    ["name", "role"]
+)
+IDEMPOTENCY_REQUESTS = REGISTRY.counter(
+    "salesgpt_idempotency_requests",
+    "Requests carrying an Idempotency-Key by outcome (executed, replayed, in_progress, mismatch)",
+    ["scope", "result"]
+)
+EXPORT_ROWS = REGISTRY.counter(
+    "salesgpt_export_rows", "Documents streamed by the export endpoints", ["collection", "format"]
+)
+RESPONSE_COMPRESSION = REGISTRY.counter(
+    "salesgpt_compressed_responses", "Responses sent compressed, by content encoding", ["encoding"]
+)
+SCRAPER_BYTES = REGISTRY.counter(
+    "salesgpt_scraper_downloaded_bytes", "Bytes downloaded by the scraper"
+)
+SCRAPER_STOPPED_EARLY = REGISTRY.counter(
+    "salesgpt_scraper_stopped_early",
+    "Page downloads cut short (max_bytes reached, or enough_content extracted)",
+    ["reason"]
+)
+PARSE_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "salesgpt_scraper_parse_pool_wait_seconds", "Time pages waited for a free parse pool slot", ["kind"]
+)
+SCRAPER_FETCH_SECONDS = REGISTRY.histogram(
+    "salesgpt_scraper_fetch_duration_seconds", "Time spent waiting for page downloads"
+)
+SCRAPER_PARSE_SECONDS = REGISTRY.histogram(
+    "salesgpt_scraper_parse_duration_seconds",
+    "HTML extraction time by backend",
+    ["backend"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+MONGO_OPERATION_SECONDS = REGISTRY.histogram(
+    "salesgpt_mongo_operation_duration_seconds",
+    "MongoDB command latency",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+DB_WRITE_DOCUMENTS = REGISTRY.counter(
+    "salesgpt_db_write_behind_documents",
+    "Write-behind documents by collection and outcome (written, rejected, dropped)",
+    ["collection", "result"]
+)
+DB_WRITE_BATCH_SIZE = REGISTRY.histogram(
+    "salesgpt_db_write_behind_batch_size",
+    "Documents per write-behind flush",
+    ["collection"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+STARTUP_SECONDS = REGISTRY.histogram(
+    "salesgpt_startup_duration_seconds", "Worker startup time by step", ["step"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "salesgpt_cache_requests", "Cache lookups by cache and result", ["cache", "result"]
+)
+ERRORS = REGISTRY.counter(
+    "salesgpt_errors", "Errors by component", ["component"]
+)
+
+@contextmanager
+def stage_timer(pipeline: str, stage: str):
+    """Time one pipeline stage into STAGE_SECONDS and the current request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(component=f"{pipeline}.{stage}")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, pipeline=pipeline, stage=stage)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings for the current request; returns the shared list."""
+    timings: List[Tuple[str, float]] = []
+    _stage_timings.set(timings)
+    return timings
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_OPERATION_SECONDS and ERRORS."""
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        MONGO_OPERATION_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event) -> None:
+        MONGO_OPERATION_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        ERRORS.inc(component="mongo")
@@ -0,0 +1,148 @@
+# File: backend/app/services/parse_pool.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from .extraction import BaseExtractor, create_extractor
+from .metrics import ERRORS, PARSE_POOL_WAIT_SECONDS
+
+# Bytes fed to the parser per call, so max_content_chars can stop it early
+FEED_CHUNK_BYTES = 65536
+
+_extractors: Dict[str, BaseExtractor] = {}
+
+
+class ParseWorkerError(Exception):
+    """Raised when a document keeps crashing the parse worker processes"""
+    pass
+
+
+def extract_document(backend: str, base_url: str, body: bytes, encoding: Optional[str], max_content_chars: int) -> Dict:
+    """Parse ``body`` and return the extracted fields; runs inside a pool worker."""
+    extractor = _extractors.get(backend)
+    if extractor is None:
+        extractor = _extractors[backend] = create_extractor(backend)
+    parser = extractor.parser(base_url, encoding, max_content_chars)
+    view = memoryview(body)
+    for start in range(0, len(body), FEED_CHUNK_BYTES):
+        parser.feed(bytes(view[start:start + FEED_CHUNK_BYTES]))
+        if parser.done:
+            break
+    return parser.close()
+
+
+def _warm_up(backend: str) -> int:
+    extract_document(backend, "https://example.com/", b"<html><body></body></html>", None, 0)
+    return os.getpid()
+
+
+class ParsePool:
+    """Runs HTML parsing and extraction off the event loop.
+
+    ``kind`` is ``process`` (a ``ProcessPoolExecutor``; parsing is CPU-bound
+    and neither backend releases the GIL, so this is what keeps the loop and
+    the other requests moving) or ``thread`` (only bounds how long one parse
+    holds the loop to the interpreter's switch interval). Only the page bytes
+    go to a worker and only the extracted dict comes back.
+
+    At most ``max_pending`` documents are in the executor at once; further
+    callers wait their turn, so a burst of big pages queues as suspended
+    requests instead of piling bodies into the executor's unbounded queue.
+    A caller cancelled while its document is being parsed keeps the slot
+    until the parse finishes, since the worker is busy until then.
+    A crashed worker process is replaced and the documents it had are
+    retried once in the new pool; a document that crashes that one too
+    fails with ``ParseWorkerError``. Documents are never parsed in this
+    process instead, since the one that killed a worker is likely
+    pathological.
+    """
+
+    def __init__(self, kind: str = "process", workers: int = 0, max_pending: int = 0):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown parse pool kind: {kind}")
+        self.logger = logging.getLogger(__name__)
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "thread":
+            return ThreadPoolExecutor(self.workers, thread_name_prefix="parse")
+        # Not fork: the parent has Motor and executor threads running
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self, backend: str = "auto") -> None:
+        """Create the pool and import the parser in every worker before the first request needs it."""
+        if self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _warm_up, backend) for _ in range(self.workers)
+        ))
+
+    async def extract(
+        self,
+        backend: str,
+        base_url: str,
+        body: bytes,
+        encoding: Optional[str] = None,
+        max_content_chars: int = 0
+    ) -> Dict:
+        if self._executor is None:
+            await self.start(backend)
+        waited = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        release = True
+        try:
+            PARSE_POOL_WAIT_SECONDS.observe(time.perf_counter() - waited, kind=self.kind)
+            for attempt in range(2):
+                executor = self._executor
+                future = None
+                try:
+                    # A pool that is already broken raises here rather than from the future
+                    future = executor.submit(extract_document, backend, base_url, body, encoding, max_content_chars)
+                    return await asyncio.wrap_future(future)
+                except asyncio.CancelledError:
+                    if future is not None and not future.done():
+                        # Already running, so it can't be cancelled: keep its slot until it finishes
+                        release = False
+                        loop = asyncio.get_running_loop()
+                        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._slots.release))
+                    raise
+                except BrokenProcessPool:
+                    ERRORS.inc(component="scraper.parse_pool")
+                    self.logger.error(f"Parse worker died while parsing {base_url}; restarting the pool")
+                    if self._executor is executor:
+                        self._executor = self._create_executor()
+                        executor.shutdown(wait=False)
+            raise ParseWorkerError(f"Parse worker died twice while parsing {base_url}")
+        finally:
+            if release:
+                self._slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "waiting": self._waiting
+        }
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
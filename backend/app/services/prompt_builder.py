@@ -0,0 +1,198 @@
+# File: backend/app/services/prompt_builder.py
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character estimate
+    tiktoken = None
+
+# Navigation, legal and widget phrases; a sentence made up mostly of these is boilerplate
+BOILERPLATE_PATTERNS = re.compile(
+    r"\b(?:"
+    r"(?:we|this (?:site|website)) uses? cookies\b.*|(?:accept|reject|manage) (?:all )?cookies|"
+    r"cookie (?:policy|settings|preferences|consent)|"
+    r"by (?:continuing|using)(?: to (?:use|browse))? (?:this|our) (?:site|website)\b.*|"
+    r"privacy policy|terms (?:of (?:service|use)|and conditions)|all rights reserved|copyright|"
+    r"sign (?:in|up|out)|log ?(?:in|out)|create an account|my account|"
+    r"(?:subscribe|sign up) (?:to|for) (?:our|the) newsletter|subscribe|newsletter|"
+    r"(?:please )?enable javascript|javascript (?:is )?(?:disabled|required)|"
+    r"skip to (?:main )?content|back to top|read more|learn more|"
+    r"home|menu|search|contact us|follow us"
+    r")\b",
+    re.IGNORECASE
+)
+
+# Longer sentences are kept even if they contain boilerplate phrases
+BOILERPLATE_MAX_WORDS = 20
+
+# Words that tend to appear in the parts of a site that say what the company does
+RELEVANCE_TERMS = {
+    'about', 'mission', 'product', 'products', 'service', 'services', 'solution', 'solutions',
+    'platform', 'customer', 'customers', 'client', 'clients', 'industry', 'industries',
+    'pricing', 'price', 'plans', 'team', 'founded', 'company', 'we', 'our', 'help', 'helps',
+    'businesses', 'enterprise', 'partners', 'results', 'case', 'trusted', 'leading'
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"[a-z0-9]+")
+
+class PromptBuilder:
+    """Builds compact, token-budgeted prompts for the LLM call sites.
+
+    Scraped content is split into sentence blocks; repeated and boilerplate
+    blocks are dropped and the rest are ranked by relevance and packed into
+    ``content_token_budget`` tokens, then re-emitted in page order. Structured
+    data is serialized as compact JSON. Tokens are counted with tiktoken when
+    it is installed and estimated from character counts otherwise.
+
+    ``record`` keeps per-call-site totals of prompt tokens before and after
+    compaction so the savings can be reported.
+    """
+
+    def __init__(self, model: str = "mixtral-8x7b-32768", content_token_budget: int = 1500, block_words: int = 60):
+        self.logger = logging.getLogger(__name__)
+        self.model = model
+        self.content_token_budget = content_token_budget
+        self.block_words = block_words
+        self._encoding = self._load_encoding(model)
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _load_encoding(model: str):
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Groq-hosted open models have no tiktoken mapping; cl100k is a close proxy
+            return tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return max(1, (len(text) + 3) // 4)
+
+    def count_message_tokens(self, messages: List[Dict]) -> int:
+        # ~4 tokens of chat-format overhead per message
+        return sum(self.count_tokens(message.get("content", "")) + 4 for message in messages)
+
+    @staticmethod
+    def dumps(data) -> str:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    @staticmethod
+    def compact_whitespace(text: str) -> str:
+        """Strip the source-code indentation and blank-line runs from a prompt template."""
+        lines = [line.strip() for line in text.strip().splitlines()]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+    def fit_content(self, text: str, hints: Iterable[str] = (), budget: Optional[int] = None) -> str:
+        """Return the most relevant, de-duplicated part of ``text`` within ``budget`` tokens."""
+        budget = self.content_token_budget if budget is None else budget
+        blocks = self._blocks(text)
+        if not blocks:
+            return ''
+
+        hint_words = set()
+        for hint in hints:
+            hint_words.update(WORD.findall((hint or '').lower()))
+
+        ranked = sorted(
+            range(len(blocks)),
+            key=lambda i: self._score(blocks[i], i, len(blocks), hint_words),
+            reverse=True
+        )
+        chosen, used = [], 0
+        for index in ranked:
+            cost = self.count_tokens(blocks[index]) + 1
+            if used + cost > budget:
+                continue
+            chosen.append(index)
+            used += cost
+        return ' '.join(blocks[i] for i in sorted(chosen))
+
+    def record(self, call_site: str, tokens_before: int, tokens_after: int) -> None:
+        stats = self._stats.setdefault(call_site, {"requests": 0, "tokens_before": 0, "tokens_after": 0})
+        stats["requests"] += 1
+        stats["tokens_before"] += tokens_before
+        stats["tokens_after"] += tokens_after
+        self.logger.info(
+            f"Prompt compaction ({call_site}): {tokens_before} -> {tokens_after} tokens "
+            f"(saved {tokens_before - tokens_after})"
+        )
+
+    def stats(self) -> Dict:
+        return {
+            call_site: {**stats, "tokens_saved": stats["tokens_before"] - stats["tokens_after"]}
+            for call_site, stats in self._stats.items()
+        }
+
+    def _blocks(self, text: str) -> List[str]:
+        sentences = self._unique_sentences(text, drop_boilerplate=True)
+        if not sentences:
+            # Everything looked like boilerplate; some content beats none
+            sentences = self._unique_sentences(text, drop_boilerplate=False)
+
+        blocks, current, current_words = [], [], 0
+        for sentence in sentences:
+            current.append(sentence)
+            current_words += len(sentence.split())
+            if current_words >= self.block_words:
+                blocks.append(' '.join(current))
+                current, current_words = [], 0
+        if current:
+            blocks.append(' '.join(current))
+        return blocks
+
+    def _unique_sentences(self, text: str, drop_boilerplate: bool) -> List[str]:
+        seen = set()
+        sentences = []
+        for sentence in self._sentences(text):
+            words = WORD.findall(sentence.lower())
+            if not words or drop_boilerplate and (len(words) < 4 or self._is_boilerplate(sentence, len(words))):
+                continue
+            key = hashlib.md5(' '.join(words).encode('utf-8')).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+        return sentences
+
+    @staticmethod
+    def _is_boilerplate(sentence: str, word_count: int) -> bool:
+        """A short sentence that is mostly navigation, legal or widget phrases.
+
+        Sentences that merely mention a keyword ("we bake cookies", "sign up
+        for a tasting") keep most of their words once the phrases are removed.
+        """
+        if word_count > BOILERPLATE_MAX_WORDS:
+            return False
+        remaining = len(WORD.findall(BOILERPLATE_PATTERNS.sub(' ', sentence.lower())))
+        return remaining * 2 < word_count
+
+    def _sentences(self, text: str) -> Iterable[str]:
+        # Extracted text often lacks punctuation; cut run-on "sentences" into word windows
+        for sentence in SENTENCE_SPLIT.split(' '.join((text or '').split())):
+            words = sentence.split()
+            if len(words) <= 2 * self.block_words:
+                yield sentence
+                continue
+            for start in range(0, len(words), self.block_words):
+                yield ' '.join(words[start:start + self.block_words])
+
+    @staticmethod
+    def _score(block: str, index: int, total: int, hint_words: set) -> float:
+        words = WORD.findall(block.lower())
+        if not words:
+            return 0.0
+        relevance = sum(1 for word in words if word in RELEVANCE_TERMS) / len(words)
+        hint_overlap = len(hint_words.intersection(words)) / (len(hint_words) or 1)
+        distinct = len(set(words)) / len(words)
+        position = 1.0 - index / max(total, 1)
+        return 3.0 * relevance + 2.0 * hint_overlap + 0.5 * distinct + 0.5 * position
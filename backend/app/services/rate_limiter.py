@@ -0,0 +1,139 @@
+# File: backend/app/services/rate_limiter.py
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import RATE_LIMITER_CONFLICTS, RATE_LIMITER_WAIT_SECONDS
+from .shared_store import SharedStore
+
+# Rough characters per token, for reserving prompt tokens before Groq reports usage
+CHARS_PER_TOKEN = 4
+
+# Per-message overhead of the chat format, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Buckets untouched for this long are dropped from the store
+BUCKET_TTL_SECONDS = 3600
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+
+class SharedRateLimiter:
+    """Token-bucket limiter for Groq requests and tokens per minute, shared by all workers.
+
+    Each model has one bucket in the ``SharedStore`` holding its available
+    requests and tokens; both refill continuously at the per-minute rate up
+    to ``burst_seconds`` worth of quota. ``acquire`` takes one request plus
+    the prompt estimate and ``max_tokens`` (Groq's own accounting), waiting
+    until the bucket can cover them, and ``settle`` returns the tokens the
+    completion didn't use. Updates are compare-and-set, so any number of
+    worker processes together stay under the account's limits; within a
+    process, callers queue in order behind a lock instead of racing.
+
+    ``limits`` maps a model to ``(requests_per_minute, tokens_per_minute)``;
+    other models use the defaults. A limit of 0 is not enforced.
+    """
+
+    def __init__(
+        self,
+        store: SharedStore,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        burst_seconds: float = 10.0,
+        namespace: str = "groq"
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.default_limits = (requests_per_minute, tokens_per_minute)
+        self.limits = {model: tuple(limit) for model, limit in (limits or {}).items()}
+        self.burst_seconds = burst_seconds
+        self.namespace = namespace
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def enabled(self, model: str) -> bool:
+        return any(self.limits.get(model, self.default_limits))
+
+    async def acquire(self, model: str, tokens: int) -> int:
+        """Wait until ``model`` has room for one request of ``tokens`` tokens; returns the tokens taken."""
+        if not self.enabled(model):
+            return 0
+        rates, capacity = self._rates(model)
+        # A request larger than the whole bucket would never fit; let it through once full
+        if capacity[1]:
+            tokens = min(tokens, int(capacity[1]))
+        key = self._key(model)
+        started = time.monotonic()
+        lock = self._locks.setdefault(model, asyncio.Lock())
+        async with lock:
+            while True:
+                state, version = await self.store.get_versioned(key)
+                now = time.time()
+                available = self._refill(state, now, rates, capacity)
+                wait = max(
+                    (need - have) / rate if rate else 0.0
+                    for need, have, rate in zip((1, tokens), available, rates)
+                )
+                if wait <= 0:
+                    taken = {
+                        "requests": available[0] - 1,
+                        "tokens": available[1] - tokens,
+                        "updated": now
+                    }
+                    if await self.store.compare_and_set(key, taken, version, BUCKET_TTL_SECONDS):
+                        break
+                    # Another worker updated the bucket first; re-read and try again
+                    RATE_LIMITER_CONFLICTS.inc(model=model)
+                    continue
+                # Jitter so workers waiting on the same bucket don't retry in lockstep
+                await asyncio.sleep(wait * random.uniform(1.0, 1.1))
+        waited = time.monotonic() - started
+        RATE_LIMITER_WAIT_SECONDS.observe(waited, model=model)
+        if waited > 1.0:
+            self.logger.info(f"Waited {waited:.1f}s for Groq quota (model={model})")
+        return tokens
+
+    async def settle(self, model: str, reserved: int, used: int) -> None:
+        """Give back the part of a reservation the completion didn't use."""
+        if not self.enabled(model) or used >= reserved:
+            return
+        rates, capacity = self._rates(model)
+        key = self._key(model)
+        for _ in range(5):
+            state, version = await self.store.get_versioned(key)
+            now = time.time()
+            available = self._refill(state, now, rates, capacity)
+            refunded = {
+                "requests": available[0],
+                "tokens": min(available[1] + reserved - used, capacity[1]),
+                "updated": now
+            }
+            if await self.store.compare_and_set(key, refunded, version, BUCKET_TTL_SECONDS):
+                return
+            RATE_LIMITER_CONFLICTS.inc(model=model)
+        # Under heavy contention the refund is dropped; the bucket refills anyway
+
+    def _key(self, model: str) -> str:
+        return f"rate_limit:{self.namespace}:{model}"
+
+    def _rates(self, model: str) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """Per-second refill rates and bucket capacities as (requests, tokens) pairs."""
+        per_minute = self.limits.get(model, self.default_limits)
+        rates = tuple(limit / 60.0 for limit in per_minute)
+        capacity = tuple(max(rate * self.burst_seconds, 1.0) if rate else 0.0 for rate in rates)
+        return rates, capacity
+
+    @staticmethod
+    def _refill(state: Optional[Dict], now: float, rates, capacity) -> Tuple[float, float]:
+        if state is None:
+            return capacity
+        elapsed = max(now - state["updated"], 0.0)
+        return tuple(
+            min(have + elapsed * rate, cap) if rate else 0.0
+            for have, rate, cap in zip((state["requests"], state["tokens"]), rates, capacity)
+        )
@@ -0,0 +1,66 @@
+# File: backend/app/services/responses.py
+import json
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+from .export import split_fields
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if orjson is None and hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed.
+
+    Endpoints returning large documents (website data, analyses) should
+    return this directly: a returned dict first goes through FastAPI's
+    ``jsonable_encoder``, which walks and copies it and costs more than
+    the encoding itself. Datetimes, ObjectIds and sets are encoded as
+    ``jsonable_encoder`` would.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, default=_json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def parse_response_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Dotted paths from a ``fields`` query parameter, or None for every field."""
+    if not fields:
+        return None
+    return split_fields(fields) or None
+
+
+def select_fields(doc: Dict, fields: List[str]) -> Dict:
+    """Copy of ``doc`` with only the dotted ``fields`` (missing ones are left out)."""
+    selected: Dict = {}
+    for path in fields:
+        parts = path.split(".")
+        value = doc
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = selected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return selected
@@ -1,128 +1,310 @@
 import httpx
-from bs4 import BeautifulSoup
-from typing import Dict, List
+from typing import Dict, Iterable, Optional
 from fastapi import HTTPException
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+from collections import OrderedDict
+from dataclasses import dataclass
+import copy
 import logging
+import time
+
+from .extraction import create_extractor
+from .parse_pool import ParsePool
+from .metrics import (
+    CACHE_REQUESTS,
+    ERRORS,
+    SCRAPER_BYTES,
+    SCRAPER_FETCH_SECONDS,
+    SCRAPER_PARSE_SECONDS,
+    SCRAPER_STOPPED_EARLY
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.1'
+}
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_CONTENT_TYPES = ('text/plain',)
+
+# Crawlers commonly ignore anything past the first 500 KiB of a robots.txt
+ROBOTS_MAX_BYTES = 512_000
 
 class WebScraperError(Exception):
-    """Custom exception for web scraping errors"""
-    pass
+    """Custom exception for web scraping errors.
+
+    ``transient`` is set for failures worth retrying later (timeouts,
+    connection errors, 408/429/5xx responses), not for bad URLs, 4xx
+    responses or unsupported content.
+    """
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        self.transient = transient
+
+@dataclass
+class CachedPage:
+    """Extracted data for a URL plus the validators needed to revalidate it"""
+    data: Dict
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
 class WebScraper:
-    def __init__(self):
+    """Fetches and extracts company websites over one pooled HTTP client.
+
+    The client is created by ``start()`` (called on app startup, or lazily on
+    first use) and reused for every request so connections, TLS sessions and
+    DNS lookups are shared. Pages fetched within ``cache_freshness_seconds``
+    are served from memory; older entries are revalidated with a conditional
+    GET and a 304 reuses the previously extracted data.
+
+    Bodies are streamed into the extractor's incremental parser as they
+    arrive, so a page is never held in memory whole: responses whose
+    Content-Type isn't one of ``content_types`` are rejected before the body
+    is read, at most ``max_bytes`` (decompressed) are read per page, and the
+    download stops once ``max_content_chars`` of main content have been
+    extracted (0 reads up to the byte cap). With a ``parse_pool`` the capped
+    body is parsed in that pool rather than on the event loop; the download
+    then can't stop early on ``max_content_chars``, only the parsing.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 30.0,
+        cache_freshness_seconds: float = 300.0,
+        cache_max_entries: int = 512,
+        extraction_backend: str = "auto",
+        max_bytes: int = 2_000_000,
+        max_content_chars: int = 50_000,
+        content_types: Iterable[str] = HTML_CONTENT_TYPES,
+        parse_pool: Optional[ParsePool] = None
+    ):
         self.logger = logging.getLogger(__name__)
+        self.extractor = create_extractor(extraction_backend)
+        self.max_bytes = max_bytes
+        self.max_content_chars = max_content_chars
+        self.content_types = tuple(content_types)
+        self.parse_pool = parse_pool
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.timeout = timeout
+        self.cache_freshness_seconds = cache_freshness_seconds
+        self.cache_max_entries = cache_max_entries
+        self.client: Optional[httpx.AsyncClient] = None
+        self.crawler = None
+        self._cache: "OrderedDict[str, CachedPage]" = OrderedDict()
+
+    async def start(self) -> None:
+        if self.client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                self.logger.warning("h2 is not installed, falling back to HTTP/1.1")
+                http2 = False
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+            headers=DEFAULT_HEADERS
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def scrape_website(self, url: str, crawl: bool = False, force_refresh: bool = False) -> Dict:
+        """Fetch and extract ``url``; with ``crawl`` also merge in key same-site pages.
+
+        ``force_refresh`` downloads every page again instead of serving or
+        revalidating cached copies.
+        """
+        data = await self.fetch_page(url, force_refresh=force_refresh)
+        if crawl and self.crawler is not None:
+            data = await self.crawler.crawl(data, force_refresh=force_refresh)
+        data.pop('links', None)
+        data.pop('bytes', None)
+        return data
 
-    async def scrape_website(self, url: str) -> Dict:
+    async def fetch_page(self, url: str, force_refresh: bool = False) -> Dict:
+        """Fetch one page and return its extracted data, including ``links`` and ``bytes``.
+
+        ``force_refresh`` skips the cache: the page is downloaded in full
+        and the cached copy replaced.
+        """
         try:
             # Validate URL format
-            if not self._is_valid_url(url):
+            if not self.is_valid_url(url):
                 raise WebScraperError(f"Invalid URL format: {url}")
 
-            # Configure timeout and headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            cached = None if force_refresh else self._cache.get(url)
+            if cached and time.monotonic() - cached.fetched_at < self.cache_freshness_seconds:
+                self._cache.move_to_end(url)
+                CACHE_REQUESTS.inc(cache="scraper", result="hit")
+                return copy.deepcopy(cached.data)
+
+            # Revalidate stale entries with a conditional GET
+            headers = {}
+            if cached and cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached and cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+            await self.start()
+            async with self.client.stream('GET', url, headers=headers) as response:
+                if response.status_code == 304 and cached:
+                    cached.fetched_at = time.monotonic()
+                    self._cache.move_to_end(url)
+                    CACHE_REQUESTS.inc(cache="scraper", result="revalidated")
+                    return copy.deepcopy(cached.data)
+                CACHE_REQUESTS.inc(cache="scraper", result="miss")
 
-            async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-                response = await client.get(url, headers=headers)
                 response.raise_for_status()  # Raise exception for bad status codes
+                self._check_content_type(response)
                 final_url = str(response.url)
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                extracted_data = {
-                    'title': self._clean_text(soup.title.string) if soup.title else '',
-                    'meta_description': self._get_meta_description(soup),
-                    'main_content': self._extract_main_content(soup),
-                    'social_links': self._find_social_links(soup, final_url),
-                    'contact_info': self._extract_contact_info(soup),
-                    'final_url': final_url
-                }
-                
-                return extracted_data
+                extracted_data = await self._read_and_extract(response, final_url)
+
+            self._remember(url, response, extracted_data)
+            return extracted_data
 
+        except WebScraperError:
+            raise
         except httpx.HTTPStatusError as e:
+            ERRORS.inc(component="scraper.http_status")
             self.logger.error(f"HTTP error occurred: {str(e)}")
-            raise WebScraperError(f"Failed to access website: HTTP {e.response.status_code}")
+            status = e.response.status_code
+            raise WebScraperError(
+                f"Failed to access website: HTTP {status}",
+                transient=status in (408, 425, 429) or status >= 500
+            )
         except httpx.RequestError as e:
+            ERRORS.inc(component="scraper.request")
             self.logger.error(f"Request error occurred: {str(e)}")
-            raise WebScraperError(f"Failed to connect to website: {str(e)}")
+            raise WebScraperError(f"Failed to connect to website: {str(e)}", transient=True)
         except Exception as e:
+            ERRORS.inc(component="scraper.unexpected")
             self.logger.error(f"Unexpected error during scraping: {str(e)}")
             raise WebScraperError(f"Failed to scrape website: {str(e)}")
 
-    def _is_valid_url(self, url: str) -> bool:
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except Exception:
-            return False
+    def _check_content_type(self, response: httpx.Response, content_types: Optional[Iterable[str]] = None) -> None:
+        content_type = response.headers.get('Content-Type')
+        if content_type is None:
+            return  # Many small sites omit it; the parser copes with whatever arrives
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        if media_type not in (self.content_types if content_types is None else content_types):
+            ERRORS.inc(component="scraper.content_type")
+            raise WebScraperError(f"Unsupported content type: {media_type}")
 
-    def _clean_text(self, text: str) -> str:
-        return ' '.join(text.split()) if text else ''
+    async def _read_and_extract(self, response: httpx.Response, final_url: str) -> Dict:
+        """Stream the body into the incremental parser until it's done or ``max_bytes`` are read.
 
-    def _get_meta_description(self, soup) -> str:
-        try:
-            # Try standard meta description
-            meta = soup.find('meta', {'name': ['description', 'Description']})
-            if not meta:
-                # Try OpenGraph and Twitter meta descriptions
-                meta = soup.find('meta', {'property': ['og:description', 'twitter:description']})
-            return self._clean_text(meta['content']) if meta and 'content' in meta.attrs else ''
-        except Exception as e:
-            self.logger.warning(f"Error extracting meta description: {str(e)}")
-            return ''
+        With a parse pool the body is collected (up to ``max_bytes``) and
+        parsed in the pool instead, keeping the event loop free.
+        """
+        parser = None
+        if self.parse_pool is None:
+            parser = self.extractor.parser(final_url, response.charset_encoding, self.max_content_chars)
+        chunks = []
+        received = 0
+        parse_seconds = 0.0
+        stopped = None
+        started = time.perf_counter()
+        async for chunk in response.aiter_bytes():
+            if received + len(chunk) >= self.max_bytes:
+                chunk = chunk[:self.max_bytes - received]
+                stopped = "max_bytes"
+            received += len(chunk)
+            if parser is None:
+                chunks.append(chunk)
+            else:
+                parse_started = time.perf_counter()
+                parser.feed(chunk)
+                parse_seconds += time.perf_counter() - parse_started
+                if stopped is None and parser.done:
+                    stopped = "enough_content"
+            if stopped:
+                # Leaving the stream early closes the connection instead of draining it
+                break
+        parse_started = time.perf_counter()
+        if parser is None:
+            extracted_data = await self.parse_pool.extract(
+                self.extractor.name, final_url, b''.join(chunks), response.charset_encoding, self.max_content_chars
+            )
+        else:
+            extracted_data = parser.close()
+        parse_seconds += time.perf_counter() - parse_started
 
-    def _extract_main_content(self, soup) -> str:
-        try:
-            # Remove unwanted elements
-            for element in soup(['script', 'style', 'nav', 'footer']):
-                element.decompose()
-            
-            content_elements = []
-            main_content = soup.find_all(['main', 'article', 'section', 'div'], 
-                                       class_=lambda x: x and any(word in str(x).lower() 
-                                       for word in ['content', 'main', 'article']))
-            
-            for element in main_content:
-                content_elements.append(self._clean_text(element.get_text(separator=' ')))
-            
-            return ' '.join(content_elements)
-        except Exception as e:
-            self.logger.warning(f"Error extracting main content: {str(e)}")
-            return ''
+        SCRAPER_FETCH_SECONDS.observe(time.perf_counter() - started - parse_seconds)
+        SCRAPER_PARSE_SECONDS.observe(parse_seconds, backend=self.extractor.name)
+        SCRAPER_BYTES.inc(received)
+        if stopped:
+            SCRAPER_STOPPED_EARLY.inc(reason=stopped)
+            self.logger.info(f"Stopped reading {final_url} after {received} bytes ({stopped})")
+        extracted_data['final_url'] = final_url
+        extracted_data['bytes'] = received
+        return extracted_data
 
-    def _find_social_links(self, soup, base_url: str) -> List[str]:
-        try:
-            social_patterns = ['facebook.com', 'linkedin.com', 'twitter.com', 'instagram.com']
-            social_links = set()
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if not href.startswith(('http://', 'https://')):
-                    href = urljoin(base_url, href)
-                if any(pattern in href.lower() for pattern in social_patterns):
-                    social_links.add(href)
-            
-            return list(social_links)
-        except Exception as e:
-            self.logger.warning(f"Error extracting social links: {str(e)}")
-            return []
+    async def fetch_text(
+        self,
+        url: str,
+        max_bytes: int = ROBOTS_MAX_BYTES,
+        content_types: Iterable[str] = TEXT_CONTENT_TYPES
+    ) -> Optional[str]:
+        """GET a small plain-text resource (e.g. robots.txt); None if it isn't there.
+
+        The body is streamed and cut off after ``max_bytes`` like a page's,
+        and a response whose Content-Type isn't one of ``content_types`` is
+        rejected before it is read (an HTML error page served with 200, say).
+        """
+        await self.start()
+        async with self.client.stream('GET', url) as response:
+            if response.status_code >= 400:
+                return None
+            self._check_content_type(response, content_types)
+            chunks = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                if received + len(chunk) >= max_bytes:
+                    chunks.append(chunk[:max_bytes - received])
+                    received = max_bytes
+                    SCRAPER_STOPPED_EARLY.inc(reason="max_bytes")
+                    self.logger.info(f"Stopped reading {url} after {received} bytes (max_bytes)")
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+            SCRAPER_BYTES.inc(received)
+        return b''.join(chunks).decode(response.charset_encoding or 'utf-8', errors='replace')
 
-    def _extract_contact_info(self, soup) -> Dict:
+    def _remember(self, url: str, response: httpx.Response, data: Dict) -> None:
+        self._cache[url] = CachedPage(
+            data=copy.deepcopy(data),
+            fetched_at=time.monotonic(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def is_valid_url(url: str) -> bool:
+        """Whether ``url`` has a scheme and host (and, if it has one, a numeric port)."""
         try:
-            contact_info = {
-                'email': None,
-                'phone': None,
-                'address': None
-            }
-            
-            email_elements = soup.find_all(string=lambda text: '@' in str(text) if text else False)
-            if email_elements:
-                contact_info['email'] = self._clean_text(email_elements[0])
-            
-            return contact_info
-        except Exception as e:
-            self.logger.warning(f"Error extracting contact info: {str(e)}")
-            return {'email': None, 'phone': None, 'address': None}
\ No newline at end of file
+            result = urlparse(url)
+            result.port  # raises ValueError for ports like ':abc'
+            return all([result.scheme, result.netloc])
+        except Exception:
+            return False
@@ -0,0 +1,193 @@
+# File: backend/app/services/shared_store.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+# SQLite writes between sweeps of expired rows
+SQLITE_SWEEP_INTERVAL = 500
+
+
+class SharedStore:
+    """Small versioned key-value store shared by every worker process.
+
+    Values are JSON-compatible dicts. ``compare_and_set`` is the only
+    primitive needed for cross-process coordination (e.g. the Groq rate
+    limiter): it writes only if the key is still at the version that was
+    read, so concurrent read-modify-write cycles never lose an update.
+    Version 0 means "absent".
+    """
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value, _ = await self.get_versioned(key)
+        return value
+
+    async def get_versioned(self, key: str) -> Tuple[Optional[Dict], int]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def compare_and_set(
+        self,
+        key: str,
+        value: Dict,
+        version: int,
+        ttl_seconds: Optional[float] = None
+    ) -> bool:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MongoSharedStore(SharedStore):
+    """``SharedStore`` on a MongoDB collection; expiry is handled by a TTL index."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_versioned(self, key: str) -> Tuple[Optional[Dict], int]:
+        doc = await self.collection.find_one({"_id": key})
+        # The TTL monitor only runs once a minute, so check expiry here too
+        if doc is None or "value" not in doc or (doc.get("expires_at") and doc["expires_at"] <= datetime.utcnow()):
+            return None, doc.get("version", 0) if doc else 0
+        return doc["value"], doc.get("version", 0)
+
+    async def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": self._fields(value, ttl_seconds), "$inc": {"version": 1}},
+            upsert=True
+        )
+
+    async def compare_and_set(
+        self,
+        key: str,
+        value: Dict,
+        version: int,
+        ttl_seconds: Optional[float] = None
+    ) -> bool:
+        fields = self._fields(value, ttl_seconds)
+        if version == 0:
+            try:
+                await self.collection.insert_one({"_id": key, **fields, "version": 1})
+            except DuplicateKeyError:
+                return False
+            return True
+        result = await self.collection.update_one(
+            {"_id": key, "version": version},
+            {"$set": {**fields, "version": version + 1}}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def _fields(value: Dict, ttl_seconds: Optional[float]) -> Dict:
+        now = datetime.utcnow()
+        return {
+            "value": value,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds) if ttl_seconds else None
+        }
+
+
+class SQLiteSharedStore(SharedStore):
+    """``SharedStore`` in a local SQLite file, for workers on a single host.
+
+    Needs nothing but the standard library, so multi-worker mode can run
+    without MongoDB round trips for coordination. WAL mode lets readers and
+    the writer proceed concurrently across processes; each call runs in a
+    thread so a locked database never blocks the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS shared_store ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, version INTEGER NOT NULL, expires_at REAL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    async def get_versioned(self, key: str) -> Tuple[Optional[Dict], int]:
+        row = await asyncio.to_thread(
+            self._execute, "SELECT value, version, expires_at FROM shared_store WHERE key = ?", (key,)
+        )
+        if row is None:
+            return None, 0
+        value, version, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None, version
+        return json.loads(value), version
+
+    async def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO shared_store (key, value, version, expires_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = version + 1, "
+            "expires_at = excluded.expires_at",
+            (key, json.dumps(value), self._expires_at(ttl_seconds)),
+            True
+        )
+
+    async def compare_and_set(
+        self,
+        key: str,
+        value: Dict,
+        version: int,
+        ttl_seconds: Optional[float] = None
+    ) -> bool:
+        if version == 0:
+            sql = "INSERT OR IGNORE INTO shared_store (key, value, version, expires_at) VALUES (?, ?, 1, ?)"
+            params = (key, json.dumps(value), self._expires_at(ttl_seconds))
+        else:
+            sql = "UPDATE shared_store SET value = ?, version = version + 1, expires_at = ? WHERE key = ? AND version = ?"
+            params = (json.dumps(value), self._expires_at(ttl_seconds), key, version)
+        return await asyncio.to_thread(self._execute, sql, params, True) == 1
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _expires_at(ttl_seconds: Optional[float]) -> Optional[float]:
+        return time.time() + ttl_seconds if ttl_seconds else None
+
+    def _execute(self, sql: str, params: Tuple, write: bool = False):
+        """Run one statement; returns the first row for reads and the changed row count for writes."""
+        with self._lock:
+            cursor = self._connection.execute(sql, params)
+            if not write:
+                return cursor.fetchone()
+            changed = cursor.rowcount
+            self._writes += 1
+            if self._writes % SQLITE_SWEEP_INTERVAL == 0:
+                self._connection.execute(
+                    "DELETE FROM shared_store WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+                )
+            return changed
+
+
+def create_shared_store(backend: str, mongo_collection=None, sqlite_path: str = "") -> SharedStore:
+    """The store named by ``backend``: ``mongo`` (the given collection) or ``sqlite`` (a local file)."""
+    if backend == "mongo":
+        return MongoSharedStore(mongo_collection)
+    if backend == "sqlite":
+        return SQLiteSharedStore(sqlite_path)
+    raise ValueError(f"Unknown shared store backend: {backend}")
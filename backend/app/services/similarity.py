@@ -0,0 +1,180 @@
+# File: backend/app/services/similarity.py
+import asyncio
+import logging
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Analysis fields that describe what a company is, with their weight in the vector
+EMBEDDED_FIELDS = {
+    "industry": 2.0,
+    "products_services": 1.0,
+    "target_audience": 1.0,
+    "customer_pain_points": 1.0,
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our that the their "
+    "them they this to was we were who with your you".split()
+)
+
+# Documents vectorized between yields to the event loop while loading
+LOAD_BATCH_SIZE = 500
+
+
+def _tokens(text: str) -> List[str]:
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def analysis_text(analysis: Dict) -> Iterable[Tuple[str, float]]:
+    """(text, weight) pairs of the embedded fields of a stored analysis."""
+    for field, weight in EMBEDDED_FIELDS.items():
+        value = analysis.get(field)
+        if isinstance(value, list):
+            value = " ".join(str(item) for item in value)
+        if value:
+            yield str(value), weight
+
+
+class HashingVectorizer:
+    """Maps text to a fixed-size, L2-normalised vector by hashing words and bigrams.
+
+    Needs no vocabulary or model download, so vectors can be computed for a
+    new analysis the moment it's saved; signed hashing keeps collisions from
+    systematically inflating similarity.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def transform(self, parts: Iterable[Tuple[str, float]]) -> np.ndarray:
+        counts: Dict[int, float] = {}
+        for text, weight in parts:
+            for token in _tokens(text):
+                digest = zlib.crc32(token.encode("utf-8"))
+                index = digest % self.dimensions
+                counts[index] = counts.get(index, 0.0) + (weight if digest & 0x80000000 else -weight)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if counts:
+            indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            # Sublinear term frequency so repeated words don't dominate
+            vector[indices] = np.sign(values) * np.log1p(np.abs(values))
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+
+class AnalysisIndex:
+    """In-memory cosine-similarity index over stored analyses.
+
+    Vectors live in one contiguous float32 matrix (``dimensions`` * 4 bytes
+    per analysis, ~100MB for 100k analyses at 256 dimensions) and queries are
+    a single brute-force matrix-vector product plus a partial sort, which
+    stays in the low milliseconds at that size. ``load`` fills it from
+    MongoDB at startup; ``add`` keeps it current as analyses are saved.
+    Each worker process holds its own copy.
+    """
+
+    def __init__(self, dimensions: int = 256, initial_capacity: int = 1024):
+        self.vectorizer = HashingVectorizer(dimensions)
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, analysis_id: str, analysis: Dict) -> None:
+        """Insert or replace the vector for ``analysis_id``."""
+        vector = self.vectorizer.transform(analysis_text(analysis or {}))
+        position = self._positions.get(analysis_id)
+        if position is None:
+            position = len(self._ids)
+            if position == len(self._matrix):
+                grown = np.zeros((len(self._matrix) * 2, self.vectorizer.dimensions), dtype=np.float32)
+                grown[:position] = self._matrix
+                self._matrix = grown
+            self._ids.append(analysis_id)
+            self._positions[analysis_id] = position
+        self._matrix[position] = vector
+
+    def vector(self, analysis_id: str) -> Optional[np.ndarray]:
+        position = self._positions.get(analysis_id)
+        return None if position is None else self._matrix[position]
+
+    def search_vector(
+        self,
+        vector: np.ndarray,
+        limit: int = 10,
+        exclude: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """The ``limit`` most similar analyses scoring above ``min_score``, as ``(analysis_id, cosine)``."""
+        count = len(self._ids)
+        if not count or not vector.any():
+            return []
+        scores = self._matrix[:count] @ vector
+        k = min(limit + (exclude is not None), count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self._ids[i], float(scores[i]))
+            for i in top
+            if scores[i] > min_score and self._ids[i] != exclude
+        ][:limit]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        return self.search_vector(self.vectorizer.transform([(query, 1.0)]), limit)
+
+    def similar(self, analysis_id: str, analysis: Optional[Dict] = None, limit: int = 10) -> List[Tuple[str, float]]:
+        """Analyses most like ``analysis_id``; ``analysis`` is used if it isn't indexed yet."""
+        vector = self.vector(analysis_id)
+        if vector is None:
+            if analysis is None:
+                return []
+            vector = self.vectorizer.transform(analysis_text(analysis))
+        return self.search_vector(vector, limit, exclude=analysis_id)
+
+    async def load(self, collection, since: Optional[datetime] = None) -> Optional[datetime]:
+        """Index stored analyses, yielding to the event loop between batches.
+
+        Loads everything, or with ``since`` only analyses updated at or after
+        it (picking up saves made by other workers). Returns the newest
+        ``updated_at`` seen, for the next incremental load.
+        """
+        projection = {"updated_at": 1, **{f"analysis.{field}": 1 for field in EMBEDDED_FIELDS}}
+        query = {"updated_at": {"$gte": since}} if since is not None else {}
+        newest = since
+        loaded = 0
+        async for doc in collection.find(query, projection):
+            # On the first load, saves that happened meanwhile are already indexed and newer
+            if since is not None or str(doc["_id"]) not in self._positions:
+                self.add(str(doc["_id"]), doc.get("analysis"))
+            updated_at = doc.get("updated_at")
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+            loaded += 1
+            if loaded % LOAD_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+        if since is None:
+            self.ready = True
+            logger.info(f"Similarity index loaded {loaded} analyses")
+        return newest
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "documents": len(self._ids),
+            "dimensions": self.vectorizer.dimensions,
+            "memory_bytes": int(self._matrix.nbytes)
+        }
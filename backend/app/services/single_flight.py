@@ -0,0 +1,60 @@
+# File: backend/app/services/single_flight.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from .metrics import SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution.
+
+    The first caller for a key (the leader) starts ``work`` as a task; callers
+    arriving while it runs await that task instead of starting their own, and
+    all of them get its result or exception. The task is shielded from any
+    single caller's cancellation (e.g. the leader's client disconnecting) and
+    is only cancelled once every caller waiting on it has gone. Keys are
+    forgotten as soon as the work finishes, so this never serves stale
+    results; it only removes duplicate concurrent work within one worker.
+    """
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        """Run ``work`` for ``key``, or wait for the run already in flight, and return its result."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.logger.info(f"Joining in-flight {self.name} call for {key}")
+        SINGLE_FLIGHT_CALLS.inc(name=self.name, role="follower" if shared else "leader")
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._calls.get(key) is task and self._waiters[key] == 1 and not task.done():
+                # Nobody else is waiting for it; new callers must not join the cancelled task
+                task.cancel()
+                self._forget(key, task)
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._calls), "waiters": sum(self._waiters.values())}
@@ -0,0 +1,275 @@
+# File: backend/app/services/structured_output.py
+import json
+import re
+from typing import Any, Dict, Iterator, List, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+# Follow-up sent (once) when a completion can't be parsed into the schema
+FIX_JSON_PROMPT = (
+    "Your previous reply could not be used: {error}. "
+    "Reply with only the corrected JSON object, matching the requested format exactly, with no other text."
+)
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+LITERAL_PATTERN = re.compile(r"\b(True|False|None)\b")
+
+# How many truncation points to try when the JSON was cut off mid-value
+MAX_TRUNCATION_CANDIDATES = 8
+
+
+class StructuredOutputError(Exception):
+    """Raised when a completion can't be parsed and validated against its schema"""
+    pass
+
+
+def _as_text(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def _as_list(value: Any) -> Any:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return value
+
+
+class _AnalysisModel(BaseModel):
+    """Schema whose fields all have defaults but of which at least one must be filled.
+
+    A reply wrapped in a single object (``{"analysis": {...}}``) is unwrapped;
+    a reply with none of the schema's fields, or only empty ones, is
+    rejected so the caller asks the model again instead of storing it.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _unwrap(cls, value):
+        if isinstance(value, dict) and len(value) == 1 and not value.keys() & cls.model_fields.keys():
+            inner = next(iter(value.values()))
+            if isinstance(inner, dict):
+                return inner
+        return value
+
+    @model_validator(mode="after")
+    def _require_content(self):
+        if not any(getattr(self, name) for name in type(self).model_fields):
+            raise ValueError(f"none of the expected fields are filled in ({', '.join(type(self).model_fields)})")
+        return self
+
+
+class CompanyAnalysis(_AnalysisModel):
+    """Output of ``CompanyAnalyzer.analyze_company`` (see ``ANALYSIS_TEMPLATE``)."""
+
+    industry: str = ""
+    market_position: str = ""
+    products_services: List[str] = Field(default_factory=list)
+    target_audience: str = ""
+    unique_selling_points: List[str] = Field(default_factory=list)
+    brand_voice: str = ""
+    customer_pain_points: List[str] = Field(default_factory=list)
+    competitors: List[str] = Field(default_factory=list)
+    sales_approach: str = ""
+
+    @field_validator("industry", "market_position", "target_audience", "brand_voice", "sales_approach", mode="before")
+    @classmethod
+    def _coerce_text(cls, value):
+        return _as_text(value)
+
+    @field_validator(
+        "products_services", "unique_selling_points", "customer_pain_points", "competitors", mode="before"
+    )
+    @classmethod
+    def _coerce_list(cls, value):
+        return [_as_text(item) for item in _as_list(value)]
+
+
+class OpportunityAnalysis(_AnalysisModel):
+    """Output of ``EmailGenerator._analyze_opportunity``."""
+
+    pain_points: List[str] = Field(default_factory=list)
+    benefits: List[str] = Field(default_factory=list)
+    value_metrics: List[str] = Field(default_factory=list)
+    competitive_edges: List[str] = Field(default_factory=list)
+    use_cases: List[str] = Field(default_factory=list)
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _coerce_list(cls, value):
+        return [_as_text(item) for item in _as_list(value)]
+
+
+class Email(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    subject: str
+    body: str
+    call_to_action: str = ""
+
+
+class EmailList(BaseModel):
+    """Output of ``EmailGenerator._generate_emails``: the email variations."""
+    model_config = ConfigDict(extra="allow")
+
+    emails: List[Email] = Field(min_length=1)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _wrap_bare_list(cls, value):
+        # Models sometimes return the list without the {"emails": ...} wrapper
+        return {"emails": value} if isinstance(value, list) else value
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, Tuple[str, ...]]]]:
+    """Normalize ``text`` from its first bracket to the end of that JSON value.
+
+    Converts single-quoted strings, escapes raw control characters inside
+    strings, drops trailing commas and maps Python literals. Returns the
+    output, the brackets still open, whether a string is still open, and the
+    (offset, open brackets) of each top-level-safe comma for truncation.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    commas: List[Tuple[int, Tuple[str, ...]]] = []
+    quote = None
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                if ch == "'" and out and out[-1] == "\\":
+                    out[-1] = "'"
+                else:
+                    out.append(ch)
+                escape = False
+            elif ch == "\\":
+                out.append(ch)
+                escape = True
+            elif ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ord(ch) >= 0x20:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if not stack:
+                break
+            # Close whatever is actually open, even if the model mismatched brackets
+            out.append("}" if stack.pop() == "{" else "]")
+            if not stack:
+                break
+        elif ch == ",":
+            commas.append((len(out), tuple(stack)))
+            out.append(ch)
+        elif ch in "TFN" and (i == 0 or not text[i - 1].isalnum()):
+            match = LITERAL_PATTERN.match(text, i)
+            if match:
+                out.append(PYTHON_LITERALS[match.group(1)])
+                i = match.end()
+                continue
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out), stack, quote is not None, commas
+
+
+def _closers(stack) -> str:
+    return "".join("}" if bracket == "{" else "]" for bracket in reversed(stack))
+
+
+def _close_dangling(text: str) -> str:
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text
+
+
+def _parsed_candidates(text: str) -> Iterator[Tuple[Any, bool]]:
+    """Yield ``(value, repaired)`` for each way of reading ``text`` as JSON, best first."""
+    text = (text or "").strip()
+    try:
+        yield json.loads(text), False
+        return
+    except ValueError:
+        pass
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        return
+    scanned, stack, open_string, commas = _scan(text[min(starts):])
+
+    candidates = [_close_dangling(scanned + ('"' if open_string else "")) + _closers(stack)]
+    # Truncated output: cut back to the last complete elements
+    for offset, open_brackets in reversed(commas[-MAX_TRUNCATION_CANDIDATES:]):
+        candidates.append(scanned[:offset] + _closers(open_brackets))
+
+    for candidate in candidates:
+        try:
+            yield json.loads(candidate), True
+        except ValueError:
+            continue
+
+
+def repair_json(text: str) -> Tuple[Any, bool]:
+    """Parse ``text`` as JSON, repairing common LLM mistakes if needed.
+
+    Returns ``(value, repaired)``. Handles surrounding prose and code fences,
+    single quotes, trailing commas, raw newlines in strings, Python
+    literals and output truncated mid-value. Raises ``ValueError`` if no
+    JSON value can be recovered.
+    """
+    for value, repaired in _parsed_candidates(text):
+        return value, repaired
+    raise ValueError("Response is not valid JSON and could not be repaired")
+
+
+def parse_structured(text: str, schema: Type[BaseModel]) -> Tuple[Dict, bool]:
+    """Repair, parse and validate ``text`` against ``schema``; returns ``(data, repaired)``.
+
+    When the output was truncated, the longest prefix that validates wins.
+    """
+    first_error = None
+    for value, repaired in _parsed_candidates(text):
+        try:
+            return schema.model_validate(value).model_dump(), repaired
+        except ValidationError as e:
+            first_error = first_error or e
+    if first_error is None:
+        raise StructuredOutputError("Response is not valid JSON and could not be repaired")
+    problems = "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'response'}: {error['msg']}"
+        for error in first_error.errors()[:5]
+    )
+    raise StructuredOutputError(f"Response does not match the expected format ({problems})")
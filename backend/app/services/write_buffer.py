@@ -0,0 +1,248 @@
+# File: backend/app/services/write_buffer.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import InsertOne, WriteConcern
+from pymongo.errors import BulkWriteError
+
+from .metrics import DB_WRITE_BATCH_SIZE, DB_WRITE_DOCUMENTS, ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Named durability levels accepted in the per-collection settings
+WRITE_CONCERNS = {
+    "unacknowledged": WriteConcern(w=0),
+    "acknowledged": WriteConcern(w=1),
+    "journaled": WriteConcern(w=1, j=True),
+    "majority": WriteConcern(w="majority", j=True),
+}
+
+# Callers wait for a flush instead of queueing more than this many batches
+MAX_PENDING_BATCHES = 10
+
+
+@dataclass
+class CollectionDurability:
+    """How writes to one collection are made durable.
+
+    ``write_behind`` queues writes in memory and flushes them in batches of
+    up to ``max_batch`` or after ``flush_interval`` seconds, whichever comes
+    first; ``write_concern`` is one of ``WRITE_CONCERNS`` and applies to both
+    buffered and direct writes.
+    """
+    write_behind: bool = False
+    write_concern: str = "acknowledged"
+    max_batch: int = 100
+    flush_interval: float = 0.2
+
+    def __post_init__(self):
+        if self.write_concern not in WRITE_CONCERNS:
+            raise ValueError(
+                f"Unknown write concern {self.write_concern!r}; expected one of {', '.join(WRITE_CONCERNS)}"
+            )
+
+
+@dataclass
+class _PendingWrite:
+    doc_id: Any
+    document: Optional[Dict]
+    operation: Any
+    sequence: int
+    enqueued_at: float
+    attempts: int = 0
+
+
+class WriteBehindBuffer:
+    """Batches MongoDB writes per collection and flushes them in the background.
+
+    Documents carry client-allocated ``_id`` values, so callers get their id
+    back as soon as the write is queued. Until a write is flushed its
+    document stays readable through ``pending``/``find_pending``. Batches are
+    written in order; a write rejected by the server (e.g. a duplicate key)
+    is logged and dropped, while connection errors re-queue the batch for up
+    to ``max_attempts`` flushes. ``close`` flushes everything that's left.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable[[str], Any],
+        durability: Dict[str, CollectionDurability],
+        max_attempts: int = 3
+    ):
+        self._get_collection = get_collection
+        self.durability = durability
+        self.max_attempts = max_attempts
+        self._queues: Dict[str, List[_PendingWrite]] = {}
+        # collection -> _id -> (sequence, document view) for read-your-writes
+        self._views: Dict[str, Dict[Any, tuple]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._sequence = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def enabled(self, collection: str) -> bool:
+        settings = self.durability.get(collection)
+        return bool(settings and settings.write_behind) and not self._closed
+
+    async def insert(self, collection: str, document: Dict) -> None:
+        """Queue an insert of ``document``, which must already have its ``_id``."""
+        await self._enqueue(collection, _PendingWrite(document["_id"], document, None, 0, 0.0), document)
+
+    async def write(self, collection: str, operation: Any, doc_id: Any, view: Dict) -> None:
+        """Queue ``operation`` (a pymongo write model such as an upserting ``UpdateOne``).
+
+        ``view`` is what reads should see for the document ``doc_id`` until it's flushed.
+        """
+        await self._enqueue(collection, _PendingWrite(doc_id, None, operation, 0, 0.0), view)
+
+    async def _enqueue(self, collection: str, write: _PendingWrite, view: Dict) -> None:
+        settings = self.durability[collection]
+        self._sequence += 1
+        write.sequence = self._sequence
+        write.enqueued_at = time.monotonic()
+        queue = self._queues.setdefault(collection, [])
+        queue.append(write)
+        self._views.setdefault(collection, {})[write.doc_id] = (write.sequence, view)
+        self._ensure_flusher()
+        if len(queue) == 1 or len(queue) >= settings.max_batch:
+            self._wake.set()
+        if len(queue) >= settings.max_batch * MAX_PENDING_BATCHES:
+            # Back-pressure: the flusher is falling behind, so write inline
+            await self.flush(collection)
+
+    def pending(self, collection: str, doc_id: Any) -> Optional[Dict]:
+        entry = self._views.get(collection, {}).get(doc_id)
+        return dict(entry[1]) if entry else None
+
+    def find_pending(self, collection: str, predicate: Callable[[Dict], bool]) -> Optional[Dict]:
+        for _, view in reversed(list(self._views.get(collection, {}).values())):
+            if predicate(view):
+                return dict(view)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {collection: len(queue) for collection, queue in self._queues.items()}
+
+    async def flush(self, collection: Optional[str] = None) -> None:
+        """Write everything queued for ``collection`` (or every collection) now."""
+        for name in [collection] if collection else list(self._queues):
+            while self._queues.get(name):
+                if not await self._flush_batch(name):
+                    break
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        # Whatever is still queued failed every attempt
+        for name, queue in self._queues.items():
+            if queue:
+                logger.error(f"Dropping {len(queue)} unwritten {name} documents on shutdown")
+                DB_WRITE_DOCUMENTS.inc(len(queue), collection=name, result="dropped")
+                queue.clear()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+
+    def _seconds_until_due(self) -> Optional[float]:
+        now = time.monotonic()
+        waits = [
+            queue[0].enqueued_at + self.durability[name].flush_interval - now
+            for name, queue in self._queues.items() if queue
+        ]
+        return max(min(waits), 0.0) if waits else None
+
+    def _due(self, name: str) -> bool:
+        queue = self._queues.get(name)
+        if not queue:
+            return False
+        settings = self.durability[name]
+        return len(queue) >= settings.max_batch or \
+            time.monotonic() - queue[0].enqueued_at >= settings.flush_interval
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._seconds_until_due())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for name in list(self._queues):
+                while self._due(name):
+                    try:
+                        if not await self._flush_batch(name):
+                            # Connection trouble; leave the rest for the next interval
+                            await asyncio.sleep(self.durability[name].flush_interval)
+                            break
+                    except Exception as e:
+                        logger.error(f"Write-behind flush of {name} failed: {str(e)}")
+                        break
+
+    async def _flush_batch(self, name: str) -> bool:
+        """Write the oldest batch for ``name``; returns False if it must be retried later."""
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            queue = self._queues.get(name)
+            if not queue:
+                return True
+            batch = queue[:self.durability[name].max_batch]
+            del queue[:len(batch)]
+            collection = self._get_collection(name)
+            DB_WRITE_BATCH_SIZE.observe(len(batch), collection=name)
+            try:
+                if all(write.operation is None for write in batch):
+                    await collection.insert_many([write.document for write in batch], ordered=True)
+                else:
+                    await collection.bulk_write([
+                        write.operation if write.operation is not None else InsertOne(write.document)
+                        for write in batch
+                    ], ordered=True)
+            except BulkWriteError as e:
+                # Ordered: everything before the failing write is stored, nothing after it ran
+                failed = e.details["writeErrors"][0]["index"]
+                logger.error(
+                    f"Write-behind {name} write for {batch[failed].doc_id} rejected: "
+                    f"{e.details['writeErrors'][0].get('errmsg')}"
+                )
+                ERRORS.inc(component="mongo.write_behind")
+                DB_WRITE_DOCUMENTS.inc(failed, collection=name, result="written")
+                DB_WRITE_DOCUMENTS.inc(collection=name, result="rejected")
+                self._forget(name, batch[:failed + 1])
+                queue[:0] = batch[failed + 1:]
+                return True
+            except Exception as e:
+                logger.warning(f"Write-behind flush of {len(batch)} {name} documents failed: {str(e)}")
+                ERRORS.inc(component="mongo.write_behind")
+                for write in batch:
+                    write.attempts += 1
+                retry = [write for write in batch if write.attempts < self.max_attempts]
+                dropped = [write for write in batch if write.attempts >= self.max_attempts]
+                if dropped:
+                    logger.error(f"Dropping {len(dropped)} {name} documents after {self.max_attempts} attempts")
+                    DB_WRITE_DOCUMENTS.inc(len(dropped), collection=name, result="dropped")
+                    self._forget(name, dropped)
+                queue[:0] = retry
+                return False
+            DB_WRITE_DOCUMENTS.inc(len(batch), collection=name, result="written")
+            self._forget(name, batch)
+            return True
+
+    def _forget(self, name: str, writes: List[_PendingWrite]) -> None:
+        views = self._views.get(name, {})
+        for write in writes:
+            entry = views.get(write.doc_id)
+            # A newer write to the same document keeps its view until it's flushed too
+            if entry and entry[0] == write.sequence:
+                del views[write.doc_id]
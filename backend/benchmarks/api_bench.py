@@ -0,0 +1,253 @@
+"""End-to-end HTTP benchmark of the FastAPI app, fully offline.
+
+Starts the fake Groq server, the corpus server and the backend itself (on
+uvicorn, with mongomock or a real MongoDB), then drives each endpoint with
+concurrent clients and reports throughput, latency percentiles and the
+mean per-stage breakdown taken from the ``Server-Timing`` header.
+
+    cd backend && python -m benchmarks.api_bench
+    cd backend && python -m benchmarks.api_bench --mongo url --mongodb-url mongodb://localhost:27017
+
+``--mongo mock`` (the default) needs ``pip install mongomock-motor``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+
+from .corpus_server import CorpusServer, corpus_pages
+from .fake_groq import FakeGroqServer
+from .llm_load_test import percentile
+
+BUSINESS_INFO = {
+    "company_name": "Bench Outreach",
+    "business_type": "Sales automation SaaS",
+    "product_description": "Personalized outbound email campaigns for B2B sales teams."
+}
+
+
+class AppServer:
+    """Runs an ASGI app on uvicorn in a background thread."""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "AppServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def load_app(mongo: str):
+    """Import the backend once the environment points at the fakes."""
+    from app import main
+    from app.config import get_settings
+    from app.dependencies import Services
+
+    if mongo == "mock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mongo mock requires mongomock-motor (pip install mongomock-motor)")
+        # The app's lifespan starts whatever services are already installed
+        main.app.state.services = Services(
+            get_settings(), main.process_job_url, mongo_client=AsyncMongoMockClient()
+        )
+    return main.app
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, duration = entry.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    make_request: Callable[[int], Tuple[str, str, Optional[Dict]]],
+    requests: int,
+    concurrency: int
+) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    responses: List[Optional[Dict]] = [None] * requests
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        method, path, body = make_request(i)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+            return
+        responses[i] = response.json()
+        for stage, duration in parse_server_timing(response.headers.get("server-timing")).items():
+            stages[stage].append(duration)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p90": percentile(latencies, 90) if latencies else 0.0,
+        "p99": percentile(latencies, 99) if latencies else 0.0,
+        "max": max(latencies) if latencies else 0.0,
+        "stages_ms": {stage: statistics.mean(values) for stage, values in stages.items()},
+        "responses": responses
+    }
+
+
+async def run_suite(base_url: str, corpus: CorpusServer, requests: int, concurrency: int) -> List[Dict]:
+    pages = corpus_pages()
+    # Unique per run so repeated runs against a real MongoDB don't hit stored analyses
+    run_id = str(int(time.time()))
+    urls = [corpus.url(f"{pages[i % len(pages)]}?run={run_id}&v={i}") for i in range(requests)]
+    results = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        analyze = await run_scenario(
+            client,
+            "POST /api/v1/analyze-website",
+            lambda i: ("POST", "/api/v1/analyze-website", {"url": urls[i], "force_refresh": True}),
+            requests,
+            concurrency
+        )
+        results.append(analyze)
+        ids = [r["analysis_id"] for r in analyze["responses"] if r]
+        if not ids:
+            raise SystemExit("No analyses were created; is the backend configured correctly?")
+
+        results.append(await run_scenario(
+            client,
+            "POST /api/v1/analyze-website (reused)",
+            lambda i: ("POST", "/api/v1/analyze-website", {"url": urls[i]}),
+            requests,
+            concurrency
+        ))
+        results.append(await run_scenario(
+            client,
+            "GET /api/v1/analyses",
+            lambda i: ("GET", "/api/v1/analyses?limit=50", None),
+            requests,
+            concurrency
+        ))
+        results.append(await run_scenario(
+            client,
+            "GET /api/v1/analyses/{id}",
+            lambda i: ("GET", f"/api/v1/analyses/{ids[i % len(ids)]}", None),
+            requests,
+            concurrency
+        ))
+        results.append(await run_scenario(
+            client,
+            "POST /api/v1/generate-email/{id}",
+            lambda i: (
+                "POST",
+                f"/api/v1/generate-email/{ids[i % len(ids)]}",
+                # A distinct business per request so neither the opportunity nor the LLM cache hits
+                {"business_info": {**BUSINESS_INFO, "company_name": f"Bench Outreach {run_id}-{i}"}}
+            ),
+            requests,
+            concurrency
+        ))
+        results.append(await run_scenario(
+            client,
+            "GET /api/v1/emails/{id}",
+            lambda i: ("GET", f"/api/v1/emails/{ids[i % len(ids)]}", None),
+            requests,
+            concurrency
+        ))
+
+    for result in results:
+        del result["responses"]
+    return results
+
+
+def print_report(results: List[Dict]) -> None:
+    print(
+        f"{'endpoint':<40} {'reqs':>5} {'errs':>5} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['endpoint']:<40} {r['requests']:>5} {r['errors']:>5} {r['throughput']:>8.1f} "
+            f"{r['p50'] * 1000:>8.1f} {r['p90'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f} {r['max'] * 1000:>8.1f}"
+        )
+    print("\nMean stage time (ms, from Server-Timing):")
+    for r in results:
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in r["stages_ms"].items())
+        print(f"  {r['endpoint']:<38} {stages}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="fake time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake seconds per completion token")
+    parser.add_argument("--groq-error-rate", type=float, default=0.0, help="fraction of fake Groq calls failing with 503")
+    parser.add_argument("--groq-rate-limit-rate", type=float, default=0.0, help="fraction failing with 429")
+    parser.add_argument("--site-latency", type=float, default=0.05, help="corpus server response delay (s)")
+    parser.add_argument("--mongo", choices=["mock", "url"], default="mock")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--app-port", type=int, default=8300)
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--corpus-port", type=int, default=8200)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    faults = {"error_rate": args.groq_error_rate, "rate_limit_rate": args.groq_rate_limit_rate}
+    with FakeGroqServer(args.groq_port, args.groq_latency, args.token_delay, **faults) as groq, \
+            CorpusServer(port=args.corpus_port, latency=args.site_latency) as corpus:
+        os.environ["GROQ_BASE_URL"] = groq.base_url
+        os.environ.setdefault("GROQ_API_KEY", "fake")
+        os.environ["MONGODB_URL"] = args.mongodb_url
+        app = load_app(args.mongo)
+        with AppServer(app, args.app_port) as server:
+            results = asyncio.run(run_suite(server.base_url, corpus, args.requests, args.concurrency))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Local static HTTP server replaying the recorded website corpus.
+
+Run standalone with:
+
+    python -m benchmarks.corpus_server --port 8200
+
+and analyze e.g. ``http://127.0.0.1:8200/acme-saas.html``. Query strings are
+ignored when serving, so ``?v=1``, ``?v=2``... give distinct URLs (and cache
+keys) for the same page.
+"""
+import argparse
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def corpus_pages() -> List[str]:
+    return sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith(".html"))
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def create_server(port: int = 8200, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Build the corpus server; each response is delayed by ``latency`` seconds."""
+
+    class Handler(_QuietHandler):
+        def do_GET(self) -> None:
+            if latency:
+                threading.Event().wait(latency)
+            super().do_GET()
+
+    handler = functools.partial(Handler, directory=CORPUS_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class CorpusServer:
+    """Runs the corpus server on a background thread for in-process benchmarks."""
+
+    def __init__(self, port: int = 8200, latency: float = 0.0):
+        self.port = port
+        self._server = create_server(port, latency)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def url(self, page: str) -> str:
+        return f"{self.base_url}/{page}"
+
+    def __enter__(self) -> "CorpusServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency", type=float, default=0.0, help="per-response delay (s)")
+    args = parser.parse_args()
+    server = create_server(args.port, args.latency)
+    print(f"Serving {len(corpus_pages())} pages from {CORPUS_DIR} on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,135 @@
+"""Memory and throughput of the streaming analyses export vs. building one JSON body.
+
+For each document count, exports synthetic analyses (about 1 KB each, like
+real ones) three ways and reports the ``tracemalloc`` peak and rows/s:
+
+* ``ndjson`` / ``csv``: ``export_stream`` over the documents as they come
+  off the cursor, the path behind ``GET /api/v1/export/analyses``;
+* ``materialized``: ``to_list`` of every document and one ``json.dumps``,
+  which is what a non-streaming endpoint returning everything would do.
+
+By default the documents come from an in-process generator standing in for
+a Motor cursor, so the numbers isolate the export code. With
+``--mongodb-url`` they are inserted into (and read back from) a real
+MongoDB through ``DatabaseHandler.iter_export``; mongomock isn't offered
+because it materializes every query result itself.
+
+    cd backend && python -m benchmarks.export_bench
+    cd backend && python -m benchmarks.export_bench --documents 10000 100000 --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List
+
+from bson import ObjectId
+
+from app.services.database import DatabaseHandler
+from app.services.export import DEFAULT_EXPORT_FIELDS, _json_default, export_stream
+
+FIELDS = DEFAULT_EXPORT_FIELDS["analyses"]
+START = datetime(2026, 1, 1)
+
+
+def make_analysis(i: int) -> Dict:
+    return {
+        "_id": ObjectId(),
+        "url": f"https://company-{i}.example.com",
+        "canonical_url": f"company-{i}.example.com",
+        "website_data": {
+            "title": f"Company {i} | Cloud software for growing teams",
+            "meta_description": "We help mid-market teams automate their revenue pipeline. " * 2,
+            "final_url": f"https://company-{i}.example.com/"
+        },
+        "analysis": {
+            "industry": "Software",
+            "market_position": "Challenger in mid-market SaaS",
+            "products_services": ["Workflow automation", "Analytics", "Integrations"],
+            "target_audience": "Revenue operations leaders at 50-500 person companies",
+            "unique_selling_points": ["Fast onboarding", "Native CRM sync", "SOC 2"],
+            "brand_voice": "Confident and friendly",
+            "customer_pain_points": ["Manual data entry", "Slow reporting", "Tool sprawl"],
+            "competitors": ["Acme Corp", "Globex", "Initech"],
+            "sales_approach": "Lead with time-to-value and a free pilot " * 3
+        },
+        "created_at": START + timedelta(seconds=i),
+        "updated_at": START + timedelta(seconds=i)
+    }
+
+
+async def synthetic_cursor(count: int) -> AsyncIterator[Dict]:
+    for i in range(count):
+        yield make_analysis(i)
+        if i % 500 == 0:
+            await asyncio.sleep(0)  # a Motor cursor yields to the loop between batches
+
+
+async def drain(chunks: AsyncIterator[bytes]) -> int:
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+async def measure(name: str, run) -> Dict:
+    """Time one run, then repeat it under tracemalloc (which slows it down) for the peak."""
+    started = time.perf_counter()
+    size = await run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mode": name, "seconds": elapsed, "peak_mb": peak / 1e6, "output_mb": size / 1e6}
+
+
+async def bench(count: int, db: DatabaseHandler = None) -> List[Dict]:
+    def docs() -> AsyncIterator[Dict]:
+        return db.iter_export("analyses", FIELDS) if db else synthetic_cursor(count)
+
+    async def materialized() -> int:
+        rows = [doc async for doc in docs()]
+        return len(json.dumps(rows, default=_json_default).encode("utf-8"))
+
+    return [
+        await measure("ndjson", lambda: drain(export_stream(docs(), "analyses", FIELDS, "ndjson"))),
+        await measure("csv", lambda: drain(export_stream(docs(), "analyses", FIELDS, "csv"))),
+        await measure("materialized", materialized)
+    ]
+
+
+async def seed(db: DatabaseHandler, count: int) -> None:
+    await db.db.analyses.drop()
+    for start in range(0, count, 1000):
+        await db.db.analyses.insert_many([make_analysis(i) for i in range(start, min(start + 1000, count))])
+
+
+async def main_async(args) -> None:
+    db = DatabaseHandler(args.mongodb_url) if args.mongodb_url else None
+    if db:
+        db.db = db.client[args.database]
+    print(f"source={'mongodb' if db else 'synthetic cursor'}\n")
+    print(f"{'documents':>10} {'mode':<13} {'peak MB':>8} {'output MB':>10} {'rows/s':>10}")
+    for count in args.documents:
+        if db:
+            await seed(db, count)
+        for r in await bench(count, db):
+            print(f"{count:>10} {r['mode']:<13} {r['peak_mb']:>8.2f} {r['output_mb']:>10.1f} {count / r['seconds']:>10.0f}")
+    if db:
+        await db.client.drop_database(args.database)
+        db.client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--mongodb-url", help="benchmark against this MongoDB instead of a synthetic cursor")
+    parser.add_argument("--database", default="salesgpt_export_bench", help="scratch database (dropped afterwards)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Microbenchmark for the HTML extraction backends.
+
+Runs every available backend from ``app.services.extraction`` over the saved
+pages in ``benchmarks/corpus`` and reports the median time per page, plus
+whether each backend's output agrees with the BeautifulSoup baseline.
+
+    cd backend && python -m benchmarks.extraction_bench --repeat 50
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from app.services.extraction import SoupExtractor, StreamingExtractor, lxml_available
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+BASE_URL = "https://example.com/"
+
+
+def load_corpus():
+    return {path.name: path.read_text(encoding="utf-8") for path in sorted(CORPUS_DIR.glob("*.html"))}
+
+
+def time_backend(extractor, html: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extractor.extract(html, BASE_URL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def normalize(result: dict) -> dict:
+    return {**result, "social_links": sorted(result["social_links"])}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = [SoupExtractor()]
+    if lxml_available():
+        backends.append(StreamingExtractor())
+    else:
+        print("lxml is not installed; only the soup backend will run")
+
+    corpus = load_corpus()
+    header = f"{'page':<24} {'KB':>6}" + "".join(f" {b.name + ' (ms)':>16}" for b in backends)
+    print(header + f" {'speedup':>8} {'same output':>12}")
+    totals = {b.name: 0.0 for b in backends}
+    for name, html in corpus.items():
+        timings = [time_backend(b, html, args.repeat) for b in backends]
+        for backend, timing in zip(backends, timings):
+            totals[backend.name] += timing
+        row = f"{name:<24} {len(html) / 1024:>6.1f}" + "".join(f" {t * 1000:>16.2f}" for t in timings)
+        if len(backends) > 1:
+            same = normalize(backends[0].extract(html, BASE_URL)) == normalize(backends[1].extract(html, BASE_URL))
+            row += f" {timings[0] / timings[1]:>7.1f}x {str(same):>12}"
+        print(row)
+    print(f"{'total':<31}" + "".join(f" {totals[b.name] * 1000:>16.2f}" for b in backends))
+
+
+if __name__ == "__main__":
+    main()
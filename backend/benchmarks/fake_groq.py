@@ -0,0 +1,295 @@
+"""Local fake of the Groq (OpenAI-compatible) chat completions API.
+
+Run standalone with:
+
+    python -m benchmarks.fake_groq --port 8100 --latency 0.8
+
+and point the backend at it with ``GROQ_BASE_URL=http://localhost:8100``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANALYSIS_RESPONSE = {
+    "industry": "Software",
+    "market_position": "Challenger in mid-market SaaS",
+    "products_services": ["Web development", "Cloud hosting"],
+    "target_audience": "SMBs going digital",
+    "unique_selling_points": ["Fast delivery", "Local support"],
+    "brand_voice": "Confident and friendly",
+    "customer_pain_points": ["Legacy systems", "Slow releases"],
+    "competitors": ["Acme Corp", "Globex"],
+    "sales_approach": "Lead with modernization ROI"
+}
+
+OPPORTUNITY_RESPONSE = {
+    "pain_points": ["Manual prospecting"],
+    "benefits": ["More qualified meetings"],
+    "value_metrics": ["30% higher reply rate"],
+    "competitive_edges": ["Personalization at scale"],
+    "use_cases": ["Outbound campaigns"]
+}
+
+EMAILS_RESPONSE = {
+    "emails": [
+        {"subject": f"Subject {i}", "body": f"Body {i}.", "call_to_action": f"CTA {i}"}
+        for i in range(1, 4)
+    ]
+}
+
+
+def _pick_response(messages) -> dict:
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if "email variations" in prompt:
+        return EMAILS_RESPONSE
+    if "pain_points" in prompt and "benefits" in prompt:
+        return OPPORTUNITY_RESPONSE
+    return ANALYSIS_RESPONSE
+
+
+def _usage(messages, content: str) -> dict:
+    # Roughly one "token" per 4 characters
+    prompt_tokens = len(json.dumps(messages)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def _stream_chunks(completion_id: str, model: str, content: str, token_delay: float, usage: dict):
+    async def generate():
+        for start in range(0, len(content), 4):
+            await asyncio.sleep(token_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 4]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        done = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage}
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return generate()
+
+
+class QuotaBucket:
+    """Groq-style per-minute quota: token buckets for requests and tokens holding ``burst`` seconds' worth."""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, burst: float = 10.0):
+        self.rates = (requests_per_minute / 60.0, tokens_per_minute / 60.0)
+        self.capacity = tuple(rate * burst for rate in self.rates)
+        self.available = list(self.capacity)
+        self.updated = time.monotonic()
+        self.rejected = 0
+
+    def take(self, tokens: int):
+        """None if the request fits, else the seconds until it would."""
+        now = time.monotonic()
+        for i, rate in enumerate(self.rates):
+            self.available[i] = min(self.available[i] + (now - self.updated) * rate, self.capacity[i])
+        self.updated = now
+        needs = (1, min(tokens, self.capacity[1]))
+        wait = max(
+            ((need - have) / rate if rate else 0.0) for need, have, rate in zip(needs, self.available, self.rates)
+        )
+        if wait > 0:
+            self.rejected += 1
+            return wait
+        for i, rate in enumerate(self.rates):
+            if rate:
+                self.available[i] -= needs[i]
+        return None
+
+
+def create_app(
+    latency: float = 0.5,
+    token_delay: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_after: float = 1.0,
+    rate_limited_models=None,
+    malformed_rate: float = 0.0,
+    model_speed=None,
+    requests_per_minute: int = 0,
+    tokens_per_minute: int = 0,
+    quota_burst: float = 10.0
+) -> FastAPI:
+    """Build a fake completions server.
+
+    Each call waits ``latency`` seconds (time to first token) and then
+    ``token_delay`` seconds per completion token, streamed or not. For
+    resilience testing, a fraction ``error_rate`` of calls fail with a 503
+    and ``rate_limit_rate`` with a 429 carrying ``Retry-After`` (only for
+    ``rate_limited_models`` when given). A fraction ``malformed_rate`` of
+    completions come back as repairable bad JSON (prose, code fence and a
+    trailing comma); in JSON mode those are rejected with Groq's
+    ``json_validate_failed`` 400 instead. ``model_speed`` maps model names
+    to a speed-up factor dividing both delays, to mimic smaller models.
+    ``requests_per_minute`` / ``tokens_per_minute`` enforce an account quota
+    per model like Groq's, answering 429 with Retry-After once exceeded;
+    ``app.state.quotas`` keeps the per-model rejection counts.
+    """
+    app = FastAPI()
+    app.state.latency = latency
+    app.state.token_delay = token_delay
+    app.state.error_rate = error_rate
+    app.state.rate_limit_rate = rate_limit_rate
+    app.state.retry_after = retry_after
+    app.state.rate_limited_models = set(rate_limited_models or ())
+    app.state.malformed_rate = malformed_rate
+    app.state.model_speed = dict(model_speed or {})
+    app.state.calls = {}
+    app.state.quotas = {}
+
+    def quota(model: str) -> QuotaBucket:
+        if model not in app.state.quotas:
+            app.state.quotas[model] = QuotaBucket(requests_per_minute, tokens_per_minute, quota_burst)
+        return app.state.quotas[model]
+
+    @app.get("/openai/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [
+            {"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+            for model in ("mixtral-8x7b-32768", "llama-3.1-8b-instant", *app.state.model_speed)
+        ]}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model")
+        app.state.calls[model] = app.state.calls.get(model, 0) + 1
+        limited = not app.state.rate_limited_models or model in app.state.rate_limited_models
+        if limited and random.random() < app.state.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(app.state.retry_after)}
+            )
+        if random.random() < app.state.error_rate:
+            return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=503)
+        content = json.dumps(_pick_response(messages))
+        if requests_per_minute or tokens_per_minute:
+            wait = quota(model).take(_usage(messages, content)["total_tokens"])
+            if wait is not None:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": f"{wait:.2f}"}
+                )
+        speed = app.state.model_speed.get(model, 1.0)
+        await asyncio.sleep(app.state.latency / speed)
+        if random.random() < app.state.malformed_rate:
+            content = f"Sure! Here is the JSON:\n```json\n{content[:-1]},}}\n```"
+            if (body.get("response_format") or {}).get("type") == "json_object":
+                return JSONResponse({"error": {
+                    "message": "Failed to generate JSON. Please adjust your prompt.",
+                    "type": "invalid_request_error",
+                    "code": "json_validate_failed",
+                    "failed_generation": content
+                }}, status_code=400)
+        usage = _usage(messages, content)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chunks(completion_id, body.get("model"), content, app.state.token_delay / speed, usage),
+                media_type="text/event-stream"
+            )
+        await asyncio.sleep(app.state.token_delay / speed * usage["completion_tokens"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    return app
+
+
+class FakeGroqServer:
+    """Runs the fake server on a background thread for in-process benchmarks."""
+
+    def __init__(self, port: int = 8100, latency: float = 0.5, token_delay: float = 0.0, **faults):
+        self.port = port
+        self.app = create_app(latency, token_delay, **faults)
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FakeGroqServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s (s)")
+    parser.add_argument("--rate-limited-models", nargs="*", help="only rate limit these models")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of completions with bad JSON")
+    parser.add_argument("--model-speed", nargs="*", default=[], metavar="MODEL=FACTOR",
+                        help="make these models FACTOR times faster")
+    parser.add_argument("--rpm", type=int, default=0, help="requests-per-minute quota per model (429 beyond it)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens-per-minute quota per model")
+    parser.add_argument("--quota-burst", type=float, default=10.0, help="seconds of quota that can be used at once")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(
+            args.latency,
+            args.token_delay,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after,
+            rate_limited_models=args.rate_limited_models,
+            malformed_rate=args.malformed_rate,
+            model_speed={
+                model: float(factor) for model, _, factor in (item.partition("=") for item in args.model_speed)
+            },
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            quota_burst=args.quota_burst
+        ),
+        host="127.0.0.1",
+        port=args.port
+    )
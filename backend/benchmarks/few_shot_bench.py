@@ -0,0 +1,225 @@
+"""Few-shot analysis on a cheaper model vs. the single-shot default: latency, tokens, agreement.
+
+Scrapes every page of ``benchmarks/corpus`` and analyzes it three ways:
+
+* ``single``: the current single-shot prompt on the default model (the reference),
+* ``rerun``:  the same again, showing how much the reference disagrees with itself,
+* ``few_shot``: the cheaper model given the nearest *other* pages' reference
+  analyses as examples (leave-one-out, so a page never sees its own analysis).
+
+For each mode it reports latency, prompt/completion tokens and estimated cost
+per analysis, plus the mean per-field word overlap (Jaccard) with the reference.
+
+    cd backend && python -m benchmarks.few_shot_bench                      # fake Groq, offline
+    cd backend && GROQ_API_KEY=... python -m benchmarks.few_shot_bench --live
+
+Offline, the fake server returns a canned analysis, so agreement is trivially
+perfect and ``--fake-speedup`` sets how much faster the cheap model is; the
+latency and token numbers still reflect the real prompts. Needs
+``pip install mongomock-motor`` for the example store.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from app.services.analyzer import CompanyAnalyzer
+from app.services.database import DatabaseHandler
+from app.services.dedup import canonicalize_url
+from app.services.few_shot import FewShotSelector
+from app.services.llm_client import LLMClient
+from app.services.metrics import LLM_TOKENS
+from app.services.prompt_builder import PromptBuilder
+from app.services.scraper import WebScraper
+from app.services.similarity import AnalysisIndex
+from app.services.structured_output import CompanyAnalysis
+
+from .corpus_server import CorpusServer, corpus_pages
+from .fake_groq import FakeGroqServer
+
+# USD per million (prompt, completion) tokens, Groq list prices at the time of writing
+PRICES = {
+    "mixtral-8x7b-32768": (0.24, 0.24),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "gemma2-9b-it": (0.20, 0.20),
+}
+
+WORD = re.compile(r"[a-z0-9]+")
+FIELDS = list(CompanyAnalysis.model_fields)
+
+
+def _words(value) -> set:
+    if isinstance(value, list):
+        value = " ".join(str(item) for item in value)
+    return set(WORD.findall(str(value or "").lower()))
+
+
+def agreement(analysis: Dict, reference: Dict) -> Dict[str, float]:
+    """Per-field Jaccard overlap of the words in ``analysis`` and ``reference``."""
+    scores = {}
+    for field in FIELDS:
+        ours, theirs = _words(analysis.get(field)), _words(reference.get(field))
+        scores[field] = len(ours & theirs) / len(ours | theirs) if ours | theirs else 1.0
+    return scores
+
+
+def token_totals(model: str, call_site: str) -> Dict[str, float]:
+    return {kind: LLM_TOKENS.value(model=model, call_site=call_site, kind=kind) for kind in ("prompt", "completion")}
+
+
+async def run(args, groq_base_url: str, corpus: CorpusServer) -> List[Dict]:
+    llm = LLMClient(
+        api_key=os.environ.get("GROQ_API_KEY", "fake"),
+        base_url=groq_base_url,
+        max_concurrency=4,
+        timeout=120.0,
+        cache=None,
+        model=args.model,
+        hedge_delay=0.0
+    )
+    scraper = WebScraper()
+    await scraper.start()
+
+    from mongomock_motor import AsyncMongoMockClient
+    db = DatabaseHandler("mongodb://unused", client=AsyncMongoMockClient())
+    index = AnalysisIndex()
+    db.analysis_index = index
+    prompts = PromptBuilder(model=args.model, content_token_budget=args.content_budget)
+    selector = FewShotSelector(index, db, examples=args.examples, min_similarity=args.min_similarity)
+    analyzer = CompanyAnalyzer(llm, prompts, few_shot=selector, few_shot_model=args.few_shot_model)
+
+    pages = {page: await scraper.scrape_website(corpus.url(page)) for page in corpus_pages()}
+    results = {mode: defaultdict(list) for mode in ("single", "rerun", "few_shot")}
+    references: Dict[str, Dict] = {}
+    fallbacks = 0
+
+    try:
+        for mode in ("single", "rerun"):
+            for _ in range(args.rounds):
+                for page, website_data in pages.items():
+                    start = time.perf_counter()
+                    analysis = await analyzer.analyze_company(website_data, use_cache=False, few_shot=False)
+                    results[mode]["latency"].append(time.perf_counter() - start)
+                    if mode == "single" and page not in references:
+                        references[page] = analysis
+                        await db.save_analysis(
+                            website_data["final_url"], website_data, analysis,
+                            canonical_url=canonicalize_url(website_data["final_url"])
+                        )
+                    else:
+                        results[mode]["agreement"].append(agreement(analysis, references[page]))
+
+        for _ in range(args.rounds):
+            for page, website_data in pages.items():
+                examples = await selector.select(website_data)
+                start = time.perf_counter()
+                if examples:
+                    results["few_shot"]["similarity"].append(statistics.mean(e["score"] for e in examples))
+                    analysis = await analyzer.analyze_company(website_data, use_cache=False)
+                else:
+                    fallbacks += 1
+                    analysis = await analyzer.analyze_company(website_data, use_cache=False, few_shot=False)
+                results["few_shot"]["latency"].append(time.perf_counter() - start)
+                results["few_shot"]["agreement"].append(agreement(analysis, references[page]))
+    finally:
+        await scraper.close()
+        await llm.close()
+
+    single_calls = len(results["single"]["latency"]) + len(results["rerun"]["latency"]) + fallbacks
+    few_shot_calls = len(results["few_shot"]["latency"]) - fallbacks
+    usage = {
+        "single": (token_totals(args.model, "analysis"), single_calls, args.model),
+        "few_shot": (token_totals(args.few_shot_model, "analysis_few_shot"), few_shot_calls, args.few_shot_model),
+    }
+
+    report = []
+    for mode, samples in results.items():
+        tokens, calls, model = usage["few_shot" if mode == "few_shot" else "single"]
+        prompt_tokens = tokens["prompt"] / calls if calls else 0.0
+        completion_tokens = tokens["completion"] / calls if calls else 0.0
+        price_in, price_out = PRICES.get(model, (0.0, 0.0))
+        field_means = {
+            field: statistics.mean(scores[field] for scores in samples["agreement"])
+            for field in FIELDS
+        } if samples["agreement"] else {}
+        report.append({
+            "mode": mode,
+            "model": model,
+            "analyses": len(samples["latency"]),
+            "p50": statistics.median(samples["latency"]),
+            "mean": statistics.mean(samples["latency"]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_per_1k": (prompt_tokens * price_in + completion_tokens * price_out) / 1000,
+            "agreement": statistics.mean(field_means.values()) if field_means else None,
+            "field_agreement": field_means,
+            "example_similarity": statistics.mean(samples["similarity"]) if samples["similarity"] else None,
+            "fallbacks": fallbacks if mode == "few_shot" else 0
+        })
+    return report
+
+
+def print_report(report: List[Dict]) -> None:
+    print(
+        f"{'mode':<10} {'model':<24} {'n':>4} {'p50 ms':>8} {'mean ms':>8} "
+        f"{'prompt tok':>10} {'compl tok':>9} {'$/1k':>7} {'agree':>6}"
+    )
+    for r in report:
+        agree = f"{r['agreement']:.2f}" if r["agreement"] is not None else "-"
+        print(
+            f"{r['mode']:<10} {r['model']:<24} {r['analyses']:>4} {r['p50'] * 1000:>8.0f} {r['mean'] * 1000:>8.0f} "
+            f"{r['prompt_tokens']:>10.0f} {r['completion_tokens']:>9.0f} {r['cost_per_1k']:>7.3f} {agree:>6}"
+        )
+    print("\nPer-field agreement with the single-shot reference:")
+    for r in report:
+        if r["field_agreement"]:
+            fields = ", ".join(f"{field} {score:.2f}" for field, score in r["field_agreement"].items())
+            print(f"  {r['mode']:<10} {fields}")
+    few_shot = next(r for r in report if r["mode"] == "few_shot")
+    if few_shot["example_similarity"] is not None:
+        print(f"\nMean example similarity {few_shot['example_similarity']:.2f}; "
+              f"{few_shot['fallbacks']} analyses fell back to single-shot")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="call Groq (GROQ_API_KEY) instead of the fake server")
+    parser.add_argument("--model", default="mixtral-8x7b-32768", help="single-shot model")
+    parser.add_argument("--few-shot-model", default="llama-3.1-8b-instant")
+    parser.add_argument("--examples", type=int, default=2, help="few-shot examples per analysis")
+    parser.add_argument("--min-similarity", type=float, default=-1.0,
+                        help="below this, fall back to single-shot (the default -1 forces few-shot for every page)")
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the corpus per mode")
+    parser.add_argument("--content-budget", type=int, default=1200, help="prompt content token budget")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="fake time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.004, help="fake seconds per completion token")
+    parser.add_argument("--fake-speedup", type=float, default=3.0, help="how much faster the fake cheap model is")
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--corpus-port", type=int, default=8200)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with CorpusServer(port=args.corpus_port) as corpus:
+        if args.live:
+            report = asyncio.run(run(args, os.environ.get("GROQ_BASE_URL", ""), corpus))
+        else:
+            with FakeGroqServer(
+                args.groq_port, args.groq_latency, args.token_delay,
+                model_speed={args.few_shot_model: args.fake_speedup}
+            ) as groq:
+                report = asyncio.run(run(args, groq.base_url, corpus))
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
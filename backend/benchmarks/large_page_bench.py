@@ -0,0 +1,183 @@
+"""Peak memory and latency of fetching oversized pages: buffered vs. streaming.
+
+Serves synthetic pages from a separate process and fetches each one with
+
+* ``buffered``: the old path, ``client.get`` of the whole body, decode it and
+  ``extractor.extract`` the text;
+* ``streaming``: ``WebScraper.fetch_page``, which streams the body into the
+  incremental parser, stops at ``--max-bytes`` or once ``--max-content-chars``
+  of main content are extracted, and rejects non-HTML content types unread.
+
+    cd backend && python -m benchmarks.large_page_bench
+    cd backend && python -m benchmarks.large_page_bench --size-mb 20 --backend soup
+
+Peak memory is the ``tracemalloc`` peak of Python allocations during the
+fetch (response bytes, decoded text, soup trees); memory allocated inside
+libxml2 isn't counted. The corpus pages are included to show ordinary pages
+are unaffected.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+import httpx
+
+from app.services.extraction import create_extractor
+from app.services.scraper import DEFAULT_HEADERS, WebScraper, WebScraperError
+
+from .corpus_server import CORPUS_DIR, corpus_pages
+
+PRODUCT = (
+    '<li class="product"><a href="/p/{i}"><img src="/img/{i}.jpg" alt="Product {i}"></a>'
+    '<h3>Product {i}</h3><p>Hand-made widget number {i}, ships in two days.</p></li>\n'
+)
+
+
+def inline_state_page(size: int) -> bytes:
+    """A short landing page followed by a huge inline JSON blob, like a hydrated SPA."""
+    head = (
+        '<html><head><title>Acme Cloud</title><meta name="description" content="Cloud hosting for SMBs">'
+        '</head><body><main class="main-content"><h1>Acme Cloud</h1><p>Managed hosting and support for growing teams.</p></main>'
+        '<script id="__STATE__" type="application/json">{"items":['
+    )
+    item = '{"id":12345,"name":"Widget","tags":["a","b","c"],"price":19.99},'
+    body = item * ((size - len(head)) // len(item))
+    return (head + body + '{}]}</script></body></html>').encode()
+
+
+def product_grid_page(size: int) -> bytes:
+    """An e-commerce listing whose main content keeps going for megabytes."""
+    head = '<html><head><title>Widget Store</title></head><body><main class="main-content"><h1>All widgets</h1><ul>'
+    rows, length, i = [], len(head), 0
+    while length < size:
+        row = PRODUCT.format(i=i)
+        rows.append(row)
+        length += len(row)
+        i += 1
+    return (head + "".join(rows) + "</ul></main></body></html>").encode()
+
+
+def build_pages(size: int) -> Dict[str, Tuple[str, bytes]]:
+    pages = {
+        "inline-state.html": ("text/html; charset=utf-8", inline_state_page(size)),
+        "product-grid.html": ("text/html; charset=utf-8", product_grid_page(size)),
+        "brochure.pdf": ("application/pdf", b"%PDF-1.7\n" + b"\0" * size),
+    }
+    for name in corpus_pages():
+        with open(f"{CORPUS_DIR}/{name}", "rb") as f:
+            pages[name] = ("text/html", f.read())
+    return pages
+
+
+def serve(port: int, size: int, ready) -> None:
+    pages = build_pages(size)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            content_type, body = pages[self.path.lstrip("/")]
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            view = memoryview(body)
+            try:
+                for start in range(0, len(body), 65536):
+                    self.wfile.write(view[start:start + 65536])
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # the streaming client stopped reading
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    ready.set()
+    server.serve_forever()
+
+
+async def fetch_buffered(client: httpx.AsyncClient, extractor, url: str) -> Dict:
+    response = await client.get(url)
+    response.raise_for_status()
+    data = extractor.extract(response.text, str(response.url))
+    data["bytes"] = len(response.content)
+    return data
+
+
+async def measure(fetch, url: str, repeat: int) -> Dict:
+    tracemalloc.start()
+    try:
+        outcome = await fetch(url)
+    except (WebScraperError, httpx.HTTPError) as e:
+        outcome = e
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            await fetch(url)
+        except (WebScraperError, httpx.HTTPError):
+            pass
+        latencies.append(time.perf_counter() - started)
+    if isinstance(outcome, Exception):
+        result = f"rejected: {outcome}"[:40]
+    else:
+        result = f"{outcome['bytes'] / 1e6:.2f} MB read, {len(outcome['main_content']) / 1000:.0f}k chars"
+    return {"peak_mb": peak / 1e6, "ms": statistics.median(latencies) * 1000, "result": result}
+
+
+async def run(args, base_url: str, pages) -> None:
+    extractor = create_extractor(args.backend)
+    scraper = WebScraper(
+        extraction_backend=args.backend,
+        max_bytes=args.max_bytes,
+        max_content_chars=args.max_content_chars,
+        cache_freshness_seconds=0,
+        http2=False
+    )
+    await scraper.start()
+    async with httpx.AsyncClient(headers=DEFAULT_HEADERS, timeout=60.0) as client:
+        modes = {
+            "buffered": lambda url: fetch_buffered(client, extractor, url),
+            "streaming": scraper.fetch_page,
+        }
+        print(f"backend={extractor.name} max_bytes={args.max_bytes} max_content_chars={args.max_content_chars}\n")
+        print(f"{'page':<24} {'MB':>6} {'mode':<10} {'peak MB':>8} {'p50 ms':>8}  result")
+        for name, (_, body) in pages.items():
+            for mode, fetch in modes.items():
+                r = await measure(fetch, f"{base_url}/{name}", args.repeat)
+                print(f"{name:<24} {len(body) / 1e6:>6.2f} {mode:<10} {r['peak_mb']:>8.2f} {r['ms']:>8.1f}  {r['result']}")
+    await scraper.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=10.0, help="size of the synthetic pages")
+    parser.add_argument("--backend", default="auto", help="extraction backend (auto | streaming | soup)")
+    parser.add_argument("--max-bytes", type=int, default=2_000_000)
+    parser.add_argument("--max-content-chars", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed fetches per page and mode")
+    parser.add_argument("--port", type=int, default=8210)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1e6)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.port, size, ready), daemon=True)
+    server.start()
+    ready.wait()
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{args.port}", build_pages(size)))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
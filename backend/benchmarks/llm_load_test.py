@@ -0,0 +1,93 @@
+"""Load test for the async LLM client layer against a local fake Groq server.
+
+Simulates N concurrent users each running ``CompanyAnalyzer.analyze_company``
+while a probe coroutine measures how long a trivial request (standing in for
+``/health``) waits for the event loop. Reports p50/p99 latency per
+concurrency level so the effect of ``LLM_MAX_CONCURRENCY`` is visible.
+
+    cd backend && python -m benchmarks.llm_load_test --users 1 4 16 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from app.services.analyzer import CompanyAnalyzer
+from app.services.llm_client import LLMClient
+
+from .fake_groq import FakeGroqServer
+
+WEBSITE_DATA = {
+    "title": "Acme Corp",
+    "meta_description": "Acme builds everything.",
+    "main_content": "Acme Corp sells rockets, anvils and giant magnets. " * 50,
+    "social_links": ["https://twitter.com/acme"],
+    "contact_info": {"email": "hello@acme.com", "phone": None, "address": None}
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _user(analyzer: CompanyAnalyzer, requests: int, latencies: List[float]) -> None:
+    for _ in range(requests):
+        start = time.perf_counter()
+        await analyzer.analyze_company(WEBSITE_DATA)
+        latencies.append(time.perf_counter() - start)
+
+
+async def _probe(stop: asyncio.Event, lags: List[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def run_level(base_url: str, users: int, requests: int, max_concurrency: int) -> dict:
+    llm = LLMClient(api_key="fake", base_url=base_url, max_concurrency=max_concurrency)
+    analyzer = CompanyAnalyzer(llm)
+    latencies: List[float] = []
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(_user(analyzer, requests, latencies) for _ in range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    await llm.close()
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "loop_lag_p99": percentile(lags, 99) if lags else 0.0
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=5, help="requests per user")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake completion latency (s)")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    with FakeGroqServer(port=args.port, latency=args.latency) as server:
+        print(f"{'users':>6} {'reqs':>6} {'req/s':>8} {'p50 (s)':>8} {'p99 (s)':>8} {'loop lag p99 (ms)':>18}")
+        for users in args.users:
+            result = asyncio.run(run_level(server.base_url, users, args.requests, args.max_concurrency))
+            print(
+                f"{result['users']:>6} {result['requests']:>6} {result['throughput']:>8.1f} "
+                f"{result['p50']:>8.3f} {result['p99']:>8.3f} {result['loop_lag_p99'] * 1000:>18.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""The backend app on mongomock, importable by uvicorn worker processes.
+
+    uvicorn benchmarks.mock_app:app --workers 4
+
+Each worker gets its own in-memory database, so workers only share what goes
+through the shared store (set ``SHARED_STORE_BACKEND=sqlite``). Needs
+``pip install mongomock-motor``.
+"""
+from mongomock_motor import AsyncMongoMockClient
+
+from app import main
+from app.config import get_settings
+from app.dependencies import Services
+
+main.app.state.services = Services(get_settings(), main.process_job_url, mongo_client=AsyncMongoMockClient())
+app = main.app
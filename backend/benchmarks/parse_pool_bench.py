@@ -0,0 +1,115 @@
+"""Event-loop lag and scraping throughput with HTML parsing inline vs. in a pool.
+
+Serves the corpus plus a large synthetic product-grid page (from
+``large_page_bench``) in a separate process, and drives ``WebScraper.fetch_page``
+from ``--clients`` concurrent loops for ``--duration`` seconds, once per
+parse mode:
+
+* ``inline``: parsing on the event loop (``SCRAPER_PARSE_POOL=off``);
+* ``thread`` / ``process``: a ``ParsePool`` of ``--workers``.
+
+While it runs, a probe task sleeps 10 ms at a time and records how late it
+wakes up; that lateness is what every other request on the worker (LLM
+streams, health checks, DB callbacks) would see.
+
+    cd backend && python -m benchmarks.parse_pool_bench
+    cd backend && python -m benchmarks.parse_pool_bench --size-mb 4 --workers 4 --clients 16
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from app.services.parse_pool import ParsePool
+from app.services.scraper import WebScraper
+
+from .corpus_server import corpus_pages
+from .large_page_bench import serve
+from .llm_load_test import _probe, percentile
+
+
+async def run_mode(args, mode: str, urls: List[str]) -> Dict:
+    pool = None if mode == "inline" else ParsePool(mode, workers=args.workers, max_pending=args.max_pending)
+    scraper = WebScraper(
+        extraction_backend=args.backend,
+        max_bytes=args.max_bytes,
+        max_content_chars=0,  # parse every page in full: the worst case for the loop
+        cache_freshness_seconds=0,
+        http2=False,
+        parse_pool=pool
+    )
+    await scraper.start()
+    if pool is not None:
+        await pool.start(scraper.extractor.name)
+
+    latencies: List[float] = []
+    lags: List[float] = []
+    stop = asyncio.Event()
+
+    async def client_loop(offset: int, stop_at: float) -> None:
+        i = offset
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            await scraper.fetch_page(urls[i % len(urls)])
+            latencies.append(time.perf_counter() - started)
+            i += 1
+
+    probe = asyncio.create_task(_probe(stop, lags))
+    started = time.monotonic()
+    await asyncio.gather(*(client_loop(n, started + args.duration) for n in range(args.clients)))
+    elapsed = time.monotonic() - started
+    stop.set()
+    await probe
+    await scraper.close()
+    if pool is not None:
+        await pool.close()
+    return {
+        "mode": mode,
+        "pages_per_second": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "lag_p50": statistics.median(lags),
+        "lag_p99": percentile(lags, 99),
+        "lag_max": max(lags)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--size-mb", type=float, default=1.0, help="size of the large product-grid page")
+    parser.add_argument("--backend", default="auto", help="extraction backend (auto | streaming | soup)")
+    parser.add_argument("--workers", type=int, default=0, help="pool workers (0 = one per CPU)")
+    parser.add_argument("--max-pending", type=int, default=0, help="pages in the pool at once (0 = 2 per worker)")
+    parser.add_argument("--max-bytes", type=int, default=20_000_000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--port", type=int, default=8211)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.port, int(args.size_mb * 1e6), ready), daemon=True)
+    server.start()
+    ready.wait()
+    base_url = f"http://127.0.0.1:{args.port}"
+    # One large page for every corpus page
+    urls = [u for name in corpus_pages() for u in (f"{base_url}/{name}", f"{base_url}/product-grid.html")]
+    try:
+        results = [asyncio.run(run_mode(args, mode, urls)) for mode in args.modes]
+    finally:
+        server.terminate()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, product grid {args.size_mb:.1f} MB, backend={args.backend}\n")
+    print(f"{'mode':<8} {'pages/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for r in results:
+        print(
+            f"{r['mode']:<8} {r['pages_per_second']:>8.1f} {r['p50'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f} "
+            f"{r['lag_p50'] * 1000:>11.2f} {r['lag_p99'] * 1000:>11.2f} {r['lag_max'] * 1000:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Payload size and serialization time of the analysis endpoints' responses.
+
+Builds each endpoint's response body from the corpus pages (website data as
+the scraper extracts it, plus a typical analysis) and times encoding it:
+
+* ``before``: FastAPI's default path for a returned dict, ``jsonable_encoder``
+  followed by the stdlib ``JSONResponse``;
+* ``orjson``: ``FastJSONResponse`` returned directly, same body;
+* ``fields``: ``FastJSONResponse`` with a typical ``fields=`` selection
+  (what a UI card needs: title, URL, description and the analysis);
+
+and reports the size of each body uncompressed, gzipped and brotli'd at the
+``CompressionMiddleware`` defaults, with the time compression takes.
+
+    cd backend && python -m benchmarks.response_bench
+    cd backend && python -m benchmarks.response_bench --repeat 500
+"""
+import argparse
+import statistics
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.compression import brotli
+from app.services.database import ANALYSIS_SUMMARY_PROJECTION
+from app.services.extraction import SoupExtractor
+from app.services.responses import FastJSONResponse, select_fields
+
+from .export_bench import make_analysis
+from .extraction_bench import BASE_URL, load_corpus
+
+CARD_FIELDS = ["website_data.title", "website_data.final_url", "website_data.meta_description", "analysis"]
+LIST_FIELDS = ["url", "website_data.title", "analysis.industry", "analysis.target_audience"]
+
+
+def stored_analyses() -> List[Dict]:
+    """One stored analysis document per corpus page."""
+    extractor = SoupExtractor()
+    docs = []
+    for i, (name, html) in enumerate(load_corpus().items()):
+        website_data = extractor.extract(html, BASE_URL + name)
+        website_data["final_url"] = BASE_URL + name
+        doc = make_analysis(i)
+        doc.update(website_data=website_data, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        docs.append(doc)
+    return docs
+
+
+def endpoint_bodies(docs: List[Dict]) -> Dict[str, Dict[str, Dict]]:
+    """endpoint -> {"full": body, "fields": body} as each endpoint returns them."""
+    largest = max(docs, key=lambda doc: len(doc["website_data"]["main_content"]))
+    stored = {**largest, "_id": str(largest["_id"])}
+    analyze = {
+        "status": "success",
+        "analysis_id": stored["_id"],
+        "website_data": largest["website_data"],
+        "analysis": largest["analysis"],
+        "reused": False
+    }
+    page = [docs[i % len(docs)] for i in range(50)]
+    summaries = [
+        {"_id": str(ObjectId()), **select_fields(doc, list(ANALYSIS_SUMMARY_PROJECTION))} for doc in page
+    ]
+    listed = [{"_id": str(ObjectId()), **select_fields(doc, LIST_FIELDS)} for doc in page]
+    full_page = [{**doc, "_id": str(ObjectId())} for doc in page]
+    return {
+        "POST analyze-website": {
+            "full": analyze,
+            "fields": {**analyze, **select_fields(analyze, CARD_FIELDS)}
+        },
+        "GET analyses/{id}": {
+            "full": {"status": "success", "analysis": stored},
+            "fields": {"status": "success", "analysis": {"_id": stored["_id"], **select_fields(stored, CARD_FIELDS)}}
+        },
+        "GET analyses (50)": {
+            "full": {"status": "success", "analyses": summaries, "next_cursor": "x" * 60},
+            "fields": {"status": "success", "analyses": listed, "next_cursor": "x" * 60}
+        },
+        "GET analyses (50, full docs)": {
+            "full": {"status": "success", "analyses": full_page, "next_cursor": "x" * 60},
+            "fields": {"status": "success", "analyses": listed, "next_cursor": "x" * 60}
+        }
+    }
+
+
+def median_ms(run: Callable[[], bytes], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    args = parser.parse_args()
+
+    def gzip(body: bytes) -> bytes:
+        compressor = zlib.compressobj(args.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+
+    def br(body: bytes) -> bytes:
+        return brotli.compress(body, quality=args.brotli_quality)
+
+    print(f"{'endpoint':<30} {'variant':<7} {'KB':>8} {'encode ms':>10} {'gzip KB':>8} {'gzip ms':>8}"
+          + (f" {'br KB':>8} {'br ms':>7}" if brotli else ""))
+    for endpoint, bodies in endpoint_bodies(stored_analyses()).items():
+        variants = [
+            ("before", bodies["full"], lambda b: JSONResponse(jsonable_encoder(b)).body),
+            ("orjson", bodies["full"], lambda b: FastJSONResponse(b).body),
+            ("fields", bodies["fields"], lambda b: FastJSONResponse(b).body)
+        ]
+        for name, body, encode in variants:
+            encoded = encode(body)
+            row = (
+                f"{endpoint:<30} {name:<7} {len(encoded) / 1024:>8.1f} "
+                f"{median_ms(lambda: encode(body), args.repeat):>10.3f} "
+                f"{len(gzip(encoded)) / 1024:>8.1f} {median_ms(lambda: gzip(encoded), args.repeat):>8.3f}"
+            )
+            if brotli:
+                row += f" {len(br(encoded)) / 1024:>8.1f} {median_ms(lambda: br(encoded), args.repeat):>7.3f}"
+            print(row)
+    if not brotli:
+        print("\nbrotli is not installed; only gzip was measured")
+
+
+if __name__ == "__main__":
+    main()
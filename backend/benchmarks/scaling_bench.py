@@ -0,0 +1,223 @@
+"""Throughput of the backend vs. uvicorn worker count under a shared Groq quota.
+
+Starts the fake Groq server (enforcing a requests-per-minute quota like
+Groq's), the corpus server, and then the backend with 1, 2, 4, ... uvicorn
+workers in turn. Each run drives ``POST /api/v1/analyze-website`` (with
+``force_refresh``, so every request calls Groq) from enough clients to keep
+every worker busy, and reports throughput, latency and how many requests
+Groq rejected with 429.
+
+    cd backend && python -m benchmarks.scaling_bench
+    cd backend && python -m benchmarks.scaling_bench --workers 1 2 4 8 --rpm 600 --compare-unlimited
+
+Each worker is capped at ``--llm-concurrency`` Groq calls in flight, so
+throughput should grow linearly with workers until it reaches the quota and
+then stay flat at the quota without 429s, because the workers share one
+token bucket. ``--compare-unlimited`` adds a run at the largest worker
+count with the shared limiter off, for comparison.
+
+With ``--mongo mock`` (the default, needs ``pip install mongomock-motor``)
+each worker has its own in-memory database and the workers share state
+through a SQLite ``SharedStore``; ``--mongo url`` uses a real MongoDB for
+both.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from .corpus_server import CorpusServer, corpus_pages
+from .fake_groq import FakeGroqServer
+from .llm_load_test import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_backend(args, workers: int, limited: bool, groq_url: str, store_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": groq_url,
+        # Keep every call on one model (and one quota) and avoid hedged duplicates
+        "GROQ_FALLBACK_MODEL": "",
+        "LLM_HEDGE_DELAY_SECONDS": "0",
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        "GROQ_REQUESTS_PER_MINUTE": str(args.rpm if limited else 0),
+        "GROQ_RATE_LIMIT_BURST_SECONDS": str(args.quota_burst),
+        "SIMILARITY_INDEX_ENABLED": "false",
+    }
+    if args.mongo == "mock":
+        app = "benchmarks.mock_app:app"
+        env.update(SHARED_STORE_BACKEND="sqlite", SHARED_STORE_SQLITE_PATH=store_path)
+    else:
+        app = "app.main:app"
+        env.update(MONGODB_URL=args.mongodb_url, SHARED_STORE_BACKEND="mongo")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app,
+            "--host", "127.0.0.1", "--port", str(args.app_port),
+            "--workers", str(workers), "--log-level", "warning"
+        ],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+
+
+async def wait_until_up(base_url: str, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"Backend exited with code {process.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit("Backend did not come up")
+
+
+async def drive(base_url: str, urls: List[str], clients: int, warmup: float, duration: float, groq) -> Dict:
+    """Closed-loop load for ``warmup + duration`` seconds; only the last ``duration`` is counted."""
+    results = []
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    rejected_before = None
+
+    async def client_loop(client: httpx.AsyncClient, offset: int) -> None:
+        i = offset
+        while time.monotonic() < stop_at:
+            sent = time.monotonic()
+            try:
+                response = await client.post(
+                    "/api/v1/analyze-website",
+                    json={"url": urls[i % len(urls)], "force_refresh": True}
+                )
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            done = time.monotonic()
+            if measure_from <= done <= stop_at:
+                results.append((done - sent, ok))
+            i += 1
+
+    async def mark_window() -> None:
+        nonlocal rejected_before
+        await asyncio.sleep(warmup)
+        rejected_before = (groq_rejections(groq), groq_calls(groq))
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        await asyncio.gather(mark_window(), *(client_loop(client, n) for n in range(clients)))
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput": len(latencies) / duration,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": percentile(latencies, 99) if latencies else 0.0,
+        "groq_429": groq_rejections(groq) - rejected_before[0],
+        "groq_calls_per_second": (groq_calls(groq) - rejected_before[1]) / duration
+    }
+
+
+def groq_rejections(groq: FakeGroqServer) -> int:
+    return sum(bucket.rejected for bucket in groq.app.state.quotas.values())
+
+
+def groq_calls(groq: FakeGroqServer) -> int:
+    return sum(groq.app.state.calls.values())
+
+
+def run(args) -> List[Dict]:
+    runs = [(workers, True) for workers in args.workers]
+    if args.compare_unlimited:
+        runs.append((max(args.workers), False))
+    report = []
+    with FakeGroqServer(
+        args.groq_port, args.groq_latency, requests_per_minute=args.rpm, quota_burst=args.quota_burst
+    ) as groq, CorpusServer(port=args.corpus_port) as corpus, tempfile.TemporaryDirectory() as tmp:
+        urls = [corpus.url(page) for page in corpus_pages()]
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        for n, (workers, limited) in enumerate(runs):
+            # A fresh quota and shared store per run
+            groq.app.state.quotas.clear()
+            groq.app.state.calls.clear()
+            process = start_backend(args, workers, limited, groq.base_url, os.path.join(tmp, f"shared-{n}.db"))
+            try:
+                asyncio.run(wait_until_up(base_url, process))
+                clients = args.clients_per_worker * workers
+                result = asyncio.run(drive(base_url, urls, clients, args.warmup, args.duration, groq))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            result.update(workers=workers, clients=clients, shared_limiter=limited)
+            report.append(result)
+            print(
+                f"workers={workers} limiter={'on' if limited else 'off'}: {result['throughput']:.1f} req/s, "
+                f"{result['groq_429']} Groq 429s",
+                file=sys.stderr
+            )
+    return report
+
+
+def print_report(report: List[Dict], args) -> None:
+    quota = args.rpm / 60.0
+    per_worker = args.llm_concurrency / args.groq_latency
+    baseline = report[0]["throughput"] or 1.0
+    print(
+        f"{'workers':>7} {'limiter':>7} {'clients':>7} {'req/s':>7} {'x1':>5} {'ideal':>6} "
+        f"{'p50 ms':>7} {'p99 ms':>7} {'errors':>6} {'429s':>5} {'groq/s':>6}"
+    )
+    for r in report:
+        ideal = min(r["workers"] * per_worker, quota) if r["shared_limiter"] else r["workers"] * per_worker
+        print(
+            f"{r['workers']:>7} {'on' if r['shared_limiter'] else 'off':>7} {r['clients']:>7} "
+            f"{r['throughput']:>7.2f} {r['throughput'] / baseline:>5.2f} {ideal:>6.2f} "
+            f"{r['p50'] * 1000:>7.0f} {r['p99'] * 1000:>7.0f} {r['errors']:>6} {r['groq_429']:>5} "
+            f"{r['groq_calls_per_second']:>6.2f}"
+        )
+    print(f"\nGroq quota {args.rpm} requests/min = {quota:.2f} req/s; "
+          f"each worker can drive at most {per_worker:.2f} req/s ({args.llm_concurrency} in flight)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 6])
+    parser.add_argument("--rpm", type=int, default=360, help="fake Groq requests-per-minute quota")
+    parser.add_argument("--quota-burst", type=float, default=2.0, help="seconds of quota usable at once")
+    parser.add_argument("--llm-concurrency", type=int, default=1, help="LLM_MAX_CONCURRENCY per worker")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="fake Groq response time (s)")
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured per run")
+    parser.add_argument("--compare-unlimited", action="store_true",
+                        help="also run the largest worker count with the shared limiter off")
+    parser.add_argument("--mongo", choices=["mock", "url"], default="mock")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--app-port", type=int, default=8300)
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--corpus-port", type=int, default=8200)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
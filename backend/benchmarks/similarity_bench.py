@@ -0,0 +1,112 @@
+"""Similarity index benchmark: build time, memory and query latency at scale.
+
+Fills an ``AnalysisIndex`` with synthetic analyses (industries, products,
+audiences and pain points drawn from fixed vocabularies) and times free-text
+searches and similar-company lookups:
+
+    cd backend && python -m benchmarks.similarity_bench
+    cd backend && python -m benchmarks.similarity_bench --documents 100000 --dimensions 512
+
+Also reports how often the nearest neighbour of an analysis shares its
+industry, as a rough check that the hashed vectors carry signal.
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from app.services.similarity import AnalysisIndex
+
+from .llm_load_test import percentile
+
+INDUSTRIES = [
+    "B2B SaaS", "E-commerce", "Healthcare technology", "Digital marketing agency", "Fintech",
+    "Logistics", "Cybersecurity", "EdTech", "Real estate", "Manufacturing", "HR software",
+    "Legal services", "Hospitality", "Renewable energy", "Insurance", "Biotech"
+]
+PRODUCTS = [
+    "CRM platform", "analytics dashboard", "payment processing", "online storefront", "telehealth app",
+    "SEO services", "fleet tracking", "endpoint protection", "learning management system", "payroll",
+    "property listings", "ERP integration", "contract review", "booking engine", "solar installation",
+    "policy management", "lab automation", "email marketing", "inventory management", "API gateway"
+]
+AUDIENCES = [
+    "small businesses", "enterprise IT teams", "online shoppers", "hospitals and clinics", "marketing managers",
+    "freight operators", "school districts", "property managers", "factory operators", "HR directors",
+    "law firms", "hotel chains", "homeowners", "insurance brokers", "research labs"
+]
+PAIN_POINTS = [
+    "manual data entry", "slow onboarding", "high customer churn", "compliance overhead", "security breaches",
+    "rising shipping costs", "low conversion rates", "fragmented tooling", "unreliable forecasting",
+    "staff turnover", "long sales cycles", "patient no-shows", "energy costs", "claims backlog"
+]
+
+
+def synthetic_analysis(rng: random.Random) -> Dict:
+    return {
+        "industry": rng.choice(INDUSTRIES),
+        "products_services": rng.sample(PRODUCTS, 3),
+        "target_audience": rng.choice(AUDIENCES),
+        "customer_pain_points": rng.sample(PAIN_POINTS, 3)
+    }
+
+
+def time_queries(run, queries: List, repeat: int = 1) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    print(
+        f"{name:<22} p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+        f"p99 {percentile(latencies, 99) * 1000:7.2f} ms   max {max(latencies) * 1000:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    analyses = [synthetic_analysis(rng) for _ in range(args.documents)]
+    index = AnalysisIndex(dimensions=args.dimensions)
+
+    start = time.perf_counter()
+    for i, analysis in enumerate(analyses):
+        index.add(str(i), analysis)
+    build = time.perf_counter() - start
+    stats = index.stats()
+    print(
+        f"Indexed {stats['documents']} analyses in {build:.1f}s "
+        f"({build / args.documents * 1e6:.0f} us each), matrix {stats['memory_bytes'] / 1e6:.0f} MB"
+    )
+
+    texts = [
+        f"{rng.choice(PRODUCTS)} for {rng.choice(AUDIENCES)} struggling with {rng.choice(PAIN_POINTS)}"
+        for _ in range(args.queries)
+    ]
+    ids = [str(rng.randrange(args.documents)) for _ in range(args.queries)]
+    report("search(q)", time_queries(lambda q: index.search(q, args.limit), texts))
+    report("similar(id)", time_queries(lambda i: index.similar(i, limit=args.limit), ids))
+
+    same_industry = 0
+    for analysis_id in ids:
+        hits = index.similar(analysis_id, limit=1)
+        if hits and analyses[int(hits[0][0])]["industry"] == analyses[int(analysis_id)]["industry"]:
+            same_industry += 1
+    print(f"Nearest neighbour shares the industry for {same_industry / len(ids):.0%} of lookups")
+
+
+if __name__ == "__main__":
+    main()
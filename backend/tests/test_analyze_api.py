@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.dependencies import Services, get_services
+from app.main import app, process_job_url
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def client():
+    services = Services(Settings(), process_job_url, mongo_client=mongomock_motor.AsyncMongoMockClient())
+    app.dependency_overrides[get_services] = lambda: services
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("url", ["http://a.com:abc", "https://acme.com:99999/about", "not a url"])
+def test_malformed_url_is_a_bad_request(client, url):
+    response = client.post("/api/v1/analyze-website", json={"url": url})
+
+    assert response.status_code == 400
+    assert "Invalid URL format" in response.json()["detail"]
+
+
+def test_batch_job_with_a_malformed_url_is_rejected(client):
+    response = client.post("/api/v1/analysis-jobs", json={"urls": ["https://acme.com", "http://a.com:abc"]})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid URL format: http://a.com:abc"
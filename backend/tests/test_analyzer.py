@@ -0,0 +1,30 @@
+import asyncio
+
+from app.services.analyzer import CompanyAnalyzer
+from app.services.metrics import ANALYSIS_PROMPTS
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def complete_json(self, messages, schema, model=None, call_site="default", **kwargs):
+        self.calls.append({"model": model, "call_site": call_site})
+        return {"industry": "Retail"}
+
+
+class BrokenFewShot:
+    async def select(self, website_data):
+        raise ConnectionError("MongoDB is unreachable")
+
+
+def test_failed_few_shot_lookup_falls_back_to_the_single_shot_prompt():
+    llm = RecordingLLM()
+    analyzer = CompanyAnalyzer(llm, few_shot=BrokenFewShot(), few_shot_model="small-model")
+    single_shot_before = ANALYSIS_PROMPTS.value(mode="single_shot")
+
+    analysis = asyncio.run(analyzer.analyze_company({"title": "Acme", "main_content": "Acme sells anvils."}))
+
+    assert analysis == {"industry": "Retail"}
+    assert llm.calls == [{"model": None, "call_site": "analysis"}]
+    assert ANALYSIS_PROMPTS.value(mode="single_shot") == single_shot_before + 1
@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from app.services import compression
+from app.services.compression import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0, *", "br"),
+    ("br;q=0, gzip;q=0, *", None),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("gzip;q=oops", "gzip"),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert negotiate_encoding("br, gzip") == "gzip"
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip", brotli_enabled=False) == "gzip"
+
+
+def response_app(content_type: bytes, chunks):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def call(app, accept_encoding: bytes = b"gzip"):
+    """Run ``app`` behind CompressionMiddleware; returns (headers, body chunks)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    return headers, [message["body"] for message in messages[1:]]
+
+
+def test_large_response_is_compressed():
+    body = b'{"analysis": "' + b"x" * 5000 + b'"}'
+
+    headers, chunks = call(response_app(b"application/json", [body]))
+
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(b"".join(chunks)) == body
+    assert int(headers["content-length"]) == len(chunks[0])
+
+
+def test_small_response_is_sent_as_is():
+    headers, chunks = call(response_app(b"application/json", [b'{"status": "ok"}']))
+
+    assert "content-encoding" not in headers
+    assert chunks == [b'{"status": "ok"}']
+
+
+def test_event_stream_is_never_compressed():
+    events = [b"data: " + b"x" * 2000 + b"\n\n", b"data: done\n\n"]
+
+    headers, chunks = call(response_app(b"text/event-stream", events))
+
+    assert "content-encoding" not in headers
+    assert chunks == events
+
+
+def test_streamed_chunks_are_flushed_as_they_are_sent():
+    rows = [b'{"row": %d, "data": "%s"}\n' % (i, b"y" * 300) for i in range(5)]
+
+    headers, chunks = call(response_app(b"application/x-ndjson", rows))
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Each compressed chunk decodes to its row without waiting for the rest of the stream
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert [decompressor.decompress(chunk) for chunk in chunks] == rows
+    assert decompressor.eof
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred_when_accepted():
+    body = b"z" * 5000
+
+    headers, chunks = call(response_app(b"text/plain", [body]), accept_encoding=b"gzip, br")
+
+    assert headers["content-encoding"] == "br"
+    assert compression.brotli.decompress(b"".join(chunks)) == body
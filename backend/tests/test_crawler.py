@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from app.services.crawler import SiteCrawler
+
+LINKS = [f"https://example.com/{path}" for path in ("about", "pricing", "products", "customers")]
+
+
+class FakeScraper:
+    def __init__(self, robots_delay: float = 0.0, page_bytes: int = 1000):
+        self.robots_delay = robots_delay
+        self.page_bytes = page_bytes
+        self.fetched = []
+
+    async def fetch_text(self, url):
+        await asyncio.sleep(self.robots_delay)
+        return None
+
+    async def fetch_page(self, url, force_refresh=False):
+        self.fetched.append(url)
+        return {"final_url": url, "main_content": f"Page {url}.", "links": [], "bytes": self.page_bytes}
+
+
+def root_page():
+    return {"final_url": "https://example.com/", "main_content": "Home.", "links": LINKS, "bytes": 1000}
+
+
+def test_slow_robots_txt_does_not_outlast_the_time_budget():
+    scraper = FakeScraper(robots_delay=30.0)
+    crawler = SiteCrawler(scraper, time_budget=0.2)
+
+    started = time.monotonic()
+    merged = asyncio.run(crawler.crawl(root_page()))
+
+    assert time.monotonic() - started < 1.0
+    assert merged["final_url"] == "https://example.com/"
+    # A timeout leaves robots.txt unknown, to be fetched again next time
+    assert "https://example.com" not in crawler._robots
+
+
+def test_no_page_is_fetched_once_the_byte_budget_is_spent():
+    scraper = FakeScraper(page_bytes=1000)
+    crawler = SiteCrawler(scraper, max_bytes=2500, concurrency=1)
+
+    asyncio.run(crawler.crawl(root_page()))
+
+    # The root page counts against the budget: two more pages reach it
+    assert scraper.fetched == LINKS[:2]
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services.database import DatabaseHandler
+from app.services.write_buffer import CollectionDurability
+from app.services.dedup import notes_fingerprint
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def make_db(write_behind: bool = False) -> DatabaseHandler:
+    return DatabaseHandler(
+        "mongodb://unused",
+        durability={"analyses": CollectionDurability(write_behind=write_behind)},
+        client=mongomock_motor.AsyncMongoMockClient()
+    )
+
+
+def save(db: DatabaseHandler, notes, industry: str):
+    return db.save_analysis(
+        "https://acme.com",
+        {"main_content": "Acme sells anvils."},
+        {"industry": industry},
+        canonical_url="acme.com",
+        content_fingerprint=f"content|{notes}",
+        notes_fingerprint=notes_fingerprint(notes)
+    )
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_analyses_with_different_notes_do_not_replace_each_other(write_behind):
+    async def run():
+        db = make_db(write_behind)
+        await db.ensure_indexes()
+        first = await save(db, "Selling to their ops team", "Manufacturing")
+        second = await save(db, "Selling to their finance team", "Industrial supplies")
+        again = await save(db, "Selling to their ops team", "Heavy manufacturing")
+        ops = await db.find_analysis_by_canonical_url("acme.com", notes_fingerprint("Selling to their ops team"))
+        finance = await db.get_analysis(second)
+        missing = await db.find_analysis_by_canonical_url("acme.com", notes_fingerprint(None))
+        if not write_behind:  # buffered upserts are read back from the pending writes
+            assert await db.db.analyses.count_documents({}) == 2
+        return first, second, again, ops, finance, missing
+
+    first, second, again, ops, finance, missing = asyncio.run(run())
+
+    assert first != second
+    assert again == first
+    assert ops["analysis"] == {"industry": "Heavy manufacturing"}
+    assert finance["analysis"] == {"industry": "Industrial supplies"}
+    assert missing is None
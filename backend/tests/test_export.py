@@ -0,0 +1,63 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_db
+from app.main import app
+from app.services.database import DatabaseHandler
+from app.services.export import export_stream
+from app.services.metrics import ERRORS
+
+
+class FailingCursorDB:
+    """Yields ``rows`` analyses, then fails like a dropped MongoDB connection."""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    def export_query(self, **kwargs):
+        return DatabaseHandler.export_query(self, **kwargs)
+
+    async def iter_export(self, collection, fields, **kwargs):
+        start = datetime(2026, 1, 1)
+        for i in range(self.rows):
+            yield {"_id": ObjectId(), "url": f"https://c{i}.example", "created_at": start + timedelta(minutes=i)}
+        raise ConnectionError("connection reset by peer")
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_db] = lambda: FailingCursorDB(rows=2000)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_export_failing_midway_does_not_end_like_a_complete_export(client):
+    errors_before = ERRORS.value(component="export")
+    # TestClient re-raises what aborted the response; a real client gets a truncated chunked body
+    with pytest.raises(ConnectionError):
+        with client.stream("GET", "/api/v1/export/analyses", params={"fields": "url"}) as response:
+            assert response.status_code == 200
+            for _ in response.iter_lines():
+                pass
+    assert ERRORS.value(component="export") == errors_before + 1
+
+
+def test_rows_streamed_before_a_failure_carry_resume_tokens():
+    async def collect():
+        chunks = []
+        with pytest.raises(ConnectionError):
+            docs = FailingCursorDB(rows=2000).iter_export("analyses", ["url"])
+            async for chunk in export_stream(docs, "analyses", ["url"]):
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    rows = [json.loads(line) for line in asyncio.run(collect()).splitlines()]
+    assert 0 < len(rows) < 2000
+    assert all("resume_token" in row for row in rows)
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.idempotency import IdempotencyKeys, request_hash
+from app.services.shared_store import SQLiteSharedStore
+
+
+def make_keys(tmp_path, **settings) -> IdempotencyKeys:
+    return IdempotencyKeys(SQLiteSharedStore(str(tmp_path / "shared.db")), poll_interval=0.01, **settings)
+
+
+def counting_work(runs, delay=0.0):
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(delay)
+        return {"analysis_id": f"a{len(runs)}"}
+    return work
+
+
+def test_retry_with_the_same_key_replays_the_response(tmp_path):
+    keys = make_keys(tmp_path)
+    runs = []
+    fingerprint = request_hash({"url": "https://acme.com"})
+
+    async def run():
+        first = await keys.run("analyze_website", "key-1", fingerprint, counting_work(runs))
+        retry = await keys.run("analyze_website", "key-1", fingerprint, counting_work(runs))
+        return first, retry
+
+    first, retry = asyncio.run(run())
+    assert first == ({"analysis_id": "a1"}, False)
+    assert retry == ({"analysis_id": "a1"}, True)
+    assert runs == [1]
+
+
+def test_without_a_key_every_request_runs(tmp_path):
+    keys = make_keys(tmp_path)
+    runs = []
+
+    async def run():
+        for _ in range(2):
+            await keys.run("analyze_website", None, "hash", counting_work(runs))
+
+    asyncio.run(run())
+    assert runs == [1, 1]
+
+
+def test_key_reused_for_a_different_request_is_422(tmp_path):
+    keys = make_keys(tmp_path)
+
+    async def run():
+        await keys.run("analyze_website", "key-1", request_hash({"url": "https://acme.com"}), counting_work([]))
+        await keys.run("analyze_website", "key-1", request_hash({"url": "https://globex.com"}), counting_work([]))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 422
+
+
+def test_retry_while_the_first_request_runs_is_409(tmp_path):
+    keys = make_keys(tmp_path, wait_seconds=0.05)
+
+    async def run():
+        first = asyncio.ensure_future(keys.run("analyze_website", "key-1", "hash", counting_work([], delay=0.5)))
+        await asyncio.sleep(0.05)
+        try:
+            await keys.run("analyze_website", "key-1", "hash", counting_work([]))
+        finally:
+            first.cancel()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 409
+
+
+def test_retry_waits_for_the_first_request_and_replays_it(tmp_path):
+    keys = make_keys(tmp_path, wait_seconds=2.0)
+    runs = []
+
+    async def run():
+        first = asyncio.ensure_future(keys.run("analyze_website", "key-1", "hash", counting_work(runs, delay=0.1)))
+        await asyncio.sleep(0.02)
+        retry = await keys.run("analyze_website", "key-1", "hash", counting_work(runs))
+        return await first, retry
+
+    first, retry = asyncio.run(run())
+    assert retry == (first[0], True)
+    assert runs == [1]
+
+
+def test_failed_request_can_be_retried(tmp_path):
+    keys = make_keys(tmp_path)
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        raise RuntimeError("Groq is down")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await keys.run("analyze_website", "key-1", "hash", failing)
+        return await keys.run("analyze_website", "key-1", "hash", counting_work(runs))
+
+    assert asyncio.run(run()) == ({"analysis_id": "a2"}, False)
+
+
+def test_claim_of_a_dead_worker_expires_after_the_lease(tmp_path):
+    keys = make_keys(tmp_path, lease_seconds=0.1, wait_seconds=2.0)
+    runs = []
+
+    async def run():
+        # A worker that claimed the key and died without storing a result
+        await keys.store.set("idempotency:analyze_website:key-1", {
+            "state": "in_progress", "request_hash": "hash", "started": time.time()
+        })
+        return await keys.run("analyze_website", "key-1", "hash", counting_work(runs))
+
+    assert asyncio.run(run()) == ({"analysis_id": "a1"}, False)
+    assert runs == [1]
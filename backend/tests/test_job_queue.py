@@ -0,0 +1,192 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.database import DatabaseHandler
+from app.services.job_queue import AnalysisJobQueue, DomainThrottle
+from app.services.scraper import WebScraperError
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def make_db() -> DatabaseHandler:
+    return DatabaseHandler("mongodb://unused", client=mongomock_motor.AsyncMongoMockClient())
+
+
+def make_queue(db: DatabaseHandler, process) -> AnalysisJobQueue:
+    return AnalysisJobQueue(db, process, workers=2, domain_delay=0.0, max_retries=3, retry_base_delay=0.01)
+
+
+async def insert_interrupted_job(db: DatabaseHandler) -> str:
+    """A job whose worker stopped a while ago with items in every state."""
+    items = [
+        {"url": "https://done.example", "status": "done", "attempts": 1, "analysis_id": "a1", "error": None},
+        {"url": "https://running.example", "status": "running", "attempts": 1, "analysis_id": None, "error": None},
+        {"url": "https://pending.example", "status": "pending", "attempts": 0, "analysis_id": None, "error": None},
+        {"url": "https://spent.example", "status": "retrying", "attempts": 4, "analysis_id": None, "error": "HTTP 503"}
+    ]
+    stale = datetime.utcnow() - timedelta(minutes=10)
+    result = await db.db.analysis_jobs.insert_one({
+        "status": "running", "owner": "stopped-worker", "heartbeat_at": stale, "custom_notes": None,
+        "total": 4, "completed": 1, "failed": 0, "items": items, "created_at": stale, "updated_at": stale
+    })
+    return str(result.inserted_id)
+
+
+def test_jobs_of_a_stopped_worker_are_resumed_on_start():
+    processed = []
+
+    async def process(url, custom_notes, scrape_slot):
+        processed.append(url)
+        return str(ObjectId())
+
+    async def run():
+        db = make_db()
+        job_id = await insert_interrupted_job(db)
+        queue = make_queue(db, process)
+        await queue.start()
+        for _ in range(100):
+            job = await db.get_analysis_job(job_id)
+            if job["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job["status"] == "completed"
+    assert sorted(processed) == ["https://pending.example", "https://running.example"]
+    assert (job["completed"], job["failed"]) == (3, 1)
+    assert job["items"][3]["status"] == "failed"
+    assert job["items"][1]["attempts"] == 2
+
+
+def test_jobs_with_a_live_owner_are_not_taken_over():
+    async def run():
+        db = make_db()
+        job_id = await insert_interrupted_job(db)
+        await db.db.analysis_jobs.update_one({"_id": ObjectId(job_id)}, {"$set": {"heartbeat_at": datetime.utcnow()}})
+        return await make_queue(db, None).recover()
+
+    assert asyncio.run(run()) == 0
+
+
+def failing_job_run(error: Exception):
+    calls = []
+
+    async def process(url, custom_notes, scrape_slot):
+        calls.append(url)
+        try:
+            raise error
+        except Exception as e:
+            # The analysis pipeline wraps scraper errors like this
+            raise RuntimeError(f"Failed to scrape website: {str(e)}")
+
+    async def run():
+        db = make_db()
+        queue = make_queue(db, process)
+        await queue.start()
+        job_id = await queue.submit(["https://example.com"])
+        for _ in range(200):
+            job = await db.get_analysis_job(job_id)
+            if job["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job
+
+    return asyncio.run(run()), calls
+
+
+def test_permanent_failures_are_not_retried():
+    job, calls = failing_job_run(WebScraperError("Failed to access website: HTTP 404"))
+    assert len(calls) == 1
+    assert job["failed"] == 1 and job["items"][0]["error"].endswith("HTTP 404")
+
+
+def test_transient_failures_are_retried():
+    job, calls = failing_job_run(WebScraperError("Failed to access website: HTTP 503", transient=True))
+    assert len(calls) == 4  # the first attempt plus max_retries
+    assert job["failed"] == 1
+
+
+def test_domain_throttle_treats_www_as_the_same_host():
+    throttle = DomainThrottle(concurrency=1, delay=0.0)
+    order = []
+
+    async def hold(url):
+        async with throttle.slot(url):
+            order.append(("start", url))
+            await asyncio.sleep(0.01)
+            order.append(("end", url))
+
+    async def run():
+        await asyncio.gather(*(hold(url) for url in (
+            "https://www.example.com/a", "http://example.com/b", "https://EXAMPLE.com:443/c"
+        )))
+
+    asyncio.run(run())
+    # One slot for all three: each starts only after the previous one ended
+    assert [event for event, _ in order] == ["start", "end"] * 3
+
+
+def test_domain_throttle_forgets_idle_domains():
+    throttle = DomainThrottle(concurrency=1, delay=0.05)
+
+    async def run():
+        for i in range(50):
+            async with throttle.slot(f"https://site{i}.example"):
+                pass
+        assert len(throttle._semaphores) == 0
+        await asyncio.sleep(0.06)
+        async with throttle.slot("https://last.example"):
+            pass
+
+    asyncio.run(run())
+    assert list(throttle._last_started) == ["last.example"]
+    assert throttle._semaphores == {} and throttle._users == {}
+
+
+def test_throttle_slot_is_released_before_the_analysis():
+    analysing = []
+    overlap = []
+
+    async def process(url, custom_notes, scrape_slot):
+        async with scrape_slot:
+            await asyncio.sleep(0.01)  # scraping
+        analysing.append(url)
+        overlap.append(len(analysing))
+        await asyncio.sleep(0.2)  # the LLM call
+        analysing.remove(url)
+        return str(ObjectId())
+
+    async def run():
+        db = make_db()
+        queue = make_queue(db, process)
+        await queue.start()
+        job_id = await queue.submit(["https://example.com/a", "https://example.com/b"])
+        for _ in range(100):
+            job = await db.get_analysis_job(job_id)
+            if job["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job["completed"] == 2
+    # The second page of the same site is analysed while the first still is
+    assert max(overlap) == 2
+
+
+def test_own_jobs_are_not_reclaimed_after_missed_heartbeats():
+    async def run():
+        db = make_db()
+        job_id = await insert_interrupted_job(db)
+        queue = make_queue(db, None)
+        await db.db.analysis_jobs.update_one({"_id": ObjectId(job_id)}, {"$set": {"owner": queue.owner}})
+        return await queue.recover()
+
+    assert asyncio.run(run()) == 0
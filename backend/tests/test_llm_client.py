@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_client import LLMClient, LLMTimeoutError, LLMUnavailableError
+from app.services.structured_output import CompanyAnalysis
+
+
+class StalledCompletions:
+    """Chat completions where ``stalled`` models never answer."""
+
+    def __init__(self, stalled, json=False):
+        self.stalled = set(stalled)
+        self.json = json
+        self.calls = []
+
+    async def create(self, model, **kwargs):
+        self.calls.append(model)
+        if model in self.stalled:
+            await asyncio.Event().wait()
+        answer = f"answer from {model}"
+        message = SimpleNamespace(content=json.dumps({"industry": answer}) if self.json else answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def make_client(stalled, fallback_model="fallback", json=False):
+    llm = LLMClient(
+        api_key="test",
+        timeout=2.0,
+        attempt_timeout=0.05,
+        model="primary",
+        fallback_model=fallback_model,
+        max_retries=2,
+        retry_base_delay=0.001,
+        circuit_failure_threshold=2,
+        circuit_reset_seconds=60.0
+    )
+    completions = StalledCompletions(stalled, json)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return llm, completions
+
+
+def test_stalled_model_falls_back_and_opens_its_circuit():
+    llm, completions = make_client(stalled={"primary"})
+
+    async def run():
+        answers = [await llm.complete([{"role": "user", "content": "hi"}], use_cache=False) for _ in range(3)]
+        return answers
+
+    answers = asyncio.run(run())
+    assert answers == ["answer from fallback"] * 3
+    assert llm.circuit_states()["primary"] == "open"
+    # Once the circuit is open the stalled model isn't tried any more
+    assert completions.calls.count("primary") == 2
+
+
+def test_stalled_model_without_fallback_fails_fast_once_its_circuit_opens():
+    llm, _ = make_client(stalled={"primary"}, fallback_model=None)
+
+    async def run():
+        started = time.monotonic()
+        # Two attempts time out, opening the circuit; the third is rejected without waiting
+        with pytest.raises(LLMUnavailableError):
+            await llm.complete([{"role": "user", "content": "hi"}], use_cache=False, timeout=10.0)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 1.0
+    assert llm.circuit_states()["primary"] == "open"
+
+
+def test_attempts_stop_at_the_call_deadline():
+    llm, _ = make_client(stalled={"primary"}, fallback_model=None)
+    llm.attempt_timeout = 5.0
+
+    async def run():
+        with pytest.raises(LLMTimeoutError):
+            await llm.complete([{"role": "user", "content": "hi"}], use_cache=False, timeout=0.2)
+
+    asyncio.run(run())
+    # The attempt ended just before the deadline, so the timeout still counts against the model
+    assert llm._breaker("primary").failures == 1
+
+
+def test_fallback_json_answer_is_cached_under_the_fallback_model():
+    llm, completions = make_client(stalled={"primary"}, json=True)
+    llm.cache = LLMResponseCache()
+    messages = [{"role": "user", "content": "Analyze acme.com"}]
+
+    async def run():
+        answer = await llm.complete_json(messages, CompanyAnalysis, max_tokens=100)
+        primary = await llm.cache.get(llm.cache.make_key("primary", messages, 0.7, 100))
+        fallback = await llm.cache.get(llm.cache.make_key("fallback", messages, 0.7, 100))
+        return answer, primary, fallback
+
+    answer, primary, fallback = asyncio.run(run())
+    assert answer["industry"] == "answer from fallback"
+    assert primary is None
+    assert json.loads(fallback)["industry"] == "answer from fallback"
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import parse_pool
+from app.services.parse_pool import ParsePool, ParseWorkerError
+
+
+class CrashingExecutor(Executor):
+    """Every document kills the worker parsing it."""
+
+    created = 0
+
+    def __init__(self):
+        CrashingExecutor.created += 1
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class BrokenExecutor(CrashingExecutor):
+    """A pool already marked broken: submit itself raises."""
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly, the process pool is not usable anymore")
+
+
+def test_pool_broken_before_submit_is_replaced(monkeypatch):
+    monkeypatch.setattr(parse_pool, "extract_document", lambda *args: {"title": "parsed"})
+    pool = ParsePool("thread", workers=1)
+    monkeypatch.setattr(pool, "_create_executor", lambda: ThreadPoolExecutor(1))
+
+    async def run():
+        pool._executor = BrokenExecutor()
+        pool._slots = asyncio.Semaphore(pool.max_pending)
+        result = await pool.extract("auto", "https://example.com/", b"<html></html>")
+        pool._executor.shutdown()
+        return result
+
+    assert asyncio.run(run()) == {"title": "parsed"}
+    assert not pool._slots.locked()
+
+
+def test_document_that_keeps_killing_workers_fails_without_being_parsed_in_process(monkeypatch):
+    def parse_inline(*args):
+        raise AssertionError("parsed on the event loop")
+
+    monkeypatch.setattr(parse_pool, "extract_document", parse_inline)
+    pool = ParsePool("process", workers=1)
+    monkeypatch.setattr(pool, "_create_executor", CrashingExecutor)
+
+    async def run():
+        # As after start(), without the warm-up (which would crash too)
+        pool._executor = CrashingExecutor()
+        pool._slots = asyncio.Semaphore(pool.max_pending)
+        with pytest.raises(ParseWorkerError):
+            await pool.extract("auto", "https://example.com/", b"<html></html>")
+
+    CrashingExecutor.created = 0
+    asyncio.run(run())
+    # The initial pool plus one restart per crash: the document was retried once in a new pool
+    assert CrashingExecutor.created == 3
+
+
+def test_cancelled_caller_keeps_its_slot_until_the_parse_finishes(monkeypatch):
+    release_parse = threading.Event()
+
+    def slow_parse(*args):
+        release_parse.wait(5)
+        return {"title": "parsed"}
+
+    monkeypatch.setattr(parse_pool, "extract_document", slow_parse)
+    pool = ParsePool("thread", workers=2, max_pending=1)
+
+    async def run():
+        pool._executor = ThreadPoolExecutor(2)
+        pool._slots = asyncio.Semaphore(pool.max_pending)
+        first = asyncio.ensure_future(pool.extract("auto", "https://example.com/a", b"<html></html>"))
+        await asyncio.sleep(0.05)
+        first.cancel()  # the client disconnected mid-parse
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        second = asyncio.ensure_future(pool.extract("auto", "https://example.com/b", b"<html></html>"))
+        await asyncio.sleep(0.05)
+        # The first document is still in the executor, so the second waits for its slot
+        assert pool.stats()["waiting"] == 1
+        release_parse.set()
+        result = await asyncio.wait_for(second, 5)
+        pool._executor.shutdown()
+        return result
+
+    assert asyncio.run(run()) == {"title": "parsed"}
+    assert not pool._slots.locked()
+
+
+def test_cancelled_caller_whose_parse_had_not_started_frees_its_slot(monkeypatch):
+    release_parse = threading.Event()
+
+    def slow_parse(*args):
+        release_parse.wait(5)
+        return {}
+
+    monkeypatch.setattr(parse_pool, "extract_document", slow_parse)
+    pool = ParsePool("thread", workers=1, max_pending=2)
+
+    async def run():
+        pool._executor = ThreadPoolExecutor(1)
+        pool._slots = asyncio.Semaphore(pool.max_pending)
+        running = asyncio.ensure_future(pool.extract("auto", "https://example.com/a", b""))
+        queued = asyncio.ensure_future(pool.extract("auto", "https://example.com/b", b""))
+        await asyncio.sleep(0.05)
+        queued.cancel()  # still in the executor's queue, so it never runs
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        free_slots = pool._slots._value
+        release_parse.set()
+        await running
+        pool._executor.shutdown()
+        return free_slots
+
+    assert asyncio.run(run()) == 1
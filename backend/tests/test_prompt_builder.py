@@ -0,0 +1,43 @@
+from app.services.prompt_builder import PromptBuilder
+
+BAKERY = (
+    "Sweet Crumb is a family bakery in Portland baking cookies, sourdough and pastries every morning. "
+    "Our cookie boxes are a favourite for office parties and weddings. "
+    "Subscribe to a monthly cookie box and get fresh treats delivered to your door. "
+    "Customers log in to the order portal to schedule weekly deliveries."
+)
+
+DESIGN_AGENCY = (
+    "Northwind is a studio for brand and product design. "
+    "Design in our studio starts with workshops alongside your team. "
+    "We rebuilt the product catalog in six weeks for a national retailer. "
+    "We also built the JavaScript front end and the newsletter templates for a media company."
+)
+
+
+def test_keeps_business_sentences_that_mention_boilerplate_words():
+    builder = PromptBuilder(content_token_budget=1000)
+    for text in (BAKERY, DESIGN_AGENCY):
+        content = builder.fit_content(text)
+        for sentence in text.split(". "):
+            assert sentence.rstrip(".") in content
+
+
+def test_drops_navigation_and_legal_lines():
+    builder = PromptBuilder(content_token_budget=1000)
+    text = (
+        "Home Products Pricing About Contact us Sign in. "
+        "We use cookies to improve your experience on this site. "
+        "© 2024 Sweet Crumb. All rights reserved. Privacy policy. Terms of service. "
+        + BAKERY
+    )
+    content = builder.fit_content(text)
+    assert "Sign in" not in content
+    assert "We use cookies" not in content
+    assert "All rights reserved" not in content
+    assert "family bakery in Portland" in content
+
+
+def test_falls_back_to_unfiltered_text_when_everything_is_filtered():
+    builder = PromptBuilder(content_token_budget=1000)
+    assert builder.fit_content("Fresh bread. Sign in. Privacy policy.") != ""
@@ -0,0 +1,120 @@
+"""Explain plans of the paginated list, export and dedup queries on a real MongoDB.
+
+Seeds a scratch database, creates the app's indexes and explains each
+query; a plan that scans the collection, sorts in memory or examines many
+more documents than it returns fails the test. Skipped unless
+``MONGODB_URL`` is set:
+
+    cd backend && MONGODB_URL=mongodb://localhost:27017 python -m pytest tests/test_query_plans.py
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import pytest
+
+from app.services.database import ANALYSIS_SUMMARY_PROJECTION, DatabaseHandler, encode_cursor
+from app.services.dedup import notes_fingerprint
+
+MONGODB_URL = os.getenv("MONGODB_URL")
+SCRATCH_DATABASE = "salesgpt_plan_check"
+DOCUMENTS = 5000
+LIMIT = 50
+
+pytestmark = pytest.mark.skipif(not MONGODB_URL, reason="MONGODB_URL is not set")
+
+
+def plan_stages(plan: Dict) -> List[str]:
+    stages = []
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+
+async def explain_queries() -> Dict[str, tuple]:
+    """query name -> (explain output, documents the query returns at most)"""
+    db = DatabaseHandler(MONGODB_URL)
+    db.db = db.client[SCRATCH_DATABASE]
+    try:
+        now = datetime.utcnow()
+        await db.db.analyses.insert_many([
+            {
+                "url": f"https://company{i}.example",
+                "canonical_url": f"company{i}.example",
+                "notes_fingerprint": notes_fingerprint(None),
+                "website_data": {"title": f"Company {i}", "main_content": "x" * 2000},
+                "analysis": {"industry": "Software"},
+                "created_at": now - timedelta(seconds=i),
+                "updated_at": now - timedelta(seconds=i)
+            }
+            for i in range(DOCUMENTS)
+        ])
+        await db.db.emails.insert_many([
+            {"analysis_id": f"analysis{i % 10}", "emails": {}, "created_at": now + timedelta(seconds=i)}
+            for i in range(DOCUMENTS)
+        ])
+        await db.ensure_indexes()
+
+        explains = {}
+        query, sort = db.analyses_page_query()
+        first_page = await db.db.analyses.find(query, ANALYSIS_SUMMARY_PROJECTION).sort(sort).limit(LIMIT).to_list(LIMIT)
+        explains["analyses first page"] = (
+            await db.db.analyses.find(query, ANALYSIS_SUMMARY_PROJECTION).sort(sort).limit(LIMIT).explain(), LIMIT
+        )
+        query, sort = db.analyses_page_query(encode_cursor(first_page[-1]))
+        explains["analyses cursor page"] = (
+            await db.db.analyses.find(query, ANALYSIS_SUMMARY_PROJECTION).sort(sort).limit(LIMIT).explain(), LIMIT
+        )
+
+        query, sort = db.emails_page_query("analysis3")
+        first_page = await db.db.emails.find(query).sort(sort).limit(LIMIT).to_list(LIMIT)
+        explains["emails first page"] = (await db.db.emails.find(query).sort(sort).limit(LIMIT).explain(), LIMIT)
+        query, sort = db.emails_page_query("analysis3", encode_cursor(first_page[-1]))
+        explains["emails cursor page"] = (await db.db.emails.find(query).sort(sort).limit(LIMIT).explain(), LIMIT)
+
+        # Exports read oldest first; check the first batch after a resume token within a date range
+        query, sort = db.export_query(
+            created_after=now,
+            created_before=now + timedelta(seconds=DOCUMENTS),
+            after=encode_cursor(first_page[-1])
+        )
+        explains["emails export resumed"] = (await db.db.emails.find(query).sort(sort).limit(LIMIT).explain(), LIMIT)
+        oldest = await db.db.analyses.find({}, {"created_at": 1}).sort(sort).limit(LIMIT).to_list(LIMIT)
+        query, sort = db.export_query(created_after=now - timedelta(seconds=DOCUMENTS), after=encode_cursor(oldest[-1]))
+        explains["analyses export resumed"] = (await db.db.analyses.find(query).sort(sort).limit(LIMIT).explain(), LIMIT)
+
+        key = {"canonical_url": "company42.example", "notes_fingerprint": notes_fingerprint(None)}
+        explains["analysis dedup lookup"] = (await db.db.analyses.find(key).limit(1).explain(), 1)
+        return explains
+    finally:
+        await db.client.drop_database(SCRATCH_DATABASE)
+
+
+@pytest.fixture(scope="module")
+def explains():
+    return asyncio.run(explain_queries())
+
+
+@pytest.mark.parametrize("name", [
+    "analyses first page",
+    "analyses cursor page",
+    "emails first page",
+    "emails cursor page",
+    "emails export resumed",
+    "analyses export resumed",
+    "analysis dedup lookup"
+])
+def test_query_uses_an_index(explains, name):
+    explain, limit = explains[name]
+    stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+    examined = explain.get("executionStats", {}).get("totalDocsExamined", 0)
+
+    assert "COLLSCAN" not in stages, f"{name}: collection scan ({' > '.join(stages)})"
+    assert "SORT" not in stages, f"{name}: in-memory sort ({' > '.join(stages)})"
+    assert examined <= 2 * (limit + 1), f"{name}: examined {examined} documents for a page of {limit}"
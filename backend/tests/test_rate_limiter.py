@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from app.services.rate_limiter import SharedRateLimiter
+from app.services.shared_store import SQLiteSharedStore
+
+MODEL = "llama-test"
+
+
+def make_limiter(tmp_path, requests_per_minute=0, tokens_per_minute=0, store=None) -> SharedRateLimiter:
+    store = store or SQLiteSharedStore(str(tmp_path / "shared.db"))
+    # burst_seconds=0.2: the bucket holds a fifth of a second's quota
+    return SharedRateLimiter(store, requests_per_minute, tokens_per_minute, burst_seconds=0.2)
+
+
+def timed(coroutine) -> float:
+    async def run():
+        started = time.monotonic()
+        await coroutine
+        return time.monotonic() - started
+    return asyncio.run(run())
+
+
+def test_disabled_limiter_never_waits(tmp_path):
+    limiter = make_limiter(tmp_path)
+
+    assert not limiter.enabled(MODEL)
+    assert asyncio.run(limiter.acquire(MODEL, 10_000)) == 0
+
+
+def test_requests_wait_for_the_bucket_to_refill(tmp_path):
+    # 600/min refills 10 requests a second into a bucket of 2
+    limiter = make_limiter(tmp_path, requests_per_minute=600)
+
+    async def run():
+        burst = [time.monotonic()]
+        for _ in range(4):
+            await limiter.acquire(MODEL, 0)
+            burst.append(time.monotonic())
+        return [b - a for a, b in zip(burst, burst[1:])]
+
+    gaps = asyncio.run(run())
+    assert gaps[0] < 0.05 and gaps[1] < 0.05
+    assert 0.08 < gaps[2] < 0.3 and 0.08 < gaps[3] < 0.3
+
+
+def test_tokens_wait_for_the_bucket_to_refill(tmp_path):
+    # 6000/min refills 100 tokens a second into a bucket of 20
+    limiter = make_limiter(tmp_path, tokens_per_minute=6000)
+
+    assert timed(limiter.acquire(MODEL, 20)) < 0.05
+    assert 0.08 < timed(limiter.acquire(MODEL, 10)) < 0.3
+
+
+def test_request_larger_than_the_bucket_is_capped_to_it(tmp_path):
+    limiter = make_limiter(tmp_path, tokens_per_minute=6000)
+
+    assert asyncio.run(limiter.acquire(MODEL, 1_000)) == 20
+
+
+def test_settle_returns_unused_tokens(tmp_path):
+    limiter = make_limiter(tmp_path, tokens_per_minute=6000)
+
+    async def run():
+        reserved = await limiter.acquire(MODEL, 20)
+        await limiter.settle(MODEL, reserved, used=5)
+        started = time.monotonic()
+        await limiter.acquire(MODEL, 15)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.05
+
+
+def test_limiters_sharing_a_store_share_one_bucket(tmp_path):
+    # Two workers' limiters (separate locks) on one store: together they get the bucket once
+    store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+    workers = [make_limiter(tmp_path, requests_per_minute=600, store=store) for _ in range(2)]
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(worker.acquire(MODEL, 0) for worker in workers for _ in range(3)))
+        return time.monotonic() - started
+
+    # 2 requests from the full bucket, the other 4 refill at 10/s
+    assert 0.35 < asyncio.run(run()) < 1.0
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.responses import FastJSONResponse, parse_response_fields, select_fields
+
+DOC = {
+    "_id": "a1",
+    "website_data": {"title": "Acme", "main_content": "Acme sells anvils.", "contact_info": {"email": "hi@acme.com"}},
+    "analysis": {"industry": "Manufacturing", "competitors": ["Globex"]}
+}
+
+
+def test_no_fields_selects_everything():
+    assert parse_response_fields(None) is None
+    assert parse_response_fields("") is None
+    assert parse_response_fields(" , ") is None
+
+
+def test_fields_are_split_and_nested_duplicates_dropped():
+    assert parse_response_fields("analysis, website_data.title,analysis.industry") == ["analysis", "website_data.title"]
+
+
+def test_invalid_field_is_rejected():
+    with pytest.raises(ValueError):
+        parse_response_fields("analysis,$where")
+
+
+def test_select_fields_keeps_only_the_requested_paths():
+    selected = select_fields(DOC, ["website_data.title", "website_data.contact_info.email", "analysis.industry"])
+
+    assert selected == {
+        "website_data": {"title": "Acme", "contact_info": {"email": "hi@acme.com"}},
+        "analysis": {"industry": "Manufacturing"}
+    }
+
+
+def test_select_fields_skips_missing_paths():
+    assert select_fields(DOC, ["website_data.logo", "analysis.industry.name", "unknown"]) == {}
+
+
+def test_fast_json_response_encodes_mongo_types():
+    oid = ObjectId()
+    body = FastJSONResponse({"_id": oid, "created_at": datetime(2026, 1, 2, 3, 4, 5), "tags": {"b2b"}}).body
+
+    assert body.startswith(f'{{"_id":"{oid}","created_at":"2026-01-02T03:04:05"'.encode())
+    assert body.endswith(b'"tags":["b2b"]}')
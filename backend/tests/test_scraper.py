@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.scraper import WebScraper, WebScraperError
+
+
+def scraper_for(handler) -> WebScraper:
+    scraper = WebScraper()
+    scraper.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return scraper
+
+
+def test_robots_txt_is_read_only_up_to_the_cap():
+    served = []
+
+    async def body():
+        for _ in range(100):
+            served.append(1)
+            yield b"Disallow: /private\n" * 50
+
+    scraper = scraper_for(lambda request: httpx.Response(200, headers={"Content-Type": "text/plain"}, content=body()))
+
+    text = asyncio.run(scraper.fetch_text("https://example.com/robots.txt", max_bytes=4096))
+
+    assert len(text.encode()) == 4096
+    assert text.startswith("Disallow: /private\n")
+    assert len(served) < 100
+
+
+def test_robots_txt_served_as_html_is_rejected():
+    scraper = scraper_for(lambda request: httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"<html>"))
+
+    with pytest.raises(WebScraperError):
+        asyncio.run(scraper.fetch_text("https://example.com/robots.txt"))
+
+
+def test_missing_robots_txt_is_none():
+    scraper = scraper_for(lambda request: httpx.Response(404, content=b"not found"))
+
+    assert asyncio.run(scraper.fetch_text("https://example.com/robots.txt")) is None
+
+
+def test_force_refresh_downloads_a_cached_page_again():
+    versions = iter(["Old pricing", "New pricing"])
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        body = f"<html><head><title>{next(versions)}</title></head><body><p>Plans and prices.</p></body></html>"
+        return httpx.Response(200, headers={"Content-Type": "text/html", "ETag": '"v1"'}, content=body.encode())
+
+    scraper = scraper_for(handler)
+
+    async def scrape():
+        first = await scraper.scrape_website("https://example.com/pricing")
+        cached = await scraper.scrape_website("https://example.com/pricing")
+        refreshed = await scraper.scrape_website("https://example.com/pricing", force_refresh=True)
+        return first, cached, refreshed
+
+    first, cached, refreshed = asyncio.run(scrape())
+
+    assert first["title"] == cached["title"] == "Old pricing"
+    assert refreshed["title"] == "New pricing"
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[1].headers
@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from app.services.shared_store import MongoSharedStore, SQLiteSharedStore
+
+WORKERS = 4
+INCREMENTS = 50
+
+
+def make_store(backend: str, tmp_path):
+    if backend == "sqlite":
+        return SQLiteSharedStore(str(tmp_path / "shared.db"))
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return MongoSharedStore(mongomock_motor.AsyncMongoMockClient().salesgpt.shared_store)
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "mongo"])
+def test_compare_and_set_only_writes_the_version_that_was_read(backend, tmp_path):
+    store = make_store(backend, tmp_path)
+
+    async def run():
+        assert await store.get_versioned("counter") == (None, 0)
+        assert await store.compare_and_set("counter", {"n": 1}, 0)
+        # A second creator lost the race
+        assert not await store.compare_and_set("counter", {"n": 99}, 0)
+        value, version = await store.get_versioned("counter")
+        assert value == {"n": 1}
+        assert await store.compare_and_set("counter", {"n": 2}, version)
+        # Writing at the version read before that update fails
+        assert not await store.compare_and_set("counter", {"n": 99}, version)
+        assert await store.get("counter") == {"n": 2}
+        await store.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "mongo"])
+def test_expired_value_reads_as_absent_but_keeps_its_version(backend, tmp_path):
+    store = make_store(backend, tmp_path)
+
+    async def run():
+        await store.set("lease", {"owner": "a"}, ttl_seconds=0.05)
+        await asyncio.sleep(0.1)
+        value, version = await store.get_versioned("lease")
+        assert value is None and version == 1
+        assert await store.compare_and_set("lease", {"owner": "b"}, version, ttl_seconds=60)
+        assert await store.get("lease") == {"owner": "b"}
+        await store.close()
+
+    asyncio.run(run())
+
+
+async def increment(store, times: int) -> int:
+    conflicts = 0
+    for _ in range(times):
+        while True:
+            value, version = await store.get_versioned("counter")
+            if await store.compare_and_set("counter", {"n": (value or {"n": 0})["n"] + 1}, version):
+                break
+            conflicts += 1
+    return conflicts
+
+
+def increment_in_process(path: str, times: int) -> None:
+    store = SQLiteSharedStore(path)
+    asyncio.run(increment(store, times))
+    asyncio.run(store.close())
+
+
+def test_sqlite_compare_and_set_loses_no_update_across_processes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SQLiteSharedStore(path)  # creates the table before the workers race to
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=increment_in_process, args=(path, INCREMENTS)) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    store = SQLiteSharedStore(path)
+    assert asyncio.run(store.get("counter")) == {"n": WORKERS * INCREMENTS}
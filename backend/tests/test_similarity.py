@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.similarity import AnalysisIndex, HashingVectorizer
+
+ANALYSES = {
+    "crm": {
+        "industry": "B2B SaaS",
+        "products_services": ["CRM software", "sales pipeline analytics"],
+        "target_audience": "Sales teams at mid-size companies"
+    },
+    "crm2": {
+        "industry": "B2B SaaS",
+        "products_services": ["CRM platform", "sales forecasting"],
+        "target_audience": "Sales leaders at mid-size companies"
+    },
+    "bakery": {
+        "industry": "Food and beverage",
+        "products_services": ["Sourdough bread", "pastries", "wedding cakes"],
+        "target_audience": "Local families"
+    },
+    "dental": {
+        "industry": "Healthcare",
+        "products_services": ["Dental implants", "teeth whitening"],
+        "customer_pain_points": ["Fear of dentists"]
+    }
+}
+
+
+def make_index(**kwargs) -> AnalysisIndex:
+    index = AnalysisIndex(**kwargs)
+    for analysis_id, analysis in ANALYSES.items():
+        index.add(analysis_id, analysis)
+    return index
+
+
+def test_vectors_are_normalised_and_deterministic():
+    vectorizer = HashingVectorizer(dimensions=64)
+    vector = vectorizer.transform([("CRM software for sales teams", 1.0)])
+
+    assert vector.shape == (64,) and vector.dtype == np.float32
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert np.array_equal(vector, vectorizer.transform([("CRM software for sales teams", 1.0)]))
+
+
+def test_empty_or_stopword_text_is_the_zero_vector():
+    vectorizer = HashingVectorizer()
+
+    assert not vectorizer.transform([]).any()
+    assert not vectorizer.transform([("the and of", 1.0)]).any()
+
+
+def test_search_returns_the_top_k_by_cosine():
+    index = make_index()
+
+    results = index.search("CRM software for sales teams", limit=2)
+
+    assert [analysis_id for analysis_id, _ in results] == ["crm", "crm2"]
+    assert results[0][1] >= results[1][1] > 0
+
+
+def test_search_without_a_match_is_empty():
+    assert make_index().search("zeppelin") == []
+    assert AnalysisIndex().search("CRM software") == []
+
+
+def test_similar_excludes_the_analysis_itself():
+    index = make_index()
+
+    results = index.similar("crm", limit=3)
+
+    assert results[0][0] == "crm2"
+    assert "crm" not in [analysis_id for analysis_id, _ in results]
+    assert len(results) <= 3
+
+
+def test_similar_for_an_unindexed_analysis_uses_its_content():
+    index = make_index()
+
+    assert index.similar("new") == []
+    results = index.similar("new", ANALYSES["bakery"], limit=1)
+    assert results[0][0] == "bakery"
+
+
+def test_add_replaces_and_grows():
+    index = AnalysisIndex(dimensions=32, initial_capacity=2)
+    for analysis_id, analysis in ANALYSES.items():
+        index.add(analysis_id, analysis)
+    index.add("bakery", ANALYSES["dental"])
+
+    assert len(index) == 4
+    assert index.stats()["memory_bytes"] == 4 * 32 * 4
+    assert np.array_equal(index.vector("bakery"), index.vector("dental"))
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        since = query.get("updated_at", {}).get("$gte")
+        return FakeCursor([doc for doc in self.docs if since is None or doc["updated_at"] >= since])
+
+
+def test_incremental_load_picks_up_only_newer_saves():
+    start = datetime(2026, 1, 1)
+    docs = [
+        {"_id": analysis_id, "analysis": analysis, "updated_at": start + timedelta(minutes=i)}
+        for i, (analysis_id, analysis) in enumerate(ANALYSES.items())
+    ]
+    collection = FakeCollection(docs[:2])
+    index = AnalysisIndex()
+
+    async def run():
+        newest = await index.load(collection)
+        assert index.ready and len(index) == 2
+        # Another worker saves two analyses and re-analyses "crm" as a bakery
+        collection.docs = docs + [{"_id": "crm", "analysis": ANALYSES["bakery"], "updated_at": start + timedelta(hours=1)}]
+        newer = await index.load(collection, since=newest)
+        return newest, newer
+
+    newest, newer = asyncio.run(run())
+    assert newest == start + timedelta(minutes=1)
+    assert newer == start + timedelta(hours=1)
+    assert collection.queries == [{}, {"updated_at": {"$gte": newest}}]
+    assert len(index) == 4
+    assert index.similar("crm", limit=1)[0][0] == "bakery"
+
+
+def test_first_load_keeps_analyses_saved_while_loading():
+    index = AnalysisIndex()
+    index.add("crm", ANALYSES["bakery"])  # re-analysed after the load's query read the old document
+    stored = {"_id": "crm", "analysis": ANALYSES["crm"], "updated_at": datetime(2026, 1, 1)}
+
+    asyncio.run(index.load(FakeCollection([stored])))
+
+    expected = AnalysisIndex()
+    expected.add("crm", ANALYSES["bakery"])
+    assert np.array_equal(index.vector("crm"), expected.vector("crm"))
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"analysis_id": "a1"}
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("acme.com", work) for _ in range(5)))
+        return results, flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert runs == [1]
+    assert results == [{"analysis_id": "a1"}] * 5
+    assert stats == {"in_flight": 0, "waiters": 0}
+
+
+def test_callers_share_the_exception():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("scrape failed")
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(*(flight.do("acme.com", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+
+
+def test_different_keys_run_separately():
+    runs = []
+
+    async def work(key):
+        runs.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert sorted(runs) == ["a", "b"]
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_run():
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        flight = SingleFlight("test")
+        leader = asyncio.ensure_future(flight.do("acme.com", work))
+        follower = asyncio.ensure_future(flight.do("acme.com", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # the first client disconnects
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [1]
+
+
+def test_run_is_cancelled_once_its_last_waiter_goes():
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        flight = SingleFlight("test")
+        caller = asyncio.ensure_future(flight.do("acme.com", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return flight.stats()
+
+    assert asyncio.run(run()) == {"in_flight": 0, "waiters": 0}
+    assert cancelled == [1]
@@ -0,0 +1,84 @@
+import pytest
+
+from app.services.structured_output import (
+    CompanyAnalysis,
+    EmailList,
+    OpportunityAnalysis,
+    StructuredOutputError,
+    parse_structured,
+    repair_json
+)
+
+
+def test_valid_json_is_not_repaired():
+    assert repair_json('{"industry": "Retail"}') == ({"industry": "Retail"}, False)
+
+
+def test_code_fences_and_prose_are_stripped():
+    text = 'Here is the analysis:\n```json\n{"industry": "Retail", "competitors": ["A", "B"],}\n```\nHope it helps!'
+
+    assert repair_json(text) == ({"industry": "Retail", "competitors": ["A", "B"]}, True)
+
+
+def test_single_quotes_and_python_literals_are_converted():
+    value, repaired = repair_json("{'industry': 'Children\\'s toys', 'public': True, 'parent': None}")
+
+    assert repaired
+    assert value == {"industry": "Children's toys", "public": True, "parent": None}
+
+
+def test_truncated_output_keeps_the_complete_elements():
+    value, repaired = repair_json('{"industry": "Retail", "competitors": ["Acme", "Glo')
+
+    assert repaired
+    assert value["industry"] == "Retail"
+    assert value["competitors"][0] == "Acme"
+
+
+def test_text_without_json_raises():
+    with pytest.raises(ValueError):
+        repair_json("I could not analyze this website.")
+
+
+def test_truncated_analysis_validates():
+    data, repaired = parse_structured(
+        '```json\n{"industry": "Retail", "products_services": ["Shoes", "Bags"], "target_audience": "Tee',
+        CompanyAnalysis
+    )
+
+    assert repaired
+    assert data["industry"] == "Retail"
+    assert data["products_services"] == ["Shoes", "Bags"]
+
+
+def test_empty_object_is_rejected():
+    with pytest.raises(StructuredOutputError):
+        parse_structured("{}", CompanyAnalysis)
+    with pytest.raises(StructuredOutputError):
+        parse_structured("{}", OpportunityAnalysis)
+
+
+def test_only_unknown_or_empty_fields_are_rejected():
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"summary": "A retailer", "score": 7}', CompanyAnalysis)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"industry": "", "competitors": []}', CompanyAnalysis)
+
+
+def test_wrapper_object_is_unwrapped():
+    data, _ = parse_structured('{"analysis": {"industry": "Retail", "competitors": "Acme"}}', CompanyAnalysis)
+
+    assert data["industry"] == "Retail"
+    assert data["competitors"] == ["Acme"]
+    assert "analysis" not in data
+
+
+def test_wrapper_around_the_wrong_schema_is_rejected():
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"analysis": {"industry": "Retail"}}', OpportunityAnalysis)
+
+
+def test_bare_email_list_is_wrapped():
+    data, _ = parse_structured('[{"subject": "Hi", "body": "Hello"}]', EmailList)
+
+    assert data["emails"][0]["subject"] == "Hi"
@@ -0,0 +1,131 @@
+import asyncio
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.services.write_buffer import MAX_PENDING_BATCHES, CollectionDurability, WriteBehindBuffer
+
+
+class FakeCollection:
+    """Records each batch written; ``failures`` are raised by the next writes, in order."""
+
+    def __init__(self, failures=()):
+        self.batches = []
+        self.failures = list(failures)
+
+    async def insert_many(self, documents, ordered=True):
+        self._write([doc["_id"] for doc in documents])
+
+    async def bulk_write(self, operations, ordered=True):
+        self._write([op._doc["_id"] if isinstance(op, InsertOne) else op._filter["_id"] for op in operations])
+
+    def _write(self, batch):
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, BulkWriteError):
+                self.batches.append(batch[:failure.details["writeErrors"][0]["index"]])
+            raise failure
+        self.batches.append(batch)
+
+
+def make_buffer(collection: FakeCollection, **settings) -> WriteBehindBuffer:
+    return WriteBehindBuffer(lambda name: collection, {"emails": CollectionDurability(write_behind=True, **settings)})
+
+
+async def insert(buffer: WriteBehindBuffer, *ids):
+    for doc_id in ids:
+        await buffer.insert("emails", {"_id": doc_id})
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    collection = FakeCollection()
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=3, flush_interval=60.0)
+        await insert(buffer, 1, 2, 3, 4)
+        await asyncio.sleep(0.05)
+        flushed = list(collection.batches)
+        await buffer.close()
+        return flushed
+
+    assert asyncio.run(run()) == [[1, 2, 3]]
+    assert collection.batches == [[1, 2, 3], [4]]
+
+
+def test_partial_batch_is_flushed_after_the_interval():
+    collection = FakeCollection()
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=100, flush_interval=0.05)
+        await insert(buffer, 1, 2)
+        assert buffer.pending("emails", 1) == {"_id": 1}
+        await asyncio.sleep(0.01)
+        assert collection.batches == []
+        await asyncio.sleep(0.15)
+        assert buffer.pending("emails", 1) is None
+        await buffer.close()
+
+    asyncio.run(run())
+    assert collection.batches == [[1, 2]]
+
+
+def test_writer_flushes_inline_when_the_queue_backs_up():
+    collection = FakeCollection()
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=2, flush_interval=60.0)
+        # Enqueueing never yields until the back-pressure limit, so the flusher can't run first
+        await insert(buffer, *range(2 * MAX_PENDING_BATCHES))
+        flushed = list(collection.batches)
+        await buffer.close()
+        return flushed
+
+    flushed = asyncio.run(run())
+    assert flushed == [[i, i + 1] for i in range(0, 2 * MAX_PENDING_BATCHES, 2)]
+
+
+def test_batch_is_retried_after_a_connection_error():
+    collection = FakeCollection(failures=[AutoReconnect("connection reset")])
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=10, flush_interval=0.01)
+        await insert(buffer, 1, 2)
+        await asyncio.sleep(0.1)
+        stats = buffer.stats()
+        await buffer.close()
+        return stats
+
+    assert asyncio.run(run()) == {"emails": 0}
+    assert collection.batches == [[1, 2]]
+
+
+def test_batch_is_dropped_after_max_attempts():
+    collection = FakeCollection(failures=[AutoReconnect("connection reset")] * 3)
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=10, flush_interval=0.01)
+        await insert(buffer, 1, 2)
+        await asyncio.sleep(0.2)
+        await buffer.close()
+        return buffer.pending("emails", 1)
+
+    assert asyncio.run(run()) is None
+    assert collection.batches == []
+
+
+def test_rejected_write_is_dropped_and_the_rest_of_the_batch_written():
+    rejected = BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]})
+    collection = FakeCollection(failures=[rejected])
+
+    async def run():
+        buffer = make_buffer(collection, max_batch=10, flush_interval=60.0)
+        await insert(buffer, 1, 2, 3)
+        await buffer.write("emails", UpdateOne({"_id": 4}, {"$set": {"sent": True}}, upsert=True), 4, {"_id": 4})
+        await buffer.flush("emails")
+        pending = [buffer.pending("emails", doc_id) for doc_id in (1, 2, 3, 4)]
+        await buffer.close()
+        return pending
+
+    assert asyncio.run(run()) == [None, None, None, None]
+    # 1 was written before the rejected 2; 3 and 4 were re-queued and written next
+    assert collection.batches == [[1], [3, 4]]